@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+from django.utils.module_loading import import_string
+
+
+@register()
+def check_picklist_cache(app_configs, **kwargs):
+    """
+    Picklists are cached to be served without database queries, by every process alike:
+    a database cache would only move the query to its table, a local-memory one would serve stale lists.
+    """
+
+    backend = import_string(settings.CACHES['default']['BACKEND'])
+
+    if issubclass(backend, DatabaseCache):
+        return [Warning(
+            'The default cache is a database cache, picklist and route requests still query the database.',
+            hint='Use the file based default or another cache that does not live in the database.',
+            id='accounts.W001',
+        )]
+
+    if issubclass(backend, LocMemCache):
+        return [Warning(
+            'The default cache is per process, other processes serve picklists and routes that changed '
+            'until their entries expire.',
+            hint='Use the file based default or another cache shared by every process.',
+            id='accounts.W002',
+        )]
+
+    return []
@@ -0,0 +1,44 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.mixins import GetModelQuerySetMixin
+
+# Superusers pick from every list entry, everybody else from the entries of non-superuser staff
+PICKLIST_SCOPES = ('all', 'staff')
+
+
+def picklist_scope(user):
+    return 'all' if user.is_superuser else 'staff'
+
+
+def picklist_cache_key(model, scope):
+    return f'picklist:{model._meta.label_lower}:{scope}'
+
+
+def get_picklist(request, model, serializer_class):
+    """
+    Returns (ETag, serialized list) of model's picklist entries visible to request.user.
+    Lists are cached per scope until invalidate_picklists() or PICKLIST_CACHE_TIMEOUT,
+    the ETag is a digest of the list, so it is the same in every process serving it.
+    Cached lists are served without a database query as long as the cache is not a database cache
+    (see accounts.checks).
+    """
+
+    key = picklist_cache_key(model, picklist_scope(request.user))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    entries = GetModelQuerySetMixin().get_queryset(request, model).order_by('pk')
+    data = serializer_class(entries, many=True).data
+    etag = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
+
+    cache.set(key, (etag, data), settings.PICKLIST_CACHE_TIMEOUT)
+    return etag, data
+
+
+def invalidate_picklists(*models):
+    cache.delete_many([picklist_cache_key(model, scope) for model in models for scope in PICKLIST_SCOPES])
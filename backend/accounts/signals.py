@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.helpers.picklist_cache import invalidate_picklists
+from accounts.models import UserAccount, UserAccountTechnicalCondition, UserAccountWhsName
+
+PICKLIST_MODELS = (UserAccountTechnicalCondition, UserAccountWhsName)
+
+
+# Cleared after commit, so that no request caches the list as it was before the change
+@receiver(post_save, sender=UserAccountTechnicalCondition)
+@receiver(post_delete, sender=UserAccountTechnicalCondition)
+@receiver(post_save, sender=UserAccountWhsName)
+@receiver(post_delete, sender=UserAccountWhsName)
+def invalidate_changed_picklist(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_picklists(sender))
+
+
+# Staff and superuser flags decide whose entries the staff lists show
+@receiver(post_save, sender=UserAccount)
+@receiver(post_delete, sender=UserAccount)
+def invalidate_picklists_of_user(sender, update_fields=None, **kwargs):
+    # Logging in to the admin only saves last_login
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+
+    transaction.on_commit(lambda: invalidate_picklists(*PICKLIST_MODELS))
@@ -1,12 +1,15 @@
 import requests
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
 from rest_framework.authtoken import views as token_views
 from rest_framework import generics as api_generic_views, status, permissions
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import ValidationError
 
+from accounts.helpers.picklist_cache import get_picklist
 from accounts.mixins import GetModelQuerySetMixin
 from accounts.models import UserAccountTechnicalCondition, UserAccountWhsName
 from accounts.permissions import IsAuthenticatedPermission
@@ -16,6 +19,21 @@ from accounts.serializers import UserRegisterSerializer, UserAccountTechnicalCon
 UserModel = get_user_model()
 
 
+def picklist_response(request, model, serializer_class):
+    """
+    Returns the cached picklist of model, or 304 Not Modified if it still matches the request's If-None-Match
+    """
+
+    etag, data = get_picklist(request, model, serializer_class)
+    response = get_conditional_response(request, etag=quote_etag(etag)) or Response(data)
+
+    response['ETag'] = quote_etag(etag)
+    # Superusers and staff get different lists for the same URL
+    patch_vary_headers(response, ['Authorization'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 class RegisterApiView(api_generic_views.CreateAPIView):
     queryset = UserModel.objects.all()
     serializer_class = UserRegisterSerializer
@@ -144,10 +162,7 @@ class UserAccountTechnicalConditionView(GetModelQuerySetMixin, api_generic_views
     model = UserAccountTechnicalCondition
 
     def get(self, request, *args, **kwargs):
-        conditions = self.get_queryset(request, self.model)
-        serializer = self.serializer_class(conditions, many=True)
-
-        return Response(serializer.data)
+        return picklist_response(request, self.model, self.serializer_class)
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -176,10 +191,7 @@ class UserAccountWHSNameView(GetModelQuerySetMixin, api_generic_views.RetrieveUp
     model = UserAccountWhsName
 
     def get(self, request, *args, **kwargs):
-        warehouses = self.get_queryset(request, self.model)
-        serializer = self.serializer_class(warehouses, many=True)
-
-        return Response(serializer.data)
+        return picklist_response(request, self.model, self.serializer_class)
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
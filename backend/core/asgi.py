@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Event streams stay open for as long as their client listens, so only the ASGI server serves them
+os.environ.setdefault('ROOT_URLCONF', 'core.asgi_urls')
 
 application = get_asgi_application()
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from core.urls import urlpatterns as wsgi_urlpatterns
+from routing.views import route_events
+
+# A stream holds its worker until the client disconnects: on gunicorn that is a whole worker process per client
+urlpatterns = [
+    path('api/routing/events/', route_events, name='routing-events'),
+    *wsgi_urlpatterns,
+]
@@ -16,6 +16,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
@@ -47,7 +48,8 @@ MIDDLEWARE = [
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', cast=Csv())
 CSRF_TRUSTED_ORIGINS = config('CSRF_TRUSTED_ORIGINS', cast=Csv())
 
-ROOT_URLCONF = 'core.urls'
+# The ASGI server sets core.asgi_urls, which adds the routing event streams to the API
+ROOT_URLCONF = config('ROOT_URLCONF', default='core.urls')
 
 TEMPLATES = [
     {
@@ -115,6 +117,64 @@ STATIC_ROOT = config('STATIC_ROOT')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = config('MEDIA_ROOT')
 
+# Rows read from an uploaded sheet and inserted per batch
+UPLOAD_CHUNK_SIZE = config('UPLOAD_CHUNK_SIZE', default=5000, cast=int)
+# The row table is partitioned by file id, each partition holding the rows of this many consecutive uploaded files.
+# Partitions are added ahead of the uploads by python manage.py row_partitions create, and by the uploads
+# themselves once fewer than UPLOAD_ROW_PARTITIONS_AHEAD are left
+UPLOAD_ROW_PARTITION_FILES = config('UPLOAD_ROW_PARTITION_FILES', default=50, cast=int)
+# Partitions row_partitions create keeps ready past the one the next uploaded file lands in
+UPLOAD_ROW_PARTITIONS_AHEAD = config('UPLOAD_ROW_PARTITIONS_AHEAD', default=2, cast=int)
+# python manage.py apply_retention archives uploaded files older than UPLOAD_RETENTION_DAYS to Parquet files
+# under MEDIA_ROOT/UPLOAD_ARCHIVE_DIR and deletes them, UPLOAD_ARCHIVE_DELETE_BATCH_SIZE rows per DELETE
+UPLOAD_RETENTION_DAYS = config('UPLOAD_RETENTION_DAYS', default=365, cast=int)
+UPLOAD_ARCHIVE_DIR = config('UPLOAD_ARCHIVE_DIR', default='upload_archives')
+UPLOAD_ARCHIVE_DELETE_BATCH_SIZE = config('UPLOAD_ARCHIVE_DELETE_BATCH_SIZE', default=5000, cast=int)
+
+# Rows fetched per round trip (server-side cursor) when exporting a file
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Rendered exports are cached under MEDIA_ROOT/EXPORT_CACHE_DIR per file version,
+# least recently used artifacts are evicted once the directory grows past EXPORT_CACHE_MAX_BYTES
+EXPORT_CACHE_DIR = config('EXPORT_CACHE_DIR', default='export_cache')
+EXPORT_CACHE_MAX_BYTES = config('EXPORT_CACHE_MAX_BYTES', default=1024 ** 3, cast=int)
+
+# Worker processes encoding QR codes for label PDFs (1 encodes in the calling process)
+QR_RENDER_WORKERS = config('QR_RENDER_WORKERS', default=4, cast=int)
+# Encoded QR codes are cached in memory (per process) and in an SQLite file under MEDIA_ROOT shared by all processes
+QR_CACHE_FILE = config('QR_CACHE_FILE', default='qr_cache.sqlite3')
+QR_CACHE_MEMORY_ITEMS = config('QR_CACHE_MEMORY_ITEMS', default=20000, cast=int)
+QR_CACHE_MAX_BYTES = config('QR_CACHE_MAX_BYTES', default=256 * 1024 ** 2, cast=int)
+# Label PDF jobs split their output into PDFs of at most this many labels, which bounds their memory use
+LABEL_PDF_PART_LABELS = config('LABEL_PDF_PART_LABELS', default=6000, cast=int)
+
+# The picklists and routes are cached in files under MEDIA_ROOT/CACHE_DIR, on the volume the web, worker and
+# events containers share, so a change invalidated by one process is seen by all of them without a database query.
+# CACHE_BACKEND and CACHE_LOCATION may point it at another shared backend, e.g.
+# django.core.cache.backends.redis.RedisCache and a redis:// URL (which needs the redis package installed).
+CACHE_DIR = config('CACHE_DIR', default='django_cache')
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(MEDIA_ROOT, CACHE_DIR)),
+    }
+}
+# Seconds a technical condition or warehouse name picklist stays cached
+PICKLIST_CACHE_TIMEOUT = config('PICKLIST_CACHE_TIMEOUT', default=300, cast=int)
+# Seconds the routes of a date stay cached per transport company
+ROUTING_CACHE_TIMEOUT = config('ROUTING_CACHE_TIMEOUT', default=600, cast=int)
+# Seconds between keep-alive comments of the routing event streams (python -m uvicorn core.asgi:application)
+ROUTING_EVENTS_HEARTBEAT = config('ROUTING_EVENTS_HEARTBEAT', default=20, cast=float)
+# Seconds before the routing event listener reconnects to the database
+ROUTING_EVENTS_RECONNECT_DELAY = config('ROUTING_EVENTS_RECONNECT_DELAY', default=5, cast=float)
+
+# Background job workers (python manage.py run_job_worker)
+JOB_WORKERS = config('JOB_WORKERS', default=2, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=2, cast=float)
+# Running jobs without a heartbeat (written with their progress) for this many seconds are considered abandoned
+# and requeued on worker start
+JOB_STALE_AFTER = config('JOB_STALE_AFTER', default=3600, cast=int)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.UserAccount'
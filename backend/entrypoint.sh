@@ -15,6 +15,8 @@ fi
 echo "----- Running migrations -----"
 python manage.py makemigrations --no-input
 python manage.py migrate --no-input
+# Adds the row table partitions the next uploads land in
+python manage.py row_partitions create
 
 echo "----- Collecting static files -----"
 python manage.py collectstatic --no-input
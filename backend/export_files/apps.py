@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ExportFilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'export_files'
+
+    def ready(self):
+        from export_files import signals  # noqa: F401
@@ -0,0 +1,127 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_dir():
+    cache_dir = Path(settings.MEDIA_ROOT) / settings.EXPORT_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def artifact_path(file_id, version, extension):
+    return _cache_dir() / f'{file_id}-{version}.{extension}'
+
+
+def open_artifact(file_id, version, extension):
+    """
+    Returns the cached export of a file version opened for reading, or None if it is not cached.
+    """
+
+    path = artifact_path(file_id, version, extension)
+
+    try:
+        artifact = path.open('rb')
+    except FileNotFoundError:
+        return None
+
+    # The modification time doubles as the last access time for LRU eviction
+    os.utime(path)
+    return artifact
+
+
+def _publish(temp_path, file_id, version, extension):
+    path = artifact_path(file_id, version, extension)
+    # The rename is atomic, so readers never see a partially written artifact
+    os.replace(temp_path, path)
+
+    for stale_path in _cache_dir().glob(f'{file_id}-*.{extension}'):
+        if stale_path != path:
+            stale_path.unlink(missing_ok=True)
+
+    evict_artifacts(keep=path)
+    return path
+
+
+def _temp_artifact():
+    return tempfile.NamedTemporaryFile(dir=_cache_dir(), suffix='.tmp', delete=False)
+
+
+def store_artifact(file_id, version, extension, write):
+    """
+    Renders an export with write(output) into the cache and returns it opened for reading.
+    """
+
+    with _temp_artifact() as output:
+        try:
+            write(output)
+        except BaseException:
+            os.unlink(output.name)
+            raise
+
+    return _publish(output.name, file_id, version, extension).open('rb')
+
+
+def stream_artifact(file_id, version, extension, chunks):
+    """
+    Yields the export chunks while writing them to the cache.
+    The artifact is only published if every chunk was sent (e.g. not when the client disconnects).
+    """
+
+    output = _temp_artifact()
+    published = False
+
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+            yield chunk
+
+        output.close()
+        _publish(output.name, file_id, version, extension)
+        published = True
+
+    finally:
+        if not published:
+            output.close()
+            Path(output.name).unlink(missing_ok=True)
+
+
+def remove_artifacts(file_id):
+    for path in _cache_dir().glob(f'{file_id}-*'):
+        path.unlink(missing_ok=True)
+
+
+def evict_artifacts(max_bytes=None, keep=None):
+    """
+    Deletes the least recently used artifacts until the cache fits in max_bytes.
+    """
+
+    max_bytes = settings.EXPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    artifacts = []
+
+    for path in _cache_dir().glob('*'):
+        # Skip in-progress renders and files removed by a concurrent eviction
+        if path.suffix == '.tmp':
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        artifacts.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in artifacts)
+
+    for _, size, path in sorted(artifacts):
+        if total_size <= max_bytes:
+            break
+        if path == keep:
+            continue
+
+        path.unlink(missing_ok=True)
+        total_size -= size
+        logger.info('Evicted cached export %s (%d bytes)', path.name, size)
@@ -0,0 +1,202 @@
+import csv
+import io
+import json
+import tempfile
+from itertools import islice
+from typing import Callable, NamedTuple
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from openpyxl import Workbook
+
+from export_files.models import UploadedFileRowDataResource
+from upload_files.models import sheet_field
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+PARQUET_ROW_GROUP_SIZE = 50_000
+
+# (header, queryset lookup) in the column order of UploadedFileRowDataResource
+EXPORT_COLUMNS = [
+    *(
+        (field_name, field_name)
+        for field_name in UploadedFileRowDataResource._meta.fields
+        if field_name not in ('file_name', 'user')
+    ),
+    ('File Name', 'file__name'),
+    ('User', 'user__username'),
+]
+
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+
+
+def _render_datetime(value):
+    # Same text the ModelResource export produced: local time without microseconds
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def _render_date(value):
+    return value.isoformat() if value else ''
+
+
+def _render_boolean(value):
+    # 1 and 0, like the ModelResource export
+    return '' if value is None else str(int(value))
+
+
+def _render_text(value):
+    return '' if value is None else str(value)
+
+
+def _column_renderers():
+    renderers = []
+
+    for _, lookup in EXPORT_COLUMNS:
+        field = sheet_field(lookup) if '__' not in lookup else None
+
+        # DateTimeField is a DateField subclass
+        if isinstance(field, models.DateTimeField):
+            renderers.append(_render_datetime)
+        elif isinstance(field, models.DateField):
+            renderers.append(_render_date)
+        elif isinstance(field, models.BooleanField):
+            renderers.append(_render_boolean)
+        else:
+            renderers.append(_render_text)
+
+    return renderers
+
+
+def iter_export_rows(rows, chunk_size=None):
+    """
+    Yields the export values of every row as a list, in EXPORT_COLUMNS order.
+    Rows are read in chunks (a server-side cursor on PostgreSQL), so memory does not grow with the row count.
+    """
+
+    renderers = _column_renderers()
+    values = (
+        rows
+        .order_by('id')
+        .values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+        .iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+    )
+
+    for row in values:
+        yield [render(value) for render, value in zip(renderers, row)]
+
+
+def write_xlsx(rows, output):
+    """
+    Writes rows to output as an .xlsx workbook.
+    The write-only workbook streams rows to a temporary file instead of keeping cells in memory.
+    """
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(EXPORT_HEADERS)
+
+    for values in iter_export_rows(rows):
+        worksheet.append(values)
+
+    workbook.save(output)
+
+
+def iter_csv(rows):
+    """
+    Yields the rows as UTF-8 CSV, one encoded chunk per EXPORT_CHUNK_SIZE rows.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+
+    for index, values in enumerate(iter_export_rows(rows), start=1):
+        writer.writerow(values)
+
+        if index % settings.EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+
+def iter_ndjson(rows):
+    """
+    Yields the rows as JSON Lines (one object keyed by the export headers per line),
+    one encoded chunk per EXPORT_CHUNK_SIZE rows.
+    """
+
+    lines = []
+
+    for values in iter_export_rows(rows):
+        lines.append(json.dumps(dict(zip(EXPORT_HEADERS, values)), ensure_ascii=False))
+
+        if len(lines) == settings.EXPORT_CHUNK_SIZE:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def write_parquet(rows, output):
+    """
+    Writes rows to output as a Parquet file of string columns, one row group per PARQUET_ROW_GROUP_SIZE rows.
+    """
+
+    # Imported here so the other formats do not pay for loading pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(header, pa.string()) for header in EXPORT_HEADERS])
+    values = iter_export_rows(rows)
+
+    with pq.ParquetWriter(output, schema, compression='snappy') as writer:
+        while True:
+            records = list(islice(values, PARQUET_ROW_GROUP_SIZE))
+            if not records:
+                break
+
+            columns = [pa.array(column, type=pa.string()) for column in zip(*records)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+
+def _write_stream(stream):
+    def write(rows, output):
+        for chunk in stream(rows):
+            output.write(chunk)
+
+    return write
+
+
+class ExportFormat(NamedTuple):
+    extension: str
+    content_type: str
+    # write(rows, output) writes the whole export to a binary file object
+    write: Callable
+    # stream(rows) yields the export as bytes chunks, for formats that can be sent while they are produced
+    stream: Callable | None = None
+
+
+EXPORT_FORMATS = {
+    'xlsx': ExportFormat('xlsx', XLSX_CONTENT_TYPE, write_xlsx),
+    'csv': ExportFormat('csv', 'text/csv; charset=utf-8', _write_stream(iter_csv), iter_csv),
+    'ndjson': ExportFormat('ndjson', 'application/x-ndjson', _write_stream(iter_ndjson), iter_ndjson),
+    'parquet': ExportFormat('parquet', 'application/vnd.apache.parquet', write_parquet),
+}
+
+DEFAULT_EXPORT_FORMAT = 'xlsx'
+
+
+def export_to_file(rows, export_format):
+    """
+    Returns a temporary file positioned at the start that holds the export in the given format.
+    The file is removed when closed.
+    """
+
+    output = tempfile.TemporaryFile()
+    EXPORT_FORMATS[export_format].write(rows, output)
+    output.seek(0)
+    return output
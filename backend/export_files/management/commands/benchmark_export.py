@@ -0,0 +1,35 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from export_files.exporters import EXPORT_FORMATS
+from upload_files.models import UploadedFileRowData
+
+
+class Command(BaseCommand):
+    help = 'Exports an uploaded file in every export format and reports the time and size of each'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_id', type=int)
+        parser.add_argument('--formats', nargs='+', choices=list(EXPORT_FORMATS), default=list(EXPORT_FORMATS))
+
+    def handle(self, *args, **options):
+        rows = UploadedFileRowData.objects.filter(file_id=options['file_id'])
+        row_count = rows.count()
+        if not row_count:
+            raise CommandError(f"No rows found for file {options['file_id']}.")
+
+        self.stdout.write(f'{row_count} rows')
+        self.stdout.write(f"{'format':<10}{'seconds':>10}{'rows/s':>12}{'MB':>10}")
+
+        for export_format in options['formats']:
+            with tempfile.TemporaryFile() as output:
+                started = time.perf_counter()
+                EXPORT_FORMATS[export_format].write(rows, output)
+                elapsed = time.perf_counter() - started
+                size = output.tell()
+
+            self.stdout.write(
+                f'{export_format:<10}{elapsed:>10.2f}{row_count / elapsed:>12.0f}{size / 1024 ** 2:>10.2f}'
+            )
@@ -1,4 +1,4 @@
-from import_export import resources, fields
+from import_export import resources, fields, widgets
 
 from upload_files.models import UploadedFileRowData
 
@@ -6,6 +6,24 @@ from upload_files.models import UploadedFileRowData
 class UploadedFileRowDataResource(resources.ModelResource):
     file_name = fields.Field(attribute='file_name', column_name='File Name')
     user = fields.Field(attribute='user', column_name='User')
+    # Sheet fields stored in dimension tables
+    whs_outlet = fields.Field(attribute='whs_outlet', column_name='whs_outlet')
+    outlet_whs_ext_code = fields.Field(attribute='outlet_whs_ext_code', column_name='outlet_whs_ext_code')
+    outlet_whs_name = fields.Field(attribute='outlet_whs_name', column_name='outlet_whs_name')
+    outlet_whs_address = fields.Field(attribute='outlet_whs_address', column_name='outlet_whs_address')
+    vat_id = fields.Field(attribute='vat_id', column_name='vat_id')
+    network_name = fields.Field(attribute='network_name', column_name='network_name')
+    latitude = fields.Field(attribute='latitude', column_name='latitude', widget=widgets.FloatWidget())
+    longitude = fields.Field(attribute='longitude', column_name='longitude', widget=widgets.FloatWidget())
+    outlet_category = fields.Field(attribute='outlet_category', column_name='outlet_category')
+    pos_category = fields.Field(attribute='pos_category', column_name='pos_category')
+    pos_type = fields.Field(attribute='pos_type', column_name='pos_type')
+    pos_brand = fields.Field(attribute='pos_brand', column_name='pos_brand')
+    pos_model = fields.Field(attribute='pos_model', column_name='pos_model')
+    nm_name = fields.Field(attribute='nm_name', column_name='nm_name')
+    rsm_name = fields.Field(attribute='rsm_name', column_name='rsm_name')
+    asm_name = fields.Field(attribute='asm_name', column_name='asm_name')
+    sr_name = fields.Field(attribute='sr_name', column_name='sr_name')
 
     class Meta:
         model = UploadedFileRowData
@@ -17,7 +35,8 @@ class UploadedFileRowDataResource(resources.ModelResource):
             'outlet_whs_address',
             'vat_id',
             'network_name',
-            'gps_coordinates',
+            'latitude',
+            'longitude',
             'outlet_category',
             'contract_exp_date',
             'contract_number',
@@ -47,5 +66,9 @@ class UploadedFileRowDataResource(resources.ModelResource):
             'user',
         ]
 
+    def filter_export(self, queryset, **kwargs):
+        # One query for the rows and everything they show, instead of one per row and foreign key
+        return queryset.select_related('file', 'user').with_dimensions()
+
     def dehydrate_file_name(self, row):
         return row.file.name if row.file else 'No file'
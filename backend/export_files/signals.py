@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from export_files.artifact_cache import remove_artifacts
+from upload_files.models import UploadedFile
+
+
+@receiver(post_delete, sender=UploadedFile)
+def remove_cached_exports(sender, instance, **kwargs):
+    remove_artifacts(instance.pk)
@@ -1,42 +1,85 @@
 from django.utils import timezone
-from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.http import FileResponse, StreamingHttpResponse
 from rest_framework import status, permissions
 from rest_framework import generics as api_generic_views
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.response import Response
 
-from export_files.models import UploadedFileRowDataResource
-from upload_files.models import UploadedFileRowData
+from export_files.artifact_cache import open_artifact, store_artifact, stream_artifact
+from export_files.exporters import DEFAULT_EXPORT_FORMAT, EXPORT_FORMATS
+from upload_files.models import UploadedFile, UploadedFileRowData
 from accounts.permissions import IsAuthenticatedPermission
 
 
+class ExportContentNegotiation(DefaultContentNegotiation):
+    # ?format= selects the export file format here, not a DRF renderer
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return super().select_renderer(request, renderers, format_suffix=format_suffix or renderers[0].format)
+
+
+def _requested_format(request):
+    return request.query_params.get('format', DEFAULT_EXPORT_FORMAT).lower()
+
+
+def export_etag(request, pk):
+    version = UploadedFile.objects.filter(pk=pk).values_list('version', flat=True).first()
+
+    if version is None or _requested_format(request) not in EXPORT_FORMATS:
+        return None
+
+    return f'{pk}-{version}-{_requested_format(request)}'
+
+
 class ExportFileView(api_generic_views.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated, IsAuthenticatedPermission]
+    content_negotiation_class = ExportContentNegotiation
 
+    # Answers If-None-Match with 304 Not Modified while the file version is unchanged
+    @method_decorator(condition(etag_func=export_etag))
     def get(self, request, pk):
+        export_format = _requested_format(request)
+
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f'Unsupported export format. Available formats: {", ".join(EXPORT_FORMATS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            rows = (
-                UploadedFileRowData.objects
-                .filter(file__id=pk)
-                .select_related('file', 'user', )
-            )
+            uploaded_file = UploadedFile.objects.filter(pk=pk).first()
+            rows = UploadedFileRowData.objects.filter(file_id=pk)
 
-            if not rows.exists():
+            if uploaded_file is None or not rows.exists():
                 return Response({'error': 'No data found for this file'},
                                 status=status.HTTP_404_NOT_FOUND)
 
-            uploaded_file = rows[0].file
+            file_format = EXPORT_FORMATS[export_format]
+            safe_file_name = (f'Export_{uploaded_file.name}_{timezone.localdate().strftime("%d-%m-%Y")}'
+                              f'.{file_format.extension}')
+
+            cache_key = (uploaded_file.pk, uploaded_file.version, file_format.extension)
+            artifact = open_artifact(*cache_key)
+
+            if artifact is not None:
+                response = FileResponse(artifact, content_type=file_format.content_type)
+                response['X-Export-Cache'] = 'HIT'
+            elif file_format.stream:
+                # Text formats are sent while the rows are read and written to the cache
+                response = StreamingHttpResponse(stream_artifact(*cache_key, file_format.stream(rows)),
+                                                 content_type=file_format.content_type)
+                response['X-Export-Cache'] = 'MISS'
+            else:
+                artifact = store_artifact(*cache_key, lambda output: file_format.write(rows, output))
+                # FileResponse streams the cached file in blocks and closes it afterwards
+                response = FileResponse(artifact, content_type=file_format.content_type)
+                response['X-Export-Cache'] = 'MISS'
 
-            resource = UploadedFileRowDataResource()
-            dataset = resource.export(rows)
+            # Browsers revalidate with If-None-Match instead of reusing a stale download
+            patch_cache_control(response, private=True, no_cache=True)
 
-            # Export to Excel
-            response = HttpResponse(
-                dataset.xlsx,
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            safe_file_name = f'Export_{uploaded_file.name}_{timezone.localdate().strftime("%d-%m-%Y")}.xlsx'
             response['Content-Disposition'] = f'attachment; filename="{safe_file_name}"'
-            response['Access-Control-Expose-Headers'] = 'Content-Disposition'
+            response['Access-Control-Expose-Headers'] = 'Content-Disposition, ETag, X-Export-Cache'
 
             return response
 
@@ -5,3 +5,6 @@ class RoutingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'routing'
     verbose_name = 'Routes'
+
+    def ready(self):
+        from routing import signals  # noqa: F401
@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+from django.db import connections, router
+from django.db.models import F
+from rest_framework import serializers
+
+# Rows per UPDATE ... FROM (VALUES ...) statement, well below the bound parameter limit
+UPDATE_BATCH_SIZE = 1000
+
+
+def changed_fields(serializer_class, records, submitted):
+    """
+    Validates submitted {record pk: {field: value}} field by field with the fields of serializer_class.
+    Returns ({record pk: {field: new value}} of the values that differ from records, {record pk: {field: errors}}).
+    Records missing from records are skipped, unknown and read only fields are ignored like a partial update would.
+    """
+
+    fields = {name: field for name, field in serializer_class().fields.items() if not field.read_only}
+    changes = {}
+    errors = {}
+
+    for pk, values in submitted.items():
+        record = records.get(pk)
+        if record is None:
+            continue
+
+        record_changes = {}
+        for name, value in values.items():
+            field = fields.get(name)
+            if field is None:
+                continue
+
+            try:
+                value = field.run_validation(value)
+            except serializers.ValidationError as error:
+                errors.setdefault(pk, {})[name] = error.detail
+                continue
+
+            if value != getattr(record, field.source):
+                record_changes[field.source] = value
+
+        if record_changes:
+            changes[pk] = record_changes
+
+    return changes, errors
+
+
+def _update_from_values(connection, model, names, rows, expected_versions, set_values):
+    quote = connection.ops.quote_name
+    pk = model._meta.pk
+    version = model._meta.get_field('version')
+    fields = [model._meta.get_field(name) for name in names]
+    set_fields = [model._meta.get_field(name) for name in set_values]
+
+    assignments = [f'{quote(field.column)} = v.{quote(field.column)}' for field in fields]
+    assignments += [f'{quote(field.column)} = %s' for field in set_fields]
+    assignments.append(f'{quote(version.column)} = t.{quote(version.column)} + 1')
+    set_params = [field.get_db_prep_save(set_values[field.name], connection) for field in set_fields]
+
+    # Casts give the VALUES columns the types of the columns they are written to
+    placeholder = '(' + ', '.join(
+        f'%s::{field.cast_db_type(connection)}' for field in [pk, version, *fields]
+    ) + ')'
+    columns = ', '.join(quote(field.column) for field in [pk, version, *fields])
+    versions = {}
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPDATE_BATCH_SIZE):
+            batch = rows[start:start + UPDATE_BATCH_SIZE]
+            params = list(set_params)
+            for row_pk, values in batch:
+                params.extend((row_pk, expected_versions.get(row_pk)))
+                params.extend(field.get_db_prep_save(values[field.name], connection) for field in fields)
+
+            # A row only takes the update while it still has the expected version (none expected: always)
+            cursor.execute(
+                f'UPDATE {quote(model._meta.db_table)} AS t SET {", ".join(assignments)} '
+                f'FROM (VALUES {", ".join([placeholder] * len(batch))}) AS v({columns}) '
+                f'WHERE t.{quote(pk.column)} = v.{quote(pk.column)} '
+                f'AND (v.{quote(version.column)} IS NULL OR t.{quote(version.column)} = v.{quote(version.column)}) '
+                f'RETURNING t.{quote(pk.column)}, t.{quote(version.column)}',
+                params,
+            )
+            versions.update(cursor.fetchall())
+
+    return versions
+
+
+def _update_rows(model, rows, expected_versions, set_values):
+    updated = []
+    for pk, values in rows:
+        queryset = model._base_manager.filter(pk=pk)
+        if expected_versions.get(pk) is not None:
+            queryset = queryset.filter(version=expected_versions[pk])
+
+        if queryset.update(**values, **set_values, version=F('version') + 1):
+            updated.append(pk)
+
+    return dict(model._base_manager.filter(pk__in=updated).values_list('pk', 'version'))
+
+
+def update_changed_fields(model, changes, expected_versions=None, **set_values):
+    """
+    Writes {pk: {field: value}} with a single UPDATE ... FROM (VALUES ...) per distinct set of changed fields,
+    so only the changed columns are written. set_values (e.g. updated_at) are set on every changed row too.
+
+    Every written row's version is incremented. Rows whose version differs from their expected_versions entry
+    are left as they are (compare and swap), rows without an entry are always written.
+    Other databases than PostgreSQL fall back to an UPDATE per row.
+    Returns {pk: new version} of the rows written.
+    """
+
+    connection = connections[router.db_for_write(model)]
+    expected_versions = expected_versions or {}
+    groups = defaultdict(list)
+    for pk, values in changes.items():
+        groups[tuple(sorted(values))].append((pk, values))
+
+    versions = {}
+    for names, rows in groups.items():
+        if connection.vendor == 'postgresql':
+            versions.update(_update_from_values(connection, model, names, rows, expected_versions, set_values))
+        else:
+            versions.update(_update_rows(model, rows, expected_versions, set_values))
+
+    return versions
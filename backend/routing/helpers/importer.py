@@ -0,0 +1,226 @@
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from routing.helpers.batch_update import update_changed_fields
+from routing.helpers.route_events import routes_changed
+from routing.models import RoutingUploadedFileData
+from routing.resources import RoutingUploadedFileDataResource
+from upload_files.helpers.ingestion import column_as_dates, column_as_text, iter_sheet_chunks
+
+# Sheet column -> model field, the same columns the admin import and export use
+COLUMN_FIELD_MAP = {
+    field.column_name: field.attribute
+    for field in RoutingUploadedFileDataResource().get_import_fields()
+    if field.attribute not in ('created_at', 'updated_at')
+}
+
+# Columns of fields that cannot be empty
+REQUIRED_COLUMNS = {
+    column for column, field_name in COLUMN_FIELD_MAP.items()
+    if not RoutingUploadedFileData._meta.get_field(field_name).null
+}
+
+# A sheet row updates the route with the same natural key instead of adding another one
+NATURAL_KEY = ('date_for_delivery', 'pos_serial_number', 'outlet_name')
+
+# Serializes imports, so that two of them cannot both add the same route
+IMPORT_LOCK_ID = 0x726f757465
+
+
+class RoutingImportResult(NamedTuple):
+    rows: int
+    created: int
+    updated: int
+    unchanged: int
+    # Rows repeating the natural key of an earlier row of the sheet, which they override
+    duplicates: int
+    elapsed_seconds: float
+    dry_run: bool
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.elapsed_seconds, 1) if self.elapsed_seconds > 0 else None
+
+
+def _parse_dates(series, column):
+    """
+    Converts a column of delivery dates (date cells, text in DATE_FORMATS or Excel day numbers) to datetime.date values.
+    Raises ValueError for the first empty or invalid cell, every route needs its date.
+    """
+
+    values, invalid = column_as_dates(series)
+    missing = values.isna()
+
+    if missing.any():
+        # +2 for the header row and 1-based Excel row numbers
+        row_index = missing.idxmax()
+        if invalid[row_index]:
+            raise ValueError(f"Invalid date '{series[row_index]}' in column '{column}' at row {row_index + 2}.")
+        raise ValueError(f"Missing date in column '{column}' at row {row_index + 2}.")
+
+    return values.tolist()
+
+
+def chunk_to_routes(chunk):
+    """
+    Converts a sheet chunk to [{model field: value}] rows, mapping each column once.
+    Raises ValueError if a value does not fit in its model field.
+    """
+
+    field_columns = {}
+
+    for column, field_name in COLUMN_FIELD_MAP.items():
+        field = RoutingUploadedFileData._meta.get_field(field_name)
+
+        if column not in chunk.columns:
+            field_columns[field_name] = [None] * len(chunk)
+            continue
+
+        if field_name == 'date_for_delivery':
+            field_columns[field_name] = _parse_dates(chunk[column], column)
+            continue
+
+        text = column_as_text(chunk[column]).str.strip()
+        if field.max_length:
+            too_long = text.str.len() > field.max_length
+            if too_long.any():
+                raise ValueError(f"Value in column '{column}' at row {too_long.idxmax() + 2} "
+                                 f"exceeds {field.max_length} characters.")
+
+        values = text.tolist()
+        if field.null:
+            values = [value or None for value in values]
+        field_columns[field_name] = values
+
+    return [dict(zip(field_columns, values)) for values in zip(*field_columns.values())]
+
+
+def _natural_key(route):
+    return tuple(route[field_name] for field_name in NATURAL_KEY)
+
+
+class _StoredRoutes:
+    """
+    The stored routes of the delivery dates seen so far by natural key, each date read with a single query.
+    Routes written by the import are kept in step, so later sheet rows with the same key update them.
+    """
+
+    def __init__(self):
+        self.by_key = {}
+        self.dates = set()
+
+    def load(self, dates):
+        new_dates = set(dates) - self.dates
+        if not new_dates:
+            return
+
+        for route in (RoutingUploadedFileData.objects
+                      .filter(date_for_delivery__in=new_dates)
+                      .values('id', *COLUMN_FIELD_MAP.values())):
+            self.add(route)
+        self.dates |= new_dates
+
+    def add(self, route):
+        self.by_key.setdefault(_natural_key(route), []).append(route)
+
+
+def _upsert_chunk(routes, stored, now):
+    """
+    Adds the routes whose natural key is new and writes the changed columns of the others.
+    Returns (created, updated, unchanged, touched delivery dates, ids of the written routes).
+    """
+
+    stored.load(route['date_for_delivery'] for route in routes)
+
+    new_routes = []
+    changes = {}
+    dates = set()
+    unchanged = 0
+
+    for route in routes:
+        matches = stored.by_key.get(_natural_key(route))
+        if not matches:
+            new_routes.append(RoutingUploadedFileData(**route, created_at=now, updated_at=now))
+            dates.add(route['date_for_delivery'])
+            continue
+
+        # Routes already stored more than once under the key are all updated
+        for match in matches:
+            changed = {name: value for name, value in route.items() if match[name] != value}
+            if changed:
+                changes[match['id']] = changed
+                match.update(changed)
+                dates.add(route['date_for_delivery'])
+
+        if not any(match['id'] in changes for match in matches):
+            unchanged += 1
+
+    ids = set()
+    for created in RoutingUploadedFileData.objects.bulk_create(new_routes, batch_size=settings.UPLOAD_CHUNK_SIZE):
+        stored.add({'id': created.pk, **{name: getattr(created, name) for name in COLUMN_FIELD_MAP.values()}})
+        ids.add(created.pk)
+
+    # The import wins over earlier edits, the new versions make pending client edits of these routes conflict
+    updated = update_changed_fields(RoutingUploadedFileData, changes, updated_at=now)
+    ids.update(updated)
+
+    return len(new_routes), len(updated), unchanged, dates, ids
+
+
+def import_routes(file, chunk_size=None, dry_run=False, on_progress=None):
+    """
+    Imports a routing sheet (.xlsx or .xls, the admin import/export columns) in chunks of chunk_size rows.
+    Routes are matched on NATURAL_KEY: new ones are bulk inserted, existing ones get their changed columns updated,
+    and later rows of the sheet override earlier ones with the same key.
+    With dry_run the import runs and reports its counts, but nothing is kept.
+    on_progress, if given, is called with the running row count after every chunk.
+    Raises ValueError for unreadable sheets, missing columns and invalid values, without importing anything.
+    """
+
+    started = time.perf_counter()
+    now = timezone.now()
+    rows = created = updated = unchanged = duplicates = 0
+    seen_keys = set()
+    stored = _StoredRoutes()
+    dates = set()
+    ids = set()
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [IMPORT_LOCK_ID])
+
+        for chunk in iter_sheet_chunks(file, chunk_size or settings.UPLOAD_CHUNK_SIZE, REQUIRED_COLUMNS):
+            # The last row with a key wins, like writing the rows one after another would
+            routes = {}
+            for route in chunk_to_routes(chunk):
+                key = _natural_key(route)
+                if key in seen_keys:
+                    duplicates += 1
+                seen_keys.add(key)
+                routes[key] = route
+
+            chunk_created, chunk_updated, chunk_unchanged, chunk_dates, chunk_ids = _upsert_chunk(
+                list(routes.values()), stored, now,
+            )
+            created += chunk_created
+            updated += chunk_updated
+            unchanged += chunk_unchanged
+            dates |= chunk_dates
+            ids |= chunk_ids
+            rows += len(chunk)
+
+            if on_progress:
+                on_progress(rows)
+
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            routes_changed(dates, ids)
+
+    return RoutingImportResult(rows, created, updated, unchanged, duplicates,
+                               round(time.perf_counter() - started, 3), dry_run)
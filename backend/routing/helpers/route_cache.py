@@ -0,0 +1,62 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Staff see the routes of every transport company
+ALL_COMPANIES = None
+
+
+def _version_key(date):
+    return f'routing:version:{date.isoformat()}'
+
+
+def _routes_key(date, company):
+    scope = 'all' if company is ALL_COMPANIES else hashlib.sha256(company.encode()).hexdigest()[:32]
+    return f'routing:routes:{date.isoformat()}:{scope}'
+
+
+def get_routes(date, company, load):
+    """
+    Returns (ETag, serialized routes) of date for company (ALL_COMPANIES for staff).
+    load() serializes the routes, it only runs when the routes cached for company are not of the current version
+    of date, which invalidate_routes() replaces whenever one of them changes. A cached poll is one get_many.
+    The ETag is a digest of the routes, so it is the same in every process serving them.
+    """
+
+    version_key, key = _version_key(date), _routes_key(date, company)
+    cached = cache.get_many([version_key, key])
+    version = cached.get(version_key)
+
+    if version is None:
+        # Versions start at the current time, so an evicted version never revives routes cached under an old one
+        version = time.time_ns()
+        if not cache.add(version_key, version, timeout=None):
+            version = cache.get(version_key, version)
+    elif key in cached and cached[key][0] == version:
+        return cached[key][1:]
+
+    data = load()
+    etag = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+    cache.set(key, (version, etag, data), settings.ROUTING_CACHE_TIMEOUT)
+    return etag, data
+
+
+def _bump(dates):
+    # A new version of its own instead of an increment, which is a read and a write on the file based cache:
+    # concurrent bumps could otherwise end on the same version and one of them would be lost
+    cache.set_many({_version_key(date): time.time_ns() for date in dates}, timeout=None)
+
+
+def invalidate_routes(*dates):
+    """
+    Drops the cached routes of dates, for every transport company, once the current transaction commits.
+    """
+
+    dates = {date for date in dates if date is not None}
+    if dates:
+        transaction.on_commit(lambda: _bump(dates))
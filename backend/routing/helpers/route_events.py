@@ -0,0 +1,122 @@
+import asyncio
+import json
+import logging
+
+import psycopg
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+
+from routing.helpers.route_cache import invalidate_routes
+from routing.models import RoutingUploadedFileData
+from routing.serializers import RoutingUploadedFileDataSerializer
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CHANGES_CHANNEL = 'routing_changes'
+
+# Above this many changed routes listeners are told to reload the dates instead,
+# NOTIFY payloads are limited to 8000 bytes
+MAX_NOTIFIED_IDS = 500
+
+# Changes a slow listener may lag behind before it is told to reload instead
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def routes_changed(dates, ids=None):
+    """
+    Invalidates the cached routes of dates and notifies the route event streams, both once the transaction commits.
+    ids are the changed (added, updated or deleted) routes, without them listeners reload the dates.
+    """
+
+    dates = {date for date in dates if date is not None}
+    if not dates:
+        return
+
+    invalidate_routes(*dates)
+
+    if connection.vendor != 'postgresql':
+        return
+
+    ids = sorted(set(ids)) if ids is not None else None
+    payload = {
+        'dates': sorted(date.isoformat() for date in dates),
+        'ids': ids if ids is not None and len(ids) <= MAX_NOTIFIED_IDS else None,
+    }
+
+    # NOTIFY is transactional: listeners only hear about changes that commit
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [ROUTE_CHANGES_CHANNEL, json.dumps(payload)])
+
+
+def _serialized_routes(ids):
+    # The listener outlives requests, which otherwise recycle broken or expired connections
+    close_old_connections()
+    return RoutingUploadedFileDataSerializer(RoutingUploadedFileData.objects.filter(pk__in=ids), many=True).data
+
+
+class RouteChangeHub:
+    """
+    Fans the committed route changes out to the event streams of this process
+    over a single LISTEN connection, reading each batch of changed routes once.
+    Subscribers get {'dates': [ISO dates], 'ids': [changed ids], 'routes': [serialized routes of ids]},
+    with 'routes' None when the dates (all dates if 'dates' is None too) have to be reloaded.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, change):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(change)
+            except asyncio.QueueFull:
+                # The subscriber missed changes, a reload of its date gets it back in step
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({'dates': change['dates'], 'routes': None, 'ids': None})
+
+    async def _listen(self):
+        params = connections['default'].get_connection_params()
+        # Django's sync cursor and adapter setup do not apply to an async connection
+        params.pop('cursor_factory', None)
+        params.pop('context', None)
+        reconnected = False
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(**params, autocommit=True) as listen_connection:
+                    await listen_connection.execute(f'LISTEN {ROUTE_CHANGES_CHANNEL}')
+
+                    # Changes may have been missed while the connection was down
+                    if reconnected:
+                        self._publish({'dates': None, 'routes': None, 'ids': None})
+
+                    async for notify in listen_connection.notifies():
+                        change = json.loads(notify.payload)
+                        routes = None
+                        if change['ids'] is not None:
+                            routes = await sync_to_async(_serialized_routes)(change['ids'])
+
+                        self._publish({'dates': change['dates'], 'routes': routes, 'ids': change['ids']})
+
+            except psycopg.OperationalError:
+                logger.exception('Route change listener lost its connection, reconnecting')
+                reconnected = True
+                await asyncio.sleep(settings.ROUTING_EVENTS_RECONNECT_DELAY)
+
+
+route_change_hub = RouteChangeHub()
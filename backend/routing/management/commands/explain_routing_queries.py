@@ -0,0 +1,167 @@
+import datetime
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from routing.models import RoutingUploadedFileData
+
+# Seeded routes are told apart from real ones by this sr_name
+BENCHMARK_SR_NAME = 'Routing query benchmark'
+
+# Plans slower than their baseline by the tolerance factor and by at least REGRESSION_MIN_MS are flagged
+REGRESSION_MIN_MS = 1.0
+# Sequential scans of the routes table are flagged once they read this many rows, below that they are cheap
+SEQ_SCAN_MIN_ROWS = 10_000
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from _plan_nodes(child)
+
+
+def _explain(queryset):
+    """
+    Runs EXPLAIN ANALYZE on queryset and returns (execution ms, top plan node).
+    """
+
+    output = json.loads(queryset.explain(format='json', analyze=True, buffers=True))
+    # Depending on the driver the plan comes as a one element list or as the element itself
+    if isinstance(output, list):
+        output = output[0]
+
+    return output['Execution Time'], output['Plan']
+
+
+def _seq_scans(plan):
+    table = RoutingUploadedFileData._meta.db_table
+    return sum(1 for node in _plan_nodes(plan)
+               if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table
+               and node['Actual Rows'] + node.get('Rows Removed by Filter', 0) >= SEQ_SCAN_MIN_ROWS)
+
+
+class Command(BaseCommand):
+    help = ('Runs EXPLAIN ANALYZE on the routing API and admin queries and flags sequential scans of the routes '
+            'table and slowdowns against a saved baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, metavar='ROWS',
+                            help='Seed this many benchmark routes first (removed afterwards unless --keep)')
+        parser.add_argument('--days', type=int, default=730, help='Delivery dates the seeded routes spread over')
+        parser.add_argument('--companies', type=int, default=25, help='Transport companies of the seeded routes')
+        parser.add_argument('--chunk-size', type=int, default=50_000)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded routes for later runs')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write the timings to a JSON baseline file')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare the timings with a JSON baseline file')
+        parser.add_argument('--tolerance', type=float, default=2.0,
+                            help='Slowdown factor against the baseline that counts as a regression')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plans are only checked on PostgreSQL.')
+
+        if options['seed']:
+            self._seed(options['seed'], options['days'], options['companies'], options['chunk_size'])
+
+        try:
+            results = self._explain_queries()
+        finally:
+            if options['seed'] and not options['keep']:
+                self._remove_seeded()
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        regressions = []
+        self.stdout.write(f"{'query':<22}{'ms':>10}{'baseline':>10}{'rows':>9}  plan")
+
+        for name, (elapsed, plan) in results.items():
+            flags = []
+            if _seq_scans(plan):
+                flags.append('SEQ SCAN')
+
+            expected = baseline.get(name)
+            if expected is not None and elapsed > max(expected * options['tolerance'],
+                                                      expected + REGRESSION_MIN_MS):
+                flags.append('SLOWER')
+
+            if flags:
+                regressions.append(f"{name}: {', '.join(flags)}")
+
+            nodes = ' > '.join(dict.fromkeys(
+                f"{node['Node Type']}{' on ' + node['Index Name'] if 'Index Name' in node else ''}"
+                for node in _plan_nodes(plan)
+            ))
+            baseline_text = f'{expected:.2f}' if expected is not None else '-'
+            self.stdout.write(f"{name:<22}{elapsed:>10.2f}{baseline_text:>10}{plan['Actual Rows']:>9}  {nodes}"
+                              f"{'  <- ' + ', '.join(flags) if flags else ''}")
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump({name: elapsed for name, (elapsed, _) in results.items()}, baseline_file, indent=2)
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} query plan regression(s): {'; '.join(regressions)}")
+
+    def _explain_queries(self):
+        routes = RoutingUploadedFileData.objects.all()
+
+        busiest = (routes.values('date_for_delivery', 'transport_company')
+                   .annotate(total=Count('id')).order_by('-total').first())
+        if busiest is None:
+            raise CommandError('There are no routes to explain, seed some with --seed.')
+
+        date, company = busiest['date_for_delivery'], busiest['transport_company']
+        serial_number = routes.exclude(pos_serial_number=None).values_list('pos_serial_number', flat=True).first()
+
+        # The same query shapes as RoutingRetrieveDataView and the RoutingUploadedFileDataAdmin changelist
+        queries = {
+            'driver routes': routes.filter(date_for_delivery=date, transport_company=company),
+            'staff routes': routes.filter(date_for_delivery=date),
+            'admin changelist': routes.order_by('-date_for_delivery', '-pk')[:100],
+            'admin date range': routes.filter(date_for_delivery__range=(date - datetime.timedelta(days=7), date))
+                                      .order_by('-date_for_delivery', '-pk')[:100],
+            'admin serial search': routes.filter(pos_serial_number__icontains=(serial_number or '')[2:8])
+                                         .order_by('-date_for_delivery', '-pk')[:100],
+        }
+
+        return {name: _explain(queryset) for name, queryset in queries.items()}
+
+    def _seed(self, row_count, days, companies, chunk_size):
+        self.stdout.write(f'Seeding {row_count} routes...')
+        first_date = datetime.date.today() - datetime.timedelta(days=days - 1)
+        rng = random.Random(0)
+
+        with transaction.atomic():
+            for start in range(0, row_count, chunk_size):
+                RoutingUploadedFileData.objects.bulk_create([
+                    RoutingUploadedFileData(
+                        type_of_route='Delivery',
+                        sr_name=BENCHMARK_SR_NAME,
+                        region=f'Region {i % 28}',
+                        company_name=f'Company {i % 5000}',
+                        outlet_name=f'Outlet {i}',
+                        delivery_address=f'Address {i}',
+                        pos_model='POS',
+                        pos_serial_number=f'SN{i * 7919 % 10_000_000:08d}',
+                        transport_company=f'Transport company {rng.randrange(companies)}',
+                        date_for_delivery=first_date + datetime.timedelta(days=rng.randrange(days)),
+                    )
+                    for i in range(start, min(start + chunk_size, row_count))
+                ])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(RoutingUploadedFileData._meta.db_table)}')
+
+    def _remove_seeded(self):
+        # One statement instead of a delete per route through the delete signals
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(RoutingUploadedFileData._meta.db_table)} WHERE sr_name = %s',
+                [BENCHMARK_SR_NAME],
+            )
@@ -0,0 +1,33 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from routing.helpers.importer import import_routes
+
+
+class Command(BaseCommand):
+    help = 'Imports routing sheets (the admin import/export columns), updating routes with the same natural key'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Excel files to import')
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be imported without keeping it')
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            name = os.path.basename(path)
+
+            try:
+                with open(path, 'rb') as f:
+                    result = import_routes(File(f, name=name), chunk_size=options['chunk_size'],
+                                           dry_run=options['dry_run'])
+            except (OSError, ValueError) as e:
+                self.stderr.write(f'Failed to import {name}: {e}')
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Checked' if result.dry_run else 'Imported'} {name}: {result.rows} rows, "
+                f'{result.created} created, {result.updated} updated, {result.unchanged} unchanged, '
+                f'{result.duplicates} duplicates in {result.elapsed_seconds:.2f}s ({result.rows_per_second} rows/s)'
+            ))
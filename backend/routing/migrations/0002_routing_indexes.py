@@ -0,0 +1,25 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:38
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routing', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='routinguploadedfiledata',
+            index=models.Index(fields=['date_for_delivery', 'transport_company'], name='routing_date_company_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routinguploadedfiledata',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('pos_serial_number'), name='gin_trgm_ops'), name='routing_serial_trgm_idx'),
+        ),
+    ]
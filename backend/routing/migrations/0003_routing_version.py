@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routing', '0002_routing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routinguploadedfiledata',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
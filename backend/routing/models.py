@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 from accounts.models import UserAccount
 
@@ -17,10 +19,42 @@ class RoutingUploadedFileData(models.Model):
     date_for_delivery = models.DateField(blank=False, null=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Incremented on every write, batch updates only apply on top of the version the client has seen
+    version = models.PositiveIntegerField(default=0)
 
     class Meta:
         verbose_name = "Routing Data"
         verbose_name_plural = "Routing Data"
+        indexes = [
+            # Routes of a date for a transport company (drivers) or all of them (staff),
+            # read backwards it also serves the admin's newest date first ordering
+            models.Index(fields=['date_for_delivery', 'transport_company'], name='routing_date_company_idx'),
+            # Admin serial number search (icontains)
+            GinIndex(OpClass(Upper('pos_serial_number'), name='gin_trgm_ops'),
+                     name='routing_serial_trgm_idx'),
+        ]
 
     def __str__(self):
         return f'{self.company_name}, {self.delivery_address}'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The delivery date the route was read with: a changed date moves the route out of the list of this one too
+        instance.loaded_delivery_date = instance.__dict__.get('date_for_delivery')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Admin edits and imports move the version on as well, so batch updates based on the old one conflict
+        bump_version = not self._state.adding
+        if bump_version:
+            self.version = models.F('version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+
+        super().save(*args, **kwargs)
+
+        # The instance holds the version it was saved with instead of the expression, so it can be read and saved again
+        if bump_version:
+            self.refresh_from_db(fields=['version'])
+        self.loaded_delivery_date = self.date_for_delivery
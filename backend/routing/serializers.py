@@ -6,3 +6,4 @@ class RoutingUploadedFileDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = RoutingUploadedFileData
         fields = '__all__'
+        read_only_fields = ['version']
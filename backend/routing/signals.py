@@ -0,0 +1,47 @@
+from weakref import WeakKeyDictionary
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from routing.helpers.route_events import routes_changed
+from routing.models import RoutingUploadedFileData
+
+# Connection -> (dates, ids) of the routes saved or deleted in its current transaction
+_pending_changes = WeakKeyDictionary()
+
+
+def _report_changes(connection):
+    dates, ids = _pending_changes.pop(connection, (None, None))
+    if dates:
+        routes_changed(dates, ids)
+
+
+def report_on_commit(dates, ids):
+    """
+    Collects the changed routes of the current transaction, reported with one routes_changed() call (one NOTIFY)
+    once it commits. Changes of rolled back transactions are reported with the next commit, which only costs
+    the listeners a reload.
+    """
+
+    connection = transaction.get_connection()
+    pending_dates, pending_ids = _pending_changes.setdefault(connection, (set(), set()))
+    pending_dates.update(date for date in dates if date is not None)
+    pending_ids.update(ids)
+
+    # Only the first callback to run finds changes to report
+    transaction.on_commit(lambda: _report_changes(connection))
+
+
+# Admin edits and admin imports save routes one by one; bulk updates report the routes they change themselves
+@receiver(post_save, sender=RoutingUploadedFileData)
+def report_saved_route(sender, instance, raw=False, **kwargs):
+    # Routes read from the database know the date they were read with, no query is needed to find a changed one
+    if not raw:
+        report_on_commit([instance.date_for_delivery, getattr(instance, 'loaded_delivery_date', None)],
+                         [instance.pk])
+
+
+@receiver(post_delete, sender=RoutingUploadedFileData)
+def report_deleted_route(sender, instance, **kwargs):
+    report_on_commit([instance.date_for_delivery], [instance.pk])
@@ -1,11 +1,25 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
 from django.db import transaction
 from rest_framework import generics as api_generic_views
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 
 from accounts.permissions import IsAuthenticatedPermission
+from routing.helpers.importer import import_routes
+from routing.helpers.batch_update import changed_fields, update_changed_fields
+from routing.helpers.route_cache import ALL_COMPANIES, get_routes
+from routing.helpers.route_events import route_change_hub, routes_changed
 from routing.models import RoutingUploadedFileData
 from routing.serializers import RoutingUploadedFileDataSerializer
 
@@ -19,14 +33,30 @@ class RoutingRetrieveDataView(api_generic_views.RetrieveAPIView):
         if not date:
             return Response({"error": "Date parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            date = parse_date(date)
+        except ValueError:
+            date = None
+        if date is None:
+            return Response({"error": "Date must be in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+
         if request.user.is_staff:
+            company = ALL_COMPANIES
             data = RoutingUploadedFileData.objects.filter(date_for_delivery=date)
         else:
+            company = request.user.username
             data = RoutingUploadedFileData.objects.filter(date_for_delivery=date,
                                                           transport_company=request.user.username)
 
-        serializer = self.serializer_class(data, many=True)
-        return Response(serializer.data)
+        # Polling drivers get the cached routes, or 304 Not Modified while their copy is current
+        etag, routes = get_routes(date, company, lambda: self.serializer_class(data, many=True).data)
+        response = get_conditional_response(request, etag=quote_etag(etag)) or Response(routes)
+
+        response['ETag'] = quote_etag(etag)
+        # Staff and transport companies get different routes for the same URL
+        patch_vary_headers(response, ['Authorization'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
 
 class RoutingUpdateDataView(api_generic_views.UpdateAPIView):
@@ -34,45 +64,162 @@ class RoutingUpdateDataView(api_generic_views.UpdateAPIView):
     permission_classes = [IsAuthenticated, IsAuthenticatedPermission]
 
     def patch(self, request, *args, **kwargs):
+        """
+        Applies {record id: {field: value, "version": version the client has seen}} and returns the new versions.
+        Changes to records modified by someone else since their version are not applied,
+        the response lists the current data of those records as conflicts (409) instead.
+        Records sent without a version are written whatever their current version is.
+        """
+
         updated_data = request.data
-        record_ids = list(updated_data.keys())
-        user = request.user
         current_time = timezone.now()
 
         try:
+            submitted = {int(record_id): fields for record_id, fields in updated_data.items()}
+            submitted_fields = {name for fields in submitted.values() for name in fields}
+            submitted_fields &= set(self.serializer_class().fields)
+            expected_versions = {pk: int(fields['version']) for pk, fields in submitted.items()
+                                 if fields.get('version') is not None}
+
             with transaction.atomic():
-                records = RoutingUploadedFileData.objects.in_bulk(record_ids)
+                # Only the submitted columns are read, and only the changed ones are written
+                records = (RoutingUploadedFileData.objects
+                           .only('date_for_delivery', 'version', *submitted_fields)
+                           .in_bulk(submitted))
+
+                changes, errors = changed_fields(self.serializer_class, records, submitted)
+                if errors:
+                    return Response({"error": "Invalid data.", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+                # Changes based on an outdated version conflict right away,
+                # the UPDATE checks the version again for writes that happened since the read
+                stale = {pk for pk in changes if expected_versions.get(pk, records[pk].version) != records[pk].version}
+                versions = update_changed_fields(
+                    RoutingUploadedFileData,
+                    {pk: values for pk, values in changes.items() if pk not in stale},
+                    expected_versions,
+                    updated_at=current_time,
+                )
+                conflict_ids = set(changes) - set(versions)
+
+                # The old and the new delivery date both list a moved record
+                routes_changed([*(records[pk].date_for_delivery for pk in versions),
+                                *(changes[pk].get('date_for_delivery') for pk in versions)], versions)
+
+            conflicts = self.serializer_class(
+                RoutingUploadedFileData.objects.filter(pk__in=conflict_ids).order_by('pk'), many=True
+            ).data
+            message = f"Updated {len(versions)} records successfully."
+            if conflicts:
+                message += f" {len(conflicts)} records were changed by someone else and were not updated."
+
+            return Response({
+                "message": message,
+                # Unchanged records keep their version
+                "versions": {pk: versions.get(pk, record.version) for pk, record in records.items()
+                             if pk not in conflict_ids},
+                "conflicts": conflicts,
+            }, status=status.HTTP_409_CONFLICT if conflicts else status.HTTP_200_OK)
 
-                updates = []
-                for record_id, fields in updated_data.items():
-                    record = records.get(int(record_id))
-                    if not record:
-                        continue  # Skip non-existent records
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-                    serializer = self.serializer_class(record, data=fields, partial=True)
-                    serializer.is_valid(raise_exception=True)
 
-                    for field, value in serializer.validated_data.items():
-                        setattr(record, field, value)
-                    if hasattr(record, 'user'):
-                        record.user = user
+class RoutingImportDataView(api_generic_views.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAuthenticatedPermission, IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
 
-                    # Manually update the timestamp
-                    record.updated_at = current_time
-                    updates.append(record)
+    def post(self, request, *args, **kwargs):
+        """
+        Imports a routing sheet straight away, without the admin's per-row preview.
+        dry_run=true reports what the import would do without keeping anything.
+        """
 
-                # Bulk update all records in one query
-                if updates:
-                    model_fields = [f.name for f in RoutingUploadedFileData._meta.fields
-                                    if f.name not in ['id', 'created_at']]
+        file = request.FILES.get('file')
 
-                    RoutingUploadedFileData.objects.bulk_update(
-                        updates,
-                        fields=model_fields
-                    )
+        if not file:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-                return Response({"message": f"Updated {len(updates)} records successfully."},
-                                status=status.HTTP_200_OK)
+        if not file.name.lower().endswith(('.xlsx', '.xls')):
+            return Response({'error': 'Invalid file type. Only Excel files are allowed.'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', request.query_params.get('dry_run', ''))).lower() in ('1', 'true')
+
+        try:
+            result = import_routes(file, dry_run=dry_run)
+        except ValueError as ve:
+            return Response({'error': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({**result._asdict(), 'rows_per_second': result.rows_per_second},
+                        status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
+
+def _route_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _route_event_stream(date, company):
+    queue = route_change_hub.subscribe()
+    try:
+        # Clients reconnect after this many milliseconds when the stream drops
+        yield f'retry: {int(settings.ROUTING_EVENTS_RECONNECT_DELAY * 1000)}\n\n'
+
+        while True:
+            try:
+                change = await asyncio.wait_for(queue.get(), settings.ROUTING_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing the idle stream
+                yield ': keep-alive\n\n'
+                continue
+
+            if change['dates'] is not None and date not in change['dates']:
+                continue
+
+            if change['routes'] is None:
+                yield _route_event('reload', {'date': date})
+                continue
+
+            routes = [route for route in change['routes'] if route['date_for_delivery'] == date
+                      and (company is ALL_COMPANIES or route['transport_company'] == company)]
+            # Deleted routes and routes moved to another date or company leave the list,
+            # ids the client does not know are ignored by it
+            listed = {route['id'] for route in routes}
+            removed = [pk for pk in change['ids'] if pk not in listed]
+
+            yield _route_event('routes', {'date': date, 'routes': routes, 'removed': removed})
+    finally:
+        route_change_hub.unsubscribe(queue)
+
+
+async def route_events(request):
+    """
+    Streams the committed changes of the routes of ?date= as server-sent events, served by the ASGI server.
+    The token authenticates like the other API views, drivers only get the routes of their transport company.
+    'routes' events carry the changed routes and the ids of routes that left the list,
+    'reload' events ask the client to fetch the routes of the date again.
+    """
+
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    token = None
+    if keyword == 'Token' and key:
+        token = await Token.objects.select_related('user').filter(key=key.strip()).afirst()
+    if token is None or not token.user.is_active:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        date = parse_date(request.GET.get('date', ''))
+    except ValueError:
+        date = None
+    if date is None:
+        return JsonResponse({'error': 'Date must be in YYYY-MM-DD format.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    company = ALL_COMPANIES if token.user.is_staff else token.user.username
+
+    response = StreamingHttpResponse(_route_event_stream(date.isoformat(), company),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
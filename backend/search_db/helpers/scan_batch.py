@@ -0,0 +1,57 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from upload_files.models import UploadedFile, UploadedFileRowData
+
+STATUS_UPDATED = 'updated'
+STATUS_CREATED = 'created'
+
+
+def apply_scans(file_id, scans, user):
+    """
+    Applies {pos_serial_number: (scanned_technical_condition, scanned_outlet_whs_name)} to the rows of a file.
+    Existing serial numbers are resolved with one query, rows sharing the same scanned values are
+    updated with one statement and unknown serial numbers are inserted with one bulk insert.
+    Returns {pos_serial_number: STATUS_UPDATED | STATUS_CREATED}.
+    """
+
+    rows = UploadedFileRowData.objects.filter(file_id=file_id)
+    now = timezone.now()
+
+    with transaction.atomic():
+        existing_serial_numbers = set(
+            rows.filter(pos_serial_number__in=list(scans)).values_list('pos_serial_number', flat=True)
+        )
+
+        serial_numbers_by_values = defaultdict(list)
+        for serial_number in existing_serial_numbers:
+            serial_numbers_by_values[scans[serial_number]].append(serial_number)
+
+        for (technical_condition, outlet_whs_name), serial_numbers in serial_numbers_by_values.items():
+            rows.filter(pos_serial_number__in=serial_numbers).update(
+                scanned_technical_condition=technical_condition,
+                scanned_outlet_whs_name=outlet_whs_name,
+                user=user,
+                updated_at=now,
+            )
+
+        UploadedFileRowData.objects.bulk_create([
+            UploadedFileRowData(
+                file_id=file_id,
+                pos_serial_number=serial_number,
+                scanned_technical_condition=technical_condition,
+                scanned_outlet_whs_name=outlet_whs_name,
+                user=user,
+            )
+            for serial_number, (technical_condition, outlet_whs_name) in scans.items()
+            if serial_number not in existing_serial_numbers
+        ])
+
+        UploadedFile.bump_version(file_id)
+
+    return {
+        serial_number: STATUS_UPDATED if serial_number in existing_serial_numbers else STATUS_CREATED
+        for serial_number in scans
+    }
@@ -0,0 +1,66 @@
+import json
+
+from django.db import connections
+
+MATCH_EXACT = 'exact'
+MATCH_PREFIX = 'prefix'
+MATCH_CONTAINS = 'contains'
+MATCH_MODES = (MATCH_EXACT, MATCH_PREFIX, MATCH_CONTAINS)
+
+# Trigram indexes cannot narrow down substrings shorter than a trigram
+MIN_CONTAINS_LENGTH = 3
+
+
+def filter_by_serial_number(rows, serial_number, match=None):
+    """
+    Filters rows of a single file by POS serial number.
+
+    exact    - pos_serial_number = value, served by the (file_id, pos_serial_number) index
+    prefix   - pos_serial_number LIKE 'value%', served by the same index (varchar_pattern_ops)
+    contains - UPPER(pos_serial_number) LIKE UPPER('%value%'), served by the pg_trgm GIN index
+
+    exact and prefix compare case-sensitively, as the index does. Without an explicit match, an exact hit wins,
+    then a prefix hit for short inputs, and otherwise the value is matched as a substring regardless of case,
+    so lowercase and partial inputs still find their rows.
+    """
+
+    if match == MATCH_EXACT:
+        return rows.filter(pos_serial_number=serial_number)
+
+    if match == MATCH_PREFIX:
+        return rows.filter(pos_serial_number__startswith=serial_number)
+
+    if match == MATCH_CONTAINS:
+        return rows.filter(pos_serial_number__icontains=serial_number)
+
+    exact_rows = rows.filter(pos_serial_number=serial_number)
+    if exact_rows.exists():
+        return exact_rows
+
+    if len(serial_number) < MIN_CONTAINS_LENGTH:
+        prefix_rows = rows.filter(pos_serial_number__startswith=serial_number)
+        if prefix_rows.exists():
+            return prefix_rows
+
+    return rows.filter(pos_serial_number__icontains=serial_number)
+
+
+def estimate_count(rows):
+    """
+    Returns the planner's row estimate for a queryset on PostgreSQL (None elsewhere), without running it.
+    """
+
+    connection = connections[rows.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = rows.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    # psycopg decodes the json column already
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
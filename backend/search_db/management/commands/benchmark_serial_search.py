@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from search_db.helpers.serial_search import MATCH_CONTAINS, MATCH_EXACT, MATCH_PREFIX, filter_by_serial_number
+from upload_files.helpers.loaders import load_rows
+from upload_files.models import UploadedFile, UploadedFileRowData
+
+UserModel = get_user_model()
+
+BENCHMARK_FILE_NAME = 'serial-search-benchmark.xlsx'
+
+
+def _serial_number(i):
+    return f'SN{i * 7919 % 10_000_000:08d}'
+
+
+class Command(BaseCommand):
+    help = 'Seeds a large uploaded file and reports p50/p99 latency of exact, prefix and substring serial searches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000)
+        parser.add_argument('--queries', type=int, default=500, help='Queries per match mode')
+        parser.add_argument('--chunk-size', type=int, default=50_000)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded file for later runs')
+
+    def handle(self, *args, **options):
+        user = UserModel.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('At least one user is required to own the benchmark file.')
+
+        uploaded_file = UploadedFile.objects.filter(user=user, name=BENCHMARK_FILE_NAME).first()
+        if uploaded_file is None:
+            uploaded_file = self._seed(user, options['rows'], options['chunk_size'])
+
+        rows = UploadedFileRowData.objects.filter(file=uploaded_file)
+        row_count = rows.count()
+        serial_numbers = [_serial_number(random.randrange(row_count)) for _ in range(options['queries'])]
+
+        queries = {
+            MATCH_EXACT: serial_numbers,
+            MATCH_PREFIX: [serial[:6] for serial in serial_numbers],
+            MATCH_CONTAINS: [serial[3:8] for serial in serial_numbers],
+        }
+
+        self.stdout.write(f'{row_count} rows in file {uploaded_file.id}')
+        self.stdout.write(f"{'match':<10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+        for match, values in queries.items():
+            latencies = []
+            for value in values:
+                started = time.perf_counter()
+                # Slice like a page of results so the timing reflects index lookups, not transfer
+                list(filter_by_serial_number(rows, value, match).order_by('pos_serial_number')[:50])
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+            self.stdout.write(f'{match:<10}{percentiles[49]:>10.2f}{percentiles[98]:>10.2f}{max(latencies):>10.2f}')
+
+        if not options['keep']:
+            uploaded_file.delete()
+
+    def _seed(self, user, row_count, chunk_size):
+        self.stdout.write(f'Seeding {row_count} rows...')
+
+        with transaction.atomic():
+            uploaded_file = UploadedFile.objects.create(name=BENCHMARK_FILE_NAME, user=user)
+
+            for start in range(0, row_count, chunk_size):
+                serials = [_serial_number(i) for i in range(start, min(start + chunk_size, row_count))]
+                load_rows({
+                    'pos_serial_number': serials,
+                    'outlet_whs_name': ['Benchmark outlet'] * len(serials),
+                }, uploaded_file, user)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(UploadedFileRowData._meta.db_table)}')
+
+        return uploaded_file
@@ -0,0 +1,100 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from search_db.helpers.serial_search import estimate_count
+
+
+class SerialNumberKeysetPagination(BasePagination):
+    """
+    Keyset pagination on (pos_serial_number, id): every page is an index range scan from the last row seen,
+    however deep the client reads. At most max_results rows are returned per search in total.
+    The first page carries the match count, exact up to max_results and a planner estimate above it.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    max_results = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            serial_number, pk, returned = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return str(serial_number), int(pk), int(returned)
+        except (binascii.Error, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, returned):
+        position = json.dumps([row['pos_serial_number'], row['id'], returned])
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Expects a .values() queryset that includes id and pos_serial_number.
+        """
+
+        self.request = request
+        position = self.decode_cursor(request)
+        returned = position[2] if position else 0
+        limit = max(min(self.get_page_size(request), self.max_results - returned), 0)
+
+        rows = queryset.order_by('pos_serial_number', 'id')
+        self.count = self.count_is_estimate = None
+
+        if position is None:
+            self.count, self.count_is_estimate = self.get_count(rows)
+        else:
+            serial_number, pk, _ = position
+            rows = rows.filter(Q(pos_serial_number__gt=serial_number) | Q(pos_serial_number=serial_number, id__gt=pk))
+
+        page = list(rows[:limit + 1]) if limit else []
+        self.next_cursor = None
+
+        if len(page) > limit:
+            page = page[:limit]
+            if returned + limit < self.max_results:
+                self.next_cursor = self.encode_cursor(page[-1], returned + limit)
+
+        return page
+
+    def get_count(self, rows):
+        # Counting at most max_results + 1 rows keeps the cost bounded for very broad queries
+        count = rows[:self.max_results + 1].count()
+        if count <= self.max_results:
+            return count, False
+
+        return max(estimate_count(rows) or count, count), True
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_is_estimate': self.count_is_estimate,
+            'next': self.get_next_link(),
+            'results': data,
+        })
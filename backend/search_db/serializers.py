@@ -1,13 +1,20 @@
 from rest_framework import serializers
 
 from accounts.models import UserAccount
+from upload_files.helpers.row_fields import ROW_FIELDS
 from upload_files.models import UploadedFileRowData, UploadedFile
 
 
 class QRCodeSerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadedFileRowData
-        fields = '__all__'
+        fields = ROW_FIELDS
 
     file = serializers.PrimaryKeyRelatedField(queryset=UploadedFile.objects.all(), required=False)
     user = serializers.PrimaryKeyRelatedField(queryset=UserAccount.objects.all(), required=False)
+
+
+class QRCodeScanSerializer(serializers.Serializer):
+    pos_serial_number = serializers.CharField(max_length=100)
+    scanned_technical_condition = serializers.CharField(max_length=100, allow_blank=True, required=False, default='')
+    scanned_outlet_whs_name = serializers.CharField(max_length=100, allow_blank=True, required=False, default='')
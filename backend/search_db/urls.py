@@ -1,8 +1,9 @@
 from django.urls import path
 
-from search_db.views import QRCodeSearchView, QRCodeUpdateView
+from search_db.views import QRCodeSearchView, QRCodeUpdateView, QRCodeBatchUpdateView
 
 urlpatterns = [
     path('search/', QRCodeSearchView.as_view(), name='search_db'),
     path('update/', QRCodeUpdateView.as_view(), name='update_db'),
+    path('update-batch/', QRCodeBatchUpdateView.as_view(), name='update_db_batch'),
 ]
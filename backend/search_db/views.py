@@ -5,30 +5,45 @@ from rest_framework.response import Response
 from django.db import transaction
 
 from accounts.permissions import IsAuthenticatedPermission
-from search_db.serializers import QRCodeSerializer
-from upload_files.models import UploadedFileRowData
+from search_db.helpers.serial_search import MATCH_MODES, filter_by_serial_number
+from search_db.helpers.scan_batch import STATUS_UPDATED, apply_scans
+from search_db.pagination import SerialNumberKeysetPagination
+from search_db.serializers import QRCodeSerializer, QRCodeScanSerializer
+from upload_files.helpers.row_fields import parse_fields
+from upload_files.models import UploadedFile, UploadedFileRowData
 from upload_files.serializers import UploadedFileRowDataSerializer
 
 
 class QRCodeSearchView(api_generic_views.ListAPIView):
     serializer_class = QRCodeSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthenticatedPermission]
+    pagination_class = SerialNumberKeysetPagination
 
     def get_queryset(self):
         request: Request = self.request
         scanned_pos_serial_number = request.query_params.get('scanned_pos_serial_number')
         latest_file_id = request.query_params.get('latest_file_id')
+        match = request.query_params.get('match')
 
         if not latest_file_id:
             latest_file_id = request.session.get('latest_file_id')
 
-        if not latest_file_id:
+        if not latest_file_id or not scanned_pos_serial_number:
             return UploadedFileRowData.objects.none()
 
-        return UploadedFileRowData.objects.filter(
-            file_id=latest_file_id,
-            pos_serial_number__icontains=scanned_pos_serial_number,
-        ).order_by('pos_serial_number')
+        if match and match not in MATCH_MODES:
+            raise serializers.ValidationError({'match': f'Must be one of: {", ".join(MATCH_MODES)}.'})
+
+        rows = UploadedFileRowData.objects.filter(file_id=latest_file_id)
+        return filter_by_serial_number(rows, scanned_pos_serial_number, match).order_by('pos_serial_number')
+
+    def list(self, request, *args, **kwargs):
+        # ?fields= limits the columns sent, the keyset columns are always included
+        fields = parse_fields(request.query_params.get('fields'), always=('id', 'pos_serial_number'))
+
+        # Plain dicts from .values() are rendered as they are, without a serializer per row
+        page = self.paginate_queryset(self.get_queryset().values(*fields))
+        return self.get_paginated_response(page)
 
 
 class QRCodeUpdateView(api_generic_views.UpdateAPIView):
@@ -68,6 +83,8 @@ class QRCodeUpdateView(api_generic_views.UpdateAPIView):
                 )
 
                 if updated_count > 0:
+                    UploadedFile.bump_version(latest_file_id)
+
                     return Response({
                         'message': 'Record updated successfully!',
                         'scanned_pos_serial_number': pos_serial_number,
@@ -90,3 +107,68 @@ class QRCodeUpdateView(api_generic_views.UpdateAPIView):
 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class QRCodeBatchUpdateView(api_generic_views.GenericAPIView):
+    serializer_class = QRCodeScanSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAuthenticatedPermission]
+    max_batch_size = 1000
+
+    def post(self, request, *args, **kwargs):
+        latest_file_id = request.session.get('latest_file_id') or request.data.get('latest_file_id')
+
+        if not latest_file_id:
+            return Response({'error': 'No file ID found in session. Cannot proceed with update.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        scans = request.data.get('scans')
+        if not isinstance(scans, list) or not scans:
+            return Response({'error': 'No scans provided.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(scans) > self.max_batch_size:
+            return Response({'error': f'Too many scans, the maximum per request is {self.max_batch_size}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(scans)
+        # pos_serial_number -> index of the scan that is applied (later scans of the same serial number win)
+        latest_scan_index = {}
+        valid_scans = {}
+
+        for index, scan in enumerate(scans):
+            serializer = self.get_serializer(data=scan)
+
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+                continue
+
+            serial_number = serializer.validated_data['pos_serial_number']
+            if serial_number in latest_scan_index:
+                superseded_index = latest_scan_index[serial_number]
+                results[superseded_index] = {'index': superseded_index, 'pos_serial_number': serial_number,
+                                             'status': 'superseded'}
+
+            latest_scan_index[serial_number] = index
+            valid_scans[serial_number] = (
+                serializer.validated_data['scanned_technical_condition'],
+                serializer.validated_data['scanned_outlet_whs_name'],
+            )
+
+        try:
+            statuses = apply_scans(latest_file_id, valid_scans, request.user) if valid_scans else {}
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        for serial_number, scan_status in statuses.items():
+            index = latest_scan_index[serial_number]
+            results[index] = {'index': index, 'pos_serial_number': serial_number, 'status': scan_status}
+
+        updated_count = sum(scan_status == STATUS_UPDATED for scan_status in statuses.values())
+        created_count = len(statuses) - updated_count
+
+        return Response({
+            'message': f'Processed {len(scans)} scans: {updated_count} updated, {created_count} added.',
+            'file_id': latest_file_id,
+            'updated': updated_count,
+            'created': created_count,
+            'results': results,
+        }, status=status.HTTP_200_OK)
@@ -1,20 +1,30 @@
+import os
 from django.contrib import admin
-from django.http.response import HttpResponseRedirect
+from django.contrib.admin import helpers
+from django.http import FileResponse, Http404, HttpRequest, QueryDict
+from django.urls import path, reverse
+from django.utils.html import format_html
 from import_export.admin import ExportMixin
 from rangefilter.filters import DateRangeFilter
 from accounts.mixins import IsStaffUserMixin
-from upload_files.helpers.generate_pdf_with_qr_codes import generate_pdf
-from upload_files.models import UploadedFile, UploadedFileRowData
+from export_files.models import UploadedFileRowDataResource
+from upload_files.models import LabelPdfJob, UploadedFile, UploadedFileRowData, UploadJob
 
 
 @admin.register(UploadedFile)
 class UploadedFileAdmin(IsStaffUserMixin, admin.ModelAdmin):
-    list_display = ('id', 'name', 'upload_date', 'user',)
+    list_display = ('id', 'name', 'upload_date', 'version', 'user',)
     list_filter = (('upload_date', DateRangeFilter), 'user__username',)
+    readonly_fields = ('version',)
 
     def has_add_permission(self, request):
         return False
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # The file name is part of every exported row
+        UploadedFile.bump_version(obj.pk)
+
 
 @admin.register(UploadedFileRowData)
 class UploadedFileRowDataAdmin(IsStaffUserMixin, ExportMixin, admin.ModelAdmin):
@@ -24,34 +34,127 @@ class UploadedFileRowDataAdmin(IsStaffUserMixin, ExportMixin, admin.ModelAdmin):
         'created_at', 'updated_at', 'user',
     )
 
-    actions = ['export_selected_qr_pdf']
+    actions = ['export_selected_qr_pdf', 'export_selected_qr_pdf_per_file']
+    resource_classes = [UploadedFileRowDataResource]
+    # Outlets, POS models and people are entered by id instead of in a select listing all of them
+    raw_id_fields = ('outlet', 'pos', 'nm', 'rsm', 'asm', 'sr')
 
     search_fields = ('pos_serial_number',)
     search_help_text = "Search by pos serial number"
     ordering = ('-file__upload_date',)
-    list_filter = (('updated_at', DateRangeFilter), 'user__username', 'file__name', 'scanned_technical_condition',)
+    list_filter = (('updated_at', DateRangeFilter), 'user__username', 'file__name', 'scanned_technical_condition',
+                   ('date_of_movement', DateRangeFilter), ('contract_exp_date', DateRangeFilter),
+                   ('last_inv_date', DateRangeFilter), 'is_contract', 'is_protocol',)
 
     def has_add_permission(self, request):
         return False
 
-    def export_selected_qr_pdf(self, request, queryset):
-        queryset = queryset.filter(scanned_technical_condition__icontains="QR")
-        unique_files = queryset.order_by().values_list('file__name', flat=True).distinct()
-        file_names = ", ".join(str(name) for name in unique_files if name)
+    def get_queryset(self, request):
+        # The outlet name is read with the row instead of through a query per row
+        return super().get_queryset(request).with_dimensions('outlet_whs_name')
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        UploadedFile.bump_version(obj.file_id)
+
+    def delete_queryset(self, request, queryset):
+        file_ids = list(queryset.order_by().values_list('file_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        UploadedFile.bump_version(*file_ids)
+
+    def label_rows(self, user, selection):
+        """
+        Returns the rows with a QR flag of a selection made on the changelist, as queue_label_pdf_job stores it:
+        the changelist query string (filters and search) and, unless every matching row was selected,
+        the ids of the checked rows. The rows are those the changelist shows user at the time of the call.
+        """
+
+        request = HttpRequest()
+        request.user = user
+        request.GET = QueryDict(selection.get('query', ''))
+        queryset = self.get_changelist_instance(request).get_queryset(request)
+
+        if 'ids' in selection:
+            queryset = queryset.filter(pk__in=selection['ids'])
+
+        return queryset.filter(scanned_technical_condition__icontains="QR")
 
-        if not queryset.exists():
-            self.message_user(request, f"No selected items with QR flag in selected file", level='warning')
+    def queue_label_pdf_job(self, request, queryset, separate_files):
+        # The selection is stored instead of the rows it holds, the job reads the rows when it runs
+        selection = {'query': request.GET.urlencode()}
+        if request.POST.get('select_across') != '1':
+            selection['ids'] = request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+
+        labels_total = queryset.filter(scanned_technical_condition__icontains="QR").count()
+
+        if not labels_total:
+            self.message_user(request, "No selected items with QR flag", level="warning")
             return
 
-        if len(unique_files) > 1:
-            self.message_user(
-                request,
-                f"Error: Multiple files selected ({file_names}). "
-                "Please select only one file.",
-                level='error'
-            )
-            return HttpResponseRedirect(request.get_full_path())
+        job = LabelPdfJob.objects.create(
+            user=request.user, selection=selection, labels_total=labels_total, separate_files=separate_files,
+        )
+        jobs_url = reverse('admin:upload_files_labelpdfjob_changelist')
+        self.message_user(
+            request,
+            format_html(
+                'Generating {} QR labels in the background (job {}). '
+                'The download link appears in <a href="{}">Label PDF Jobs</a> when it is done.',
+                labels_total, job.pk, jobs_url,
+            ),
+        )
+
+    def export_selected_qr_pdf(self, request, queryset):
+        self.queue_label_pdf_job(request, queryset, separate_files=False)
+
+    export_selected_qr_pdf.short_description = "Export selected items with QR flags to PDF (a section per file)"
+
+    def export_selected_qr_pdf_per_file(self, request, queryset):
+        self.queue_label_pdf_job(request, queryset, separate_files=True)
+
+    export_selected_qr_pdf_per_file.short_description = "Export selected items with QR flags to a PDF per file (zipped)"
+
+
+@admin.register(UploadJob)
+class UploadJobAdmin(IsStaffUserMixin, admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'rows_processed', 'rows_per_second', 'user', 'created_at', 'finished_at',)
+    list_filter = ('status', 'user__username',)
+    readonly_fields = ('uploaded_file', 'rows_processed', 'dropped_values', 'error', 'started_at', 'finished_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(LabelPdfJob)
+class LabelPdfJobAdmin(IsStaffUserMixin, admin.ModelAdmin):
+    list_display = ('id', 'status', 'labels_total', 'rows_processed', 'separate_files', 'user', 'created_at',
+                    'finished_at', 'download_link',)
+    list_filter = ('status', 'user__username',)
+    exclude = ('selection',)
+    readonly_fields = ('output', 'labels_total', 'rows_processed', 'error', 'started_at', 'finished_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='upload_files_labelpdfjob_download'),
+            *super().get_urls(),
+        ]
+
+    def download_view(self, request, pk):
+        job = self.get_queryset(request).filter(pk=pk, status=LabelPdfJob.Status.DONE).first()
+
+        if job is None or not job.output:
+            raise Http404("Label PDF is not available")
+
+        return FileResponse(job.output.open('rb'), as_attachment=True, filename=os.path.basename(job.output.name))
 
-        return generate_pdf(queryset)
+    @admin.display(description='Download')
+    def download_link(self, obj):
+        if obj.status != LabelPdfJob.Status.DONE or not obj.output:
+            return '-'
 
-    export_selected_qr_pdf.short_description = "Export selected items with QR flags to PDF"
+        return format_html('<a href="{}">{}</a>', reverse('admin:upload_files_labelpdfjob_download', args=[obj.pk]),
+                           os.path.basename(obj.output.name))
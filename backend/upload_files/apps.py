@@ -5,3 +5,6 @@ class UploadFilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'upload_files'
     verbose_name = 'Databases'
+
+    def ready(self):
+        from upload_files import signals  # noqa: F401
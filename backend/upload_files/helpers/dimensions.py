@@ -0,0 +1,91 @@
+from django.db.models import Q
+
+from upload_files.models import DIMENSION_FIELDS, Outlet, Person, PosModel, UploadedFileRowData
+
+# Dimension model -> the field existing dimension rows are looked up by before they are matched on all fields
+LOOKUP_FIELDS = {Outlet: 'outlet_whs_name', PosModel: 'pos_model', Person: 'name'}
+
+# Dimension rows per lookup query
+LOOKUP_BATCH_SIZE = 2000
+
+
+def _relations():
+    """
+    Returns {row foreign key: (dimension model, [(sheet field, dimension field)])}.
+    """
+
+    relations = {}
+    for sheet_field, (relation, dimension_field) in DIMENSION_FIELDS.items():
+        model = UploadedFileRowData._meta.get_field(relation).related_model
+        relations.setdefault(relation, (model, []))[1].append((sheet_field, dimension_field))
+
+    return relations
+
+
+class DimensionInterner:
+    """
+    Stores the sheet values that repeat over many rows (outlets, POS models, people) once in their dimension tables.
+    Dimension ids already resolved are kept, so later chunks of the same upload only query the values they add.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self.relations = _relations()
+        # {dimension model: {tuple of dimension field values: id}}
+        self.ids = {model: {} for model, _ in self.relations.values()}
+
+    def intern(self, field_columns):
+        """
+        Converts {sheet field: list of values} columns to {model field: list of values} columns of
+        UploadedFileRowData: the sheet fields stored in dimension tables become <foreign key>_id columns,
+        adding the dimension rows that do not exist yet. Rows whose dimension fields are all None get no dimension.
+        """
+
+        row_count = len(next(iter(field_columns.values()), []))
+        columns = {name: values for name, values in field_columns.items() if name not in DIMENSION_FIELDS}
+
+        for relation, (model, fields) in self.relations.items():
+            if not any(sheet_field in field_columns for sheet_field, _ in fields):
+                continue
+
+            keys = list(zip(*(field_columns.get(sheet_field) or [None] * row_count for sheet_field, _ in fields)))
+            ids = self._ids(model, [dimension_field for _, dimension_field in fields], keys)
+            columns[f'{relation}_id'] = [ids.get(key) for key in keys]
+
+        return columns
+
+    def _ids(self, model, field_names, keys):
+        known = self.ids[model]
+        missing = {key for key in keys if key not in known and any(value is not None for value in key)}
+
+        if missing:
+            known.update(self._lookup(model, field_names, missing))
+
+            new_keys = missing - known.keys()
+            if new_keys:
+                # Uploads running at the same time may add the same dimension rows, the unique constraints keep one
+                model.objects.using(self.using).bulk_create(
+                    [model(**dict(zip(field_names, key))) for key in new_keys], ignore_conflicts=True,
+                )
+                known.update(self._lookup(model, field_names, new_keys))
+
+        return known
+
+    def _lookup(self, model, field_names, keys):
+        lookup_field = LOOKUP_FIELDS[model]
+        lookup_index = field_names.index(lookup_field)
+        lookup_values = list({key[lookup_index] for key in keys})
+        ids = {}
+
+        for start in range(0, len(lookup_values), LOOKUP_BATCH_SIZE):
+            batch = lookup_values[start:start + LOOKUP_BATCH_SIZE]
+            condition = Q(**{f'{lookup_field}__in': [value for value in batch if value is not None]})
+            if None in batch:
+                condition |= Q(**{f'{lookup_field}__isnull': True})
+
+            for dimension_id, *values in (model.objects.using(self.using)
+                                          .filter(condition).values_list('id', *field_names)):
+                if tuple(values) in keys:
+                    ids[tuple(values)] = dimension_id
+
+        return ids
@@ -1,33 +1,31 @@
-from io import BytesIO
-import qrcode
-from django.http import HttpResponse
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-from reportlab.lib.utils import ImageReader
 
+from upload_files.helpers.qr_cache import cached_qr_paths
 
-def generate_pdf(queryset, filename=None):
+
+def draw_qr(pdf, qr_path, x, y, size):
     """
-    Generates PDF with QR codes for the given queryset
-    Returns HttpResponse with PDF content
+    Draws a qr_path() as filled vector rectangles in the size x size box whose top left corner is (x, y).
     """
 
-    # Generate filename from queryset
-    if filename is None:
-        first_item = queryset.first()
-        if first_item and hasattr(first_item, 'file') and first_item.file:
-            base_filename = first_item.file.name.split('.xlsx')[0]
-            filename = f"qr_codes_export_{base_filename}.pdf"
-        else:
-            filename = "qr_codes_export.pdf"
-
-    # Create PDF buffer
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
+    modules, operators = qr_path
+
+    # The path is in module units with the y axis pointing down
+    pdf.saveState()
+    pdf.translate(x, y)
+    pdf.scale(size / modules, -size / modules)
+    # One filled path per code, so viewers do not show seams between adjacent modules
+    pdf.addLiteral(operators)
+    pdf.restoreState()
 
-    # Set PDF title
-    pdf.setTitle("QR Codes Export")
+
+def draw_labels(pdf, serial_numbers, qr_paths):
+    """
+    Draws a label for each serial number starting at the top of the current page, ending with a finished page
+    """
+
+    width, height = letter
 
     # PDF layout settings
     qr_size = 160
@@ -37,30 +35,14 @@ def generate_pdf(queryset, filename=None):
     x, y = 50, height - 50
     current_row = 0
     text_margin_bottom = 8
+    page_has_labels = False
 
-    for item in queryset:
-        # Generate QR code with plain text visible
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(item.pos_serial_number)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        # Save QR code to buffer
-        img_buffer = BytesIO()
-        img.save(img_buffer)
-        img_buffer.seek(0)
-
+    for serial_number, qr_path in zip(serial_numbers, qr_paths):
         # Draw QR code in PDF
-        pdf.drawImage(ImageReader(img_buffer), x, y - qr_size,
-                      width=qr_size, height=qr_size, preserveAspectRatio=True)
+        draw_qr(pdf, qr_path, x, y, qr_size)
+        page_has_labels = True
 
-        serial_text = f"{item.pos_serial_number}"
+        serial_text = f"{serial_number}"
         font_size = 10 if len(serial_text) < 20 else 8
         pdf.setFont("Helvetica", font_size)
 
@@ -83,13 +65,58 @@ def generate_pdf(queryset, filename=None):
 
             if y < 100:
                 pdf.showPage()
+                page_has_labels = False
                 y = height - 50
                 x = 50
 
-    pdf.showPage()
+    if page_has_labels:
+        pdf.showPage()
+
+
+def write_label_sections(sections, output):
+    """
+    Writes a PDF with a QR code label for each serial number to output (a path or binary file object)
+    sections is a list of (title, serial numbers), every titled section starts on a new page with an outline entry
+    Returns the QR cache hit statistics
+    """
+
+    sections = [(title, list(serial_numbers)) for title, serial_numbers in sections]
+    qr_paths, cache_stats = cached_qr_paths(
+        serial_number for _, serial_numbers in sections for serial_number in serial_numbers
+    )
+
+    pdf = canvas.Canvas(output, pagesize=letter)
+
+    # Set PDF title
+    pdf.setTitle("QR Codes Export")
+
+    start = 0
+    for index, (title, serial_numbers) in enumerate(sections):
+        if title:
+            pdf.bookmarkPage(f'section-{index}')
+            pdf.addOutlineEntry(title, f'section-{index}')
+
+        draw_labels(pdf, serial_numbers, qr_paths[start:start + len(serial_numbers)])
+        start += len(serial_numbers)
+
     pdf.save()
-    buffer.seek(0)
 
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    return cache_stats
+
+
+def write_label_pdf(serial_numbers, output):
+    """
+    Writes a PDF with a QR code label for each serial number to output (a path or binary file object)
+    Returns the QR cache hit statistics
+    """
+
+    return write_label_sections([(None, serial_numbers)], output)
+
+
+def label_pdf_filename(file_name=None):
+    if not file_name:
+        return "qr_codes_export.pdf"
+
+    base_filename = file_name.split('.xlsx')[0]
+    return f"qr_codes_export_{base_filename}.pdf"
+
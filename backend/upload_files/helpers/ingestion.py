@@ -0,0 +1,407 @@
+import hashlib
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import NamedTuple
+
+import pandas as pd
+from django.conf import settings
+from python_calamine import CalamineWorkbook
+
+from upload_files.helpers.dimensions import DimensionInterner
+from upload_files.helpers.loaders import load_rows
+from upload_files.models import SCANNED_FIELDS, SHEET_FIELDS, sheet_field
+
+# Excel column -> UploadedFileRowData sheet field, 'gps_coordinates' is stored as latitude and longitude
+COLUMN_FIELD_MAP = {
+    'POS SN': 'pos_serial_number',
+    'WHS/Outlet': 'whs_outlet',
+    'Date of movement': 'date_of_movement',
+    'Outlet/WHS Ext code': 'outlet_whs_ext_code',
+    'Outlet/WHS name': 'outlet_whs_name',
+    'Outlet/WHS address': 'outlet_whs_address',
+    'VAT ID': 'vat_id',
+    'Network name': 'network_name',
+    'GPS coordinates': 'gps_coordinates',
+    'Outlet Category': 'outlet_category',
+    'Contract exp date': 'contract_exp_date',
+    'Contract #': 'contract_number',
+    'POS Category': 'pos_category',
+    'POS Type': 'pos_type',
+    'POS Brand': 'pos_brand',
+    'POS Model': 'pos_model',
+    'POS Asset #': 'pos_asset_number',
+    'Technical condition': 'technical_condition',
+    'Year of production': 'year_of_production',
+    'Remark': 'remark',
+    'Last Inv date': 'last_inv_date',
+    'NM name': 'nm_name',
+    'RSM name': 'rsm_name',
+    'ASM name': 'asm_name',
+    'SR code': 'sr_code',
+    'SR name': 'sr_name',
+    'AdditionalComment': 'additional_comment',
+    'Is contract (Sum)': 'is_contract',
+    'Is protocol (Sum)': 'is_protocol',
+    'Scanned_Technical_condition': 'scanned_technical_condition',
+    'Scanned_WHS': 'scanned_outlet_whs_name',
+}
+
+REQUIRED_COLUMNS = {'POS SN', 'Outlet/WHS name', 'Scanned_Technical_condition', 'Scanned_WHS'}
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Formats of dates entered as text
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d.%m.%Y', '%d/%m/%Y')
+
+# Date cells not formatted as dates are read as the number of days Excel counts from this day
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Text of yes/no cells, the "(Sum)" columns otherwise hold counts
+TRUE_VALUES = {'true', 'yes', 'y', 'да'}
+FALSE_VALUES = {'false', 'no', 'n', 'не'}
+
+# Latitude and longitude separated by a comma, semicolon or whitespace, e.g. "42.6977, 23.3219"
+COORDINATES_PATTERN = r'^\s*([-+]?\d+(?:\.\d+)?)\s*[,;\s]\s*([-+]?\d+(?:\.\d+)?)\s*$'
+
+
+def _header_names(header_row):
+    return [
+        f'Unnamed: {index}' if value in (None, '') else str(value)
+        for index, value in enumerate(header_row)
+    ]
+
+
+def iter_sheet_chunks(file, chunk_size=None, required_columns=REQUIRED_COLUMNS):
+    """
+    Streams the first worksheet of an Excel file (.xlsx or .xls) as DataFrames of at most chunk_size rows.
+    A sheet with a header but no rows yields one empty DataFrame, so callers still see its columns.
+    Raises ValueError if the file cannot be read or required_columns are missing.
+    """
+
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    try:
+        rows = CalamineWorkbook.from_filelike(file).get_sheet_by_index(0).iter_rows()
+    except Exception as e:
+        raise ValueError(f'Error reading Excel file: {e}')
+
+    columns = _header_names(next(rows, []))
+    missing_columns = set(required_columns) - set(columns)
+    if missing_columns:
+        raise ValueError(f'Missing required columns: {missing_columns}')
+
+    # Skip fully blank rows, empty cells are read as ''
+    rows = (row for row in rows if any(value != '' for value in row))
+
+    # The first chunk is yielded even when it is empty
+    start = 0
+    records = list(islice(rows, chunk_size))
+    while True:
+        yield pd.DataFrame(records, columns=columns, index=pd.RangeIndex(start, start + len(records)))
+        start += len(records)
+
+        records = list(islice(rows, chunk_size))
+        if not records:
+            break
+
+
+def _integral_floats_as_text(series):
+    text = series.astype(str)
+    integral = (series % 1 == 0) & (series.abs() < 2 ** 53)
+    text[integral] = series[integral].astype('int64').astype(str)
+    return text
+
+
+def column_as_text(series):
+    """
+    Converts a sheet column to the text stored in the database:
+    integral numbers without '.0', dates as 'YYYY-MM-DD HH:MM:SS' and empty cells as ''.
+    """
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime(DATETIME_FORMAT).mask(series.isna(), '')
+
+    if pd.api.types.is_float_dtype(series):
+        return _integral_floats_as_text(series).mask(series.isna(), '')
+
+    if series.dtype != object:
+        return series.astype(str)
+
+    # Mixed columns (e.g. numbers and empty cells) are converted per value type
+    text = series.astype(str)
+    value_types = series.map(type)
+
+    is_float = value_types == float
+    if is_float.any():
+        text[is_float] = _integral_floats_as_text(series[is_float].astype(float))
+
+    is_date = value_types.isin((date, datetime))
+    if is_date.any():
+        text[is_date] = pd.to_datetime(series[is_date]).dt.strftime(DATETIME_FORMAT)
+
+    return text
+
+
+def _empty_cells(series):
+    return series.isna() | (series.astype(str).str.strip() == '')
+
+
+def _none_for_missing(values):
+    return values.astype(object).where(values.notna(), None)
+
+
+def _parse_dates(texts):
+    # Each distinct text is parsed once, a column repeats the same few dates over many rows
+    texts = pd.Series(texts, dtype=object)
+    parsed = pd.Series(pd.NaT, index=texts.index, dtype='datetime64[ns]')
+
+    for date_format in DATE_FORMATS:
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(texts[pending], format=date_format, errors='coerce')
+
+    dates = dict(zip(texts[parsed.notna()], parsed[parsed.notna()].dt.date))
+
+    # Dates pandas timestamps cannot hold, e.g. 9999-12-31 for contracts that do not expire
+    for text in texts[parsed.isna()]:
+        for date_format in DATE_FORMATS:
+            try:
+                dates[text] = datetime.strptime(text, date_format).date()
+                break
+            except ValueError:
+                continue
+
+    return dates
+
+
+def _serial_dates(numbers):
+    # Each distinct number is converted once, like the dates entered as text
+    numbers = pd.Series(numbers.unique(), dtype=float)
+    numbers = numbers[numbers >= 1]
+    parsed = pd.to_datetime(numbers, unit='D', origin=EXCEL_EPOCH, errors='coerce')
+
+    dates = dict(zip(numbers[parsed.notna()], parsed[parsed.notna()].dt.date))
+
+    # Dates pandas timestamps cannot hold
+    for number in numbers[parsed.isna()]:
+        try:
+            dates[number] = (EXCEL_EPOCH + timedelta(days=number)).date()
+        except OverflowError:
+            continue
+
+    return dates
+
+
+def column_as_dates(series):
+    """
+    Converts a sheet column of date cells, dates entered as text (DATE_FORMATS) or Excel day numbers
+    to datetime.date values.
+    Returns (values, mask of the cells that are not dates), empty cells become None.
+    """
+
+    empty = _empty_cells(series)
+    values = pd.Series(None, index=series.index, dtype=object)
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values[series.notna()] = series[series.notna()].dt.date
+        return _none_for_missing(values), pd.Series(False, index=series.index)
+
+    value_types = series.map(type)
+    is_datetime = value_types == datetime
+    if is_datetime.any():
+        values[is_datetime] = [value.date() for value in series[is_datetime]]
+
+    is_date = value_types == date
+    values[is_date] = series[is_date]
+
+    is_number = value_types.isin((int, float)) & ~empty
+    if is_number.any():
+        numbers = series[is_number].astype(float)
+        values[is_number] = numbers.map(_serial_dates(numbers))
+
+    pending = ~(is_datetime | is_date | is_number | empty)
+    if pending.any():
+        text = series[pending].astype(str).str.strip()
+        values[pending] = text.map(_parse_dates(text.unique()))
+
+    parsed = values.notna()
+    return _none_for_missing(values), ~parsed & ~empty
+
+
+def column_as_years(series):
+    """
+    Converts a sheet column of years to int values.
+    Returns (values, mask of the cells that are not years), empty cells become None.
+    """
+
+    empty = _empty_cells(series)
+    numbers = pd.to_numeric(series.astype(str).str.strip(), errors='coerce')
+    valid = (numbers % 1 == 0) & numbers.between(1, 32767)
+
+    values = pd.Series(None, index=series.index, dtype=object)
+    values[valid] = numbers[valid].astype(int).tolist()
+    return _none_for_missing(values), ~valid & ~empty
+
+
+def column_as_booleans(series):
+    """
+    Converts a sheet column of counts (true if above 0) or yes/no text to bool values.
+    Returns (values, mask of the cells that are neither), empty cells become None.
+    """
+
+    empty = _empty_cells(series)
+    text = series.astype(str).str.strip().str.lower()
+    numbers = pd.to_numeric(text, errors='coerce')
+
+    values = pd.Series(None, index=series.index, dtype=object)
+    values[numbers.notna()] = (numbers[numbers.notna()] > 0).tolist()
+    values[text.isin(TRUE_VALUES)] = True
+    values[text.isin(FALSE_VALUES)] = False
+
+    parsed = values.notna()
+    return _none_for_missing(values), ~parsed & ~empty
+
+
+def column_as_coordinates(series):
+    """
+    Converts a sheet column of "latitude, longitude" text to a DataFrame of latitude and longitude float values.
+    Returns (values, mask of the cells that are not coordinates), empty cells become None.
+    """
+
+    empty = _empty_cells(series)
+    parts = series.astype(str).str.extract(COORDINATES_PATTERN).astype(float)
+    valid = parts[0].between(-90, 90) & parts[1].between(-180, 180)
+
+    values = pd.DataFrame({
+        'latitude': _none_for_missing(parts[0].where(valid)),
+        'longitude': _none_for_missing(parts[1].where(valid)),
+    })
+    return values, ~valid & ~empty
+
+
+# Sheet fields stored as dates, numbers and booleans instead of text, with the function converting their column.
+# The "GPS coordinates" column is stored as latitude and longitude.
+FIELD_CONVERTERS = {
+    'date_of_movement': column_as_dates,
+    'contract_exp_date': column_as_dates,
+    'last_inv_date': column_as_dates,
+    'year_of_production': column_as_years,
+    'is_contract': column_as_booleans,
+    'is_protocol': column_as_booleans,
+    'gps_coordinates': column_as_coordinates,
+}
+
+FIELD_MAX_LENGTHS = {
+    field_name: sheet_field(field_name).max_length
+    for field_name in COLUMN_FIELD_MAP.values()
+    if field_name not in FIELD_CONVERTERS
+}
+
+
+def chunk_to_field_columns(chunk, dropped=None):
+    """
+    Converts a sheet chunk to {model field: list of values} one column at a time:
+    str for text fields, and parsed values (None for empty cells) for FIELD_CONVERTERS fields.
+    Missing optional columns are loaded as empty cells.
+    Cells of FIELD_CONVERTERS fields that cannot be converted are stored as None, as migration 0008 stored them;
+    dropped, if given, is a Counter their number is added to per sheet column.
+    Raises ValueError if a text value does not fit in its model field.
+    """
+
+    field_columns = {}
+
+    for column, field_name in COLUMN_FIELD_MAP.items():
+        series = chunk[column] if column in chunk.columns else pd.Series('', index=chunk.index, dtype=object)
+
+        if field_name in FIELD_CONVERTERS:
+            values, invalid = FIELD_CONVERTERS[field_name](series)
+
+            if dropped is not None and invalid.any():
+                dropped[column] += int(invalid.sum())
+
+            if isinstance(values, pd.DataFrame):
+                field_columns.update({name: values[name].tolist() for name in values.columns})
+            else:
+                field_columns[field_name] = values.tolist()
+            continue
+
+        text = column_as_text(series)
+        max_length = FIELD_MAX_LENGTHS[field_name]
+        too_long = text.str.len() > max_length
+
+        if too_long.any():
+            # +2 for the header row and 1-based Excel row numbers
+            row_number = too_long.idxmax() + 2
+            raise ValueError(
+                f"Value in column '{column}' at row {row_number} exceeds {max_length} characters."
+            )
+
+        field_columns[field_name] = text.tolist()
+
+    return field_columns
+
+
+# Sheet fields a row's hash covers: a new scan of the POS does not make its row differ from the sheet
+HASHED_FIELDS = [field_name for field_name in SHEET_FIELDS if field_name not in SCANNED_FIELDS]
+
+
+def row_hashes(field_columns):
+    """
+    Returns the 16 byte MD5 of the HASHED_FIELDS values of every row of {sheet field: list of values} columns,
+    the same for rows loaded from the same sheet values. Empty text and None hash the same.
+    """
+
+    return [
+        hashlib.md5('\x1f'.join('' if value is None else str(value) for value in values).encode()).digest()
+        for values in zip(*(field_columns[field_name] for field_name in HASHED_FIELDS))
+    ]
+
+
+class IngestionResult(NamedTuple):
+    rows: int
+    # Header names of the sheet, in sheet order
+    columns: list
+    # {sheet column: number of cells stored as None because they could not be converted}
+    dropped: dict
+
+
+def column_summary(columns):
+    """
+    Splits sheet header names into known columns, known columns the sheet lacks (loaded empty)
+    and columns that are not loaded.
+    """
+
+    return {
+        'loaded': [column for column in columns if column in COLUMN_FIELD_MAP],
+        'missing': [column for column in COLUMN_FIELD_MAP if column not in columns],
+        'ignored': [column for column in columns if column not in COLUMN_FIELD_MAP],
+    }
+
+
+def ingest_workbook(file, uploaded_file, user, chunk_size=None, on_progress=None):
+    """
+    Streams an Excel file into UploadedFileRowData rows of uploaded_file in fixed-size chunks.
+    on_progress, if given, is called with the running row count after every chunk.
+    Returns an IngestionResult.
+    """
+
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    total_rows = 0
+    columns = []
+    dropped = Counter()
+    # Outlets, POS models and people repeat from chunk to chunk, each is looked up once per upload
+    interner = DimensionInterner()
+
+    for chunk in iter_sheet_chunks(file, chunk_size):
+        columns = list(chunk.columns)
+        field_columns = chunk_to_field_columns(chunk, dropped)
+        # Incremental uploads of the next version of the sheet compare its rows by hash
+        field_columns['row_hash'] = row_hashes(field_columns)
+        total_rows += load_rows(field_columns, uploaded_file, user, interner=interner)
+
+        if on_progress:
+            on_progress(total_rows)
+
+    return IngestionResult(total_rows, columns, dict(dropped))
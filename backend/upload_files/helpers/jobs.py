@@ -0,0 +1,165 @@
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib import admin
+from django.core.files import File
+from django.db import connections, transaction
+from django.utils import timezone
+
+from upload_files.helpers.generate_pdf_with_qr_codes import label_pdf_filename
+from upload_files.helpers.ingestion import ingest_workbook
+from upload_files.helpers.label_pdfs import write_label_pdfs, zip_label_pdfs
+from upload_files.helpers.partitions import ensure_partitions
+from upload_files.models import LabelPdfJob, UploadJob, UploadedFile, UploadedFileRowData
+
+logger = logging.getLogger(__name__)
+
+
+def claim_next_job(model):
+    """
+    Marks the oldest queued job of the given model as running and returns it, or None if the queue is empty.
+    SKIP LOCKED lets several workers poll the same table without claiming a job twice.
+    """
+
+    with transaction.atomic():
+        job = (
+            model.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=model.Status.QUEUED)
+            .order_by('created_at')
+            .first()
+        )
+
+        if job is None:
+            return None
+
+        job.status = model.Status.RUNNING
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+
+    return job
+
+
+def requeue_stale_jobs(model, stale_after):
+    """
+    Returns jobs left running by a worker that died to the queue: those without a heartbeat for stale_after seconds.
+    Jobs other live workers are running keep writing their heartbeat.
+    Their work was done inside a transaction, so nothing of it was committed.
+    """
+
+    return model.objects.filter(
+        status=model.Status.RUNNING,
+        heartbeat_at__lt=timezone.now() - timedelta(seconds=stale_after),
+    ).update(status=model.Status.QUEUED, started_at=None, heartbeat_at=None, rows_processed=0)
+
+
+def _save_progress(model, job_id, rows_processed):
+    model.objects.filter(pk=job_id).update(rows_processed=rows_processed, heartbeat_at=timezone.now())
+
+
+def _finish(job, update_fields):
+    job.finished_at = timezone.now()
+    # A failed job keeps the progress it saved, which tells how far it got
+    if job.status == job.Status.FAILED:
+        update_fields = [name for name in update_fields if name != 'rows_processed']
+    job.save(update_fields=[*update_fields, 'finished_at'])
+
+
+def run_upload_job(job):
+    # The import runs in one transaction, so progress is written from a separate
+    # thread (and therefore a separate database connection) to be visible while it runs
+    progress_executor = ThreadPoolExecutor(max_workers=1)
+
+    try:
+        ensure_partitions()
+
+        with transaction.atomic():
+            uploaded_file = UploadedFile.objects.create(name=job.name, user=job.user)
+
+            with job.file.open('rb') as file:
+                result = ingest_workbook(
+                    file, uploaded_file, job.user,
+                    on_progress=lambda rows: progress_executor.submit(_save_progress, UploadJob, job.pk, rows),
+                )
+                job.rows_processed = result.rows
+                job.dropped_values = result.dropped
+
+        job.uploaded_file = uploaded_file
+        job.status = UploadJob.Status.DONE
+
+    except Exception as e:
+        logger.exception('Upload job %s failed', job.pk)
+        job.status = UploadJob.Status.FAILED
+        job.error = str(e)
+
+    finally:
+        progress_executor.submit(connections.close_all)
+        progress_executor.shutdown(wait=True)
+
+    _finish(job, ['uploaded_file', 'status', 'rows_processed', 'dropped_values', 'error'])
+
+    # Failed uploads keep their file for inspection
+    if job.status == UploadJob.Status.DONE:
+        job.file.storage.delete(job.file.name)
+
+
+def run_label_pdf_job(job):
+    try:
+        # The selection is read again here, stale filters fail the job like any other error
+        rows = admin.site.get_model_admin(UploadedFileRowData).label_rows(job.user, job.selection)
+
+        # Parts are written to disk one at a time, only the finished PDF or zip is moved to storage
+        with tempfile.TemporaryDirectory() as directory:
+            named_parts = write_label_pdfs(
+                rows, directory, separate_files=job.separate_files,
+                on_progress=lambda labels: _save_progress(LabelPdfJob, job.pk, labels),
+            )
+
+            if not named_parts:
+                raise ValueError('None of the selected rows exist anymore.')
+
+            if len(named_parts) == 1:
+                output_name, output_path = named_parts[0]
+            else:
+                file_names = list(rows.order_by().values_list('file__name', flat=True).distinct()[:2])
+                pdf_name = label_pdf_filename(file_names[0] if len(file_names) == 1 else None)
+                output_name = f'{os.path.splitext(pdf_name)[0]}.zip'
+                output_path = os.path.join(directory, output_name)
+                zip_label_pdfs(named_parts, output_path)
+
+            with open(output_path, 'rb') as output:
+                job.output.save(output_name, File(output), save=False)
+
+        job.rows_processed = rows.count()
+        job.status = LabelPdfJob.Status.DONE
+
+    except Exception as e:
+        logger.exception('Label PDF job %s failed', job.pk)
+        job.status = LabelPdfJob.Status.FAILED
+        job.error = str(e)
+
+    _finish(job, ['output', 'status', 'rows_processed', 'error'])
+
+
+JOB_HANDLERS = {
+    UploadJob: run_upload_job,
+    LabelPdfJob: run_label_pdf_job,
+}
+
+
+def run_next_job():
+    """
+    Claims and runs one queued job of any registered kind.
+    Returns False if every queue was empty.
+    """
+
+    for model, handler in JOB_HANDLERS.items():
+        job = claim_next_job(model)
+        if job is not None:
+            handler(job)
+            return True
+
+    return False
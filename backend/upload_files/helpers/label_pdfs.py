@@ -0,0 +1,72 @@
+import os
+import zipfile
+from collections import Counter
+from itertools import groupby, islice
+
+from django.conf import settings
+
+from upload_files.helpers.generate_pdf_with_qr_codes import label_pdf_filename, write_label_sections
+
+
+def _part_name(file_name, part_number, part_count):
+    if part_count == 1:
+        return file_name
+    return f'{os.path.splitext(file_name)[0]}_part{part_number}.pdf'
+
+
+def write_label_pdfs(rows, directory, separate_files=False, part_labels=None, on_progress=None):
+    """
+    Writes QR code label PDFs for rows into directory, one part of at most part_labels labels at a time.
+    Rows of several uploaded files become a section per file, or separate PDFs if separate_files is set.
+    on_progress, if given, is called with the running label count after every part.
+    Returns [(PDF file name, path)] in row order.
+    """
+
+    part_labels = part_labels or settings.LABEL_PDF_PART_LABELS
+    values = (
+        rows
+        .order_by('file_id', 'id')
+        .values_list('file_id', 'file__name', 'pos_serial_number')
+        .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    )
+
+    # (group, path) of every written part, the group being (file id, file name) or None for a combined PDF
+    parts = []
+    # file id -> file name of every file with labels
+    files = {}
+    labels = 0
+
+    for group, group_rows in groupby(values, key=lambda row: row[:2] if separate_files else None):
+        while part_rows := list(islice(group_rows, part_labels)):
+            sections = []
+            for (file_id, file_name), section_rows in groupby(part_rows, key=lambda row: row[:2]):
+                sections.append((file_name, [serial_number for *_, serial_number in section_rows]))
+                files[file_id] = file_name
+
+            path = os.path.join(directory, f'part-{len(parts)}.pdf')
+            write_label_sections(sections, path)
+            parts.append((group, path))
+
+            labels += len(part_rows)
+            if on_progress:
+                on_progress(labels)
+
+    # A combined PDF of a single file is named after it, like a single file selection always was
+    single_file_name = next(iter(files.values())) if len(files) == 1 else None
+    part_counts = Counter(group for group, _ in parts)
+    part_numbers = Counter()
+    named_parts = []
+
+    for group, path in parts:
+        part_numbers[group] += 1
+        file_name = label_pdf_filename(group[1] if separate_files else single_file_name)
+        named_parts.append((_part_name(file_name, part_numbers[group], part_counts[group]), path))
+
+    return named_parts
+
+
+def zip_label_pdfs(named_parts, path):
+    # PDFs are compressed already, storing them keeps zipping to a plain copy
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for file_name, part_path in named_parts:
+            archive.write(part_path, arcname=file_name)
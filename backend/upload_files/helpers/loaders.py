@@ -0,0 +1,65 @@
+from django.db import connections
+from django.utils import timezone
+
+from upload_files.helpers.dimensions import DimensionInterner
+from upload_files.models import UploadedFileRowData
+
+
+def build_row_objects(field_columns, uploaded_file, user):
+    field_names = list(field_columns)
+
+    return [
+        UploadedFileRowData(file=uploaded_file, user=user, **dict(zip(field_names, values)))
+        for values in zip(*field_columns.values())
+    ]
+
+
+def copy_rows(field_columns, uploaded_file, user, using='default'):
+    """
+    Streams rows straight into the table with PostgreSQL COPY FROM STDIN, bypassing model instances.
+    """
+
+    connection = connections[using]
+    opts = UploadedFileRowData._meta
+    now = timezone.now()
+
+    column_names = ['file_id', 'user_id', *(opts.get_field(name).column for name in field_columns),
+                    'created_at', 'updated_at']
+    columns_sql = ', '.join(connection.ops.quote_name(name) for name in column_names)
+    fixed_values = (uploaded_file.pk, user.pk if user else None)
+
+    with connection.cursor() as cursor:
+        # cursor.cursor is the underlying psycopg cursor
+        with cursor.cursor.copy(f'COPY {connection.ops.quote_name(opts.db_table)} ({columns_sql}) FROM STDIN') as copy:
+            for values in zip(*field_columns.values()):
+                copy.write_row((*fixed_values, *values, now, now))
+
+
+def bulk_create_rows(field_columns, uploaded_file, user, using='default', batch_size=None):
+    UploadedFileRowData.objects.using(using).bulk_create(
+        build_row_objects(field_columns, uploaded_file, user),
+        batch_size=batch_size,
+    )
+
+
+def load_rows(field_columns, uploaded_file, user, using='default', interner=None):
+    """
+    Inserts {sheet field: list of values} columns (other row fields, e.g. row_hash, as they are)
+    as UploadedFileRowData rows of uploaded_file,
+    storing the repeated values in their dimension tables through interner (a new DimensionInterner if not given).
+    Uses COPY on PostgreSQL and falls back to bulk_create on other databases.
+    Returns the number of inserted rows.
+    """
+
+    row_count = len(next(iter(field_columns.values()), []))
+    if not row_count:
+        return 0
+
+    field_columns = (interner or DimensionInterner(using)).intern(field_columns)
+
+    if connections[using].vendor == 'postgresql':
+        copy_rows(field_columns, uploaded_file, user, using=using)
+    else:
+        bulk_create_rows(field_columns, uploaded_file, user, using=using, batch_size=row_count)
+
+    return row_count
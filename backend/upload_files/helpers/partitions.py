@@ -0,0 +1,202 @@
+import re
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from upload_files.models import UploadedFile, UploadedFileRowData
+
+ROWS = UploadedFileRowData._meta.db_table
+DEFAULT_PARTITION = f'{ROWS}_default'
+
+# Partitions are named after the file id range they hold, [start, end), so detached ones can be attached again
+PARTITION_NAME = re.compile(rf'^{ROWS}_f(\d+)_(\d+)$')
+PARTITION_BOUND = re.compile(r"FROM \('(\d+)'\) TO \('(\d+)'\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    # File id range of the rows, None for the default partition
+    start: int | None
+    end: int | None
+    attached: bool
+    # Planner estimate, -1 before the partition was first analyzed
+    rows: int
+    bytes: int
+
+    @property
+    def is_default(self):
+        return self.start is None
+
+
+def partition_name(start, end):
+    return f'{ROWS}_f{start}_{end}'
+
+
+def list_partitions(using='default'):
+    """
+    Returns the partitions of the row table, attached or detached, in file id order with the default partition last.
+    """
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), i.inhrelid IS NOT NULL, c.reltuples::bigint,
+                pg_total_relation_size(c.oid)
+            FROM pg_class AS c
+            LEFT JOIN pg_inherits AS i ON i.inhrelid = c.oid AND i.inhparent = %s::regclass
+            WHERE c.relkind = 'r' AND c.relnamespace = current_schema()::regnamespace
+              AND (i.inhrelid IS NOT NULL OR c.relname ~ %s)
+            """,
+            [ROWS, PARTITION_NAME.pattern],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound, attached, row_count, size in rows:
+        if bound == 'DEFAULT':
+            start = end = None
+        else:
+            start, end = map(int, (PARTITION_BOUND.search(bound) if attached else PARTITION_NAME.match(name)).groups())
+        partitions.append(Partition(name, start, end, attached, row_count, size))
+
+    return sorted(partitions, key=lambda partition: (partition.is_default, partition.start or 0))
+
+
+def get_partition(name, using='default'):
+    for partition in list_partitions(using):
+        if partition.name == name:
+            return partition
+
+    raise ValueError(f"'{name}' is not a partition of {ROWS}.")
+
+
+def _lock_partitions(cursor):
+    # Self-conflicting, so maintenance runs one at a time while the rows stay readable and writable
+    cursor.execute(f'LOCK TABLE {ROWS} IN SHARE UPDATE EXCLUSIVE MODE')
+
+
+def create_partitions(ahead=None, size=None, using='default'):
+    """
+    Adds partitions of size (UPLOAD_ROW_PARTITION_FILES) file ids after the last one until ahead
+    (UPLOAD_ROW_PARTITIONS_AHEAD) of them follow the partition of the next uploaded file.
+    Rows of the new ranges that went to the default partition are moved to their partition.
+    Returns the names of the added partitions.
+    """
+
+    ahead = settings.UPLOAD_ROW_PARTITIONS_AHEAD if ahead is None else ahead
+    size = size or settings.UPLOAD_ROW_PARTITION_FILES
+    connection = connections[using]
+    created = []
+
+    with transaction.atomic(using), connection.cursor() as cursor:
+        _lock_partitions(cursor)
+
+        ranges = [partition for partition in list_partitions(using) if not partition.is_default]
+        end = max((partition.end for partition in ranges), default=0)
+
+        cursor.execute(f'SELECT coalesce(max(file_id), 0) FROM {DEFAULT_PARTITION}')
+        max_file_id = max(UploadedFile.objects.using(using).order_by('-pk').values_list('pk', flat=True).first() or 0,
+                          cursor.fetchone()[0])
+        target = max_file_id + 1 + ahead * size
+
+        while end <= target:
+            name = partition_name(end, end + size)
+            cursor.execute(f'CREATE TABLE {name} (LIKE {ROWS} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE file_id >= %s AND file_id < %s RETURNING *) '
+                f'INSERT INTO {name} SELECT * FROM moved',
+                [end, end + size],
+            )
+            # Builds the indexes and foreign keys of the partitioned table on the new partition
+            cursor.execute(f'ALTER TABLE {ROWS} ATTACH PARTITION {name} FOR VALUES FROM ({end}) TO ({end + size})')
+            created.append(name)
+            end += size
+
+    return created
+
+
+def ensure_partitions(using='default'):
+    """
+    Runs create_partitions() once fewer than UPLOAD_ROW_PARTITIONS_AHEAD partitions follow the one the next
+    uploaded file lands in. The check takes no lock, so it is cheap enough to run before every upload.
+    Call it before the transaction loading the rows, not inside it: attaching a partition locks the default
+    partition until the transaction ends.
+    Returns the names of the added partitions.
+    """
+
+    end = max((partition.end for partition in list_partitions(using) if not partition.is_default), default=0)
+    next_file_id = (UploadedFile.objects.using(using).order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+
+    if end > next_file_id + settings.UPLOAD_ROW_PARTITIONS_AHEAD * settings.UPLOAD_ROW_PARTITION_FILES:
+        return []
+
+    return create_partitions(using=using)
+
+
+def default_partition_rows(using='default'):
+    """
+    Returns the number of rows in the default partition, which holds the rows of files no partition is for.
+    """
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+        return cursor.fetchone()[0]
+
+
+def detach_partition(name, using='default'):
+    """
+    Takes a partition out of the row table, its rows stay in a table of their own.
+    Not CONCURRENTLY, which the default partition rules out: the detach briefly locks the row table.
+    """
+
+    partition = get_partition(name, using)
+    if partition.is_default or not partition.attached:
+        raise ValueError(f"'{name}' is not an attached file id range partition.")
+
+    with transaction.atomic(using), connections[using].cursor() as cursor:
+        _lock_partitions(cursor)
+        cursor.execute(f'ALTER TABLE {ROWS} DETACH PARTITION {name}')
+
+
+def attach_partition(name, using='default'):
+    """
+    Puts a detached partition back in the row table, for the file id range of its name.
+    Its rows are checked against the range, as are the rows of the default partition.
+    """
+
+    partition = get_partition(name, using)
+    if partition.attached:
+        raise ValueError(f"'{name}' is already attached.")
+
+    with transaction.atomic(using), connections[using].cursor() as cursor:
+        _lock_partitions(cursor)
+        cursor.execute(f'ALTER TABLE {ROWS} ATTACH PARTITION {name} '
+                       f'FOR VALUES FROM ({partition.start}) TO ({partition.end})')
+
+
+def drop_partitions(names, using='default'):
+    """
+    Drops partitions (attached or detached) with all their rows, then deletes the uploaded files of their ranges,
+    which no longer have rows to cascade to. Dropping a table takes no row by row DELETE.
+    Returns the number of deleted uploaded files.
+    """
+
+    partitions = [get_partition(name, using) for name in names]
+    for partition in partitions:
+        if partition.is_default:
+            raise ValueError('The default partition cannot be dropped, detach or move its rows first.')
+
+    with transaction.atomic(using), connections[using].cursor() as cursor:
+        _lock_partitions(cursor)
+
+        deleted = 0
+        for partition in partitions:
+            if partition.attached:
+                cursor.execute(f'ALTER TABLE {ROWS} DETACH PARTITION {partition.name}')
+            cursor.execute(f'DROP TABLE {partition.name}')
+            deleted += UploadedFile.objects.using(using).filter(
+                pk__gte=partition.start, pk__lt=partition.end,
+            ).delete()[1].get(UploadedFile._meta.label, 0)
+
+    return deleted
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from upload_files.helpers.qr_matrices import QR_PARAMS, qr_paths
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached path format or the way codes are encoded changes
+QR_CACHE_FORMAT = 1
+
+_PARAMS_KEY = json.dumps({**QR_PARAMS, 'format': QR_CACHE_FORMAT}, sort_keys=True)
+
+
+def qr_cache_key(value):
+    return hashlib.sha256(f'{_PARAMS_KEY}\n{value}'.encode()).hexdigest()
+
+
+class QRPathCache:
+    """
+    Two tier cache of qr_path() results keyed by qr_cache_key():
+    an in-process LRU of memory_items entries in front of an SQLite file shared by all processes,
+    whose least recently used entries are deleted once they add up to more than max_bytes.
+    """
+
+    def __init__(self, path, memory_items, max_bytes):
+        self.path = Path(path)
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+
+        try:
+            # The connection context commits on success and rolls back on errors
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS qr_path '
+                    '(key TEXT PRIMARY KEY, modules INTEGER NOT NULL, path TEXT NOT NULL, used_at REAL NOT NULL)'
+                )
+                connection.execute('CREATE INDEX IF NOT EXISTS qr_path_used_at ON qr_path (used_at)')
+                yield connection
+        finally:
+            connection.close()
+
+    def _remember(self, key, path):
+        with self._lock:
+            self._memory[key] = path
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        return found
+
+    def get_many(self, keys):
+        """
+        Returns ({key: path} of the cached keys, {'memory': hits, 'disk': hits}).
+        """
+
+        found = self._from_memory(keys)
+        stats = {'memory': len(found), 'disk': 0}
+        missing = [key for key in keys if key not in found]
+
+        if missing:
+            now = time.time()
+            with self._connect() as connection:
+                # Stay below SQLite's bound parameter limit
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    rows = connection.execute(
+                        f'SELECT key, modules, path FROM qr_path WHERE key IN ({", ".join("?" * len(batch))})', batch
+                    ).fetchall()
+                    connection.executemany('UPDATE qr_path SET used_at = ? WHERE key = ?',
+                                           [(now, key) for key, _, _ in rows])
+
+                    for key, modules, path in rows:
+                        found[key] = (modules, path)
+                        self._remember(key, found[key])
+
+                    stats['disk'] += len(rows)
+
+        return found, stats
+
+    def set_many(self, paths):
+        """
+        Stores {key: path} in both tiers and evicts least recently used disk entries above max_bytes.
+        """
+
+        now = time.time()
+        for key, path in paths.items():
+            self._remember(key, path)
+
+        with self._connect() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO qr_path (key, modules, path, used_at) VALUES (?, ?, ?, ?)',
+                [(key, modules, path, now) for key, (modules, path) in paths.items()],
+            )
+            self._evict(connection)
+
+    def _evict(self, connection):
+        total_bytes = connection.execute('SELECT COALESCE(SUM(LENGTH(path)), 0) FROM qr_path').fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the cap so that eviction does not run on every write
+        excess = total_bytes - self.max_bytes * 0.9
+        rows = connection.execute('SELECT key, LENGTH(path) FROM qr_path ORDER BY used_at')
+
+        evicted_keys = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            evicted_keys.append((key,))
+            excess -= size
+
+        connection.executemany('DELETE FROM qr_path WHERE key = ?', evicted_keys)
+        logger.info('Evicted %d cached QR codes', len(evicted_keys))
+
+
+qr_cache = QRPathCache(
+    Path(settings.MEDIA_ROOT) / settings.QR_CACHE_FILE,
+    memory_items=settings.QR_CACHE_MEMORY_ITEMS,
+    max_bytes=settings.QR_CACHE_MAX_BYTES,
+)
+
+
+def cached_qr_paths(values, workers=None):
+    """
+    Returns (the qr_path() of every value in order, hit statistics).
+    Only values missing from both cache tiers are encoded, each distinct value once.
+    """
+
+    values = [str(value) for value in values]
+    keys = [qr_cache_key(value) for value in values]
+    distinct_keys = list(dict.fromkeys(keys))
+
+    found, stats = qr_cache.get_many(distinct_keys)
+
+    missing_values = list({key: value for key, value in zip(keys, values) if key not in found}.items())
+    if missing_values:
+        encoded = dict(zip(
+            (key for key, _ in missing_values),
+            qr_paths((value for _, value in missing_values),
+                     settings.QR_RENDER_WORKERS if workers is None else workers),
+        ))
+        qr_cache.set_many(encoded)
+        found.update(encoded)
+
+    stats['encoded'] = len(missing_values)
+    stats['labels'] = len(values)
+    logger.info('QR cache: %(labels)d labels, %(memory)d memory hits, %(disk)d disk hits, %(encoded)d encoded',
+                stats)
+
+    return [found[key] for key in keys], stats
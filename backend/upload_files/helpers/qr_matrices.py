@@ -0,0 +1,74 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import qrcode
+
+# Same symbol as the labels had when they were embedded PNGs
+QR_PARAMS = {
+    'version': 1,
+    'error_correction': qrcode.constants.ERROR_CORRECT_L,
+    'box_size': 10,
+    'border': 4,
+}
+
+# Below this many labels starting worker processes costs more than it saves
+MIN_POOL_LABELS = 200
+
+
+def qr_matrix(data):
+    """
+    Encodes data as a QR code and returns (modules per side including the border, dark runs).
+    Dark runs are (row, column, length) tuples of horizontally adjacent dark modules, row 0 at the top.
+    """
+
+    qr = qrcode.QRCode(**QR_PARAMS)
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+
+    runs = []
+    for row_index, row in enumerate(matrix):
+        start = None
+        for column_index, dark in enumerate(row):
+            if dark and start is None:
+                start = column_index
+            elif not dark and start is not None:
+                runs.append((row_index, start, column_index - start))
+                start = None
+        if start is not None:
+            runs.append((row_index, start, len(row) - start))
+
+    return len(matrix), tuple(runs)
+
+
+def qr_path(data):
+    """
+    Encodes data as a QR code and returns (modules per side including the border, PDF path operators).
+    The operators fill every dark run as a rectangle in module units with the y axis pointing down.
+    """
+
+    modules, runs = qr_matrix(data)
+    return modules, ' '.join(f'{column} {row} {length} 1 re' for row, column, length in runs) + ' f'
+
+
+def _pool_context():
+    # Workers must not be forked from a threaded server process, forkserver/spawn start them clean
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def qr_paths(values, workers):
+    """
+    Returns the qr_path() of every value, in order.
+    Large batches are encoded in a pool of worker processes.
+    """
+
+    values = list(values)
+
+    if workers <= 1 or len(values) < MIN_POOL_LABELS:
+        return [qr_path(value) for value in values]
+
+    chunksize = max(1, len(values) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+        return list(executor.map(qr_path, values, chunksize=chunksize))
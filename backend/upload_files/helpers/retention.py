@@ -0,0 +1,288 @@
+import json
+import os
+import tempfile
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from upload_files.helpers.dimensions import DimensionInterner
+from upload_files.helpers.loaders import load_rows
+from upload_files.helpers.partitions import drop_partitions, ensure_partitions, list_partitions
+from upload_files.models import SHEET_FIELDS, UploadedFile, UploadedFileRowData, sheet_field
+
+UserModel = get_user_model()
+
+ARCHIVE_ROW_GROUP_SIZE = 50_000
+
+# Parquet schema metadata key holding the archived file's details
+ARCHIVE_METADATA_KEY = b'wm_system.uploaded_file'
+
+# Row fields archived besides the sheet fields; rows keep the username of the user that loaded or scanned them
+ARCHIVED_ROW_FIELDS = ['row_hash', 'user__username']
+
+
+class ArchivedFile(NamedTuple):
+    file_id: int
+    name: str
+    path: Path
+    rows: int
+
+
+class RetentionResult(NamedTuple):
+    archived: list
+    # Uploaded files deleted after archiving, through dropped partitions or batched DELETEs
+    deleted: int
+    dropped_partitions: list
+    # Files changed while they were archived, left for the next run
+    skipped: list
+
+
+def _archive_dir():
+    archive_dir = Path(settings.MEDIA_ROOT) / settings.UPLOAD_ARCHIVE_DIR
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    return archive_dir
+
+
+def _arrow_schema(metadata):
+    import pyarrow as pa
+
+    def arrow_type(field):
+        if isinstance(field, models.DateField):
+            return pa.date32()
+        if isinstance(field, models.BooleanField):
+            return pa.bool_()
+        if isinstance(field, models.FloatField):
+            return pa.float64()
+        if isinstance(field, models.IntegerField):
+            return pa.int32()
+        return pa.string()
+
+    return pa.schema(
+        [(field_name, arrow_type(sheet_field(field_name))) for field_name in SHEET_FIELDS]
+        + [('row_hash', pa.binary()), ('user', pa.string())],
+        metadata={ARCHIVE_METADATA_KEY: json.dumps(metadata)},
+    )
+
+
+def archive_file(uploaded_file, archive_dir=None):
+    """
+    Writes the rows of uploaded_file, with their sheet values typed as the table stores them, to a
+    zstd compressed Parquet archive under archive_dir (MEDIA_ROOT/UPLOAD_ARCHIVE_DIR) and returns an ArchivedFile.
+    The file's details are kept in the schema metadata for restore_archive.
+    """
+
+    # Imported here so the web processes do not pay for loading pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = Path(archive_dir) if archive_dir else _archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{uploaded_file.pk}-{get_valid_filename(uploaded_file.remove_file_extension())}.parquet'
+
+    schema = _arrow_schema({
+        'id': uploaded_file.pk,
+        'name': uploaded_file.name,
+        'user': uploaded_file.user.get_username(),
+        'upload_date': uploaded_file.upload_date.isoformat(),
+        'version': uploaded_file.version,
+    })
+    values = (UploadedFileRowData.objects.filter(file=uploaded_file).order_by('id')
+              .values_list(*SHEET_FIELDS, *ARCHIVED_ROW_FIELDS)
+              .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE))
+    rows = 0
+
+    # Written next to the archive and renamed, so a failed run never leaves a partial archive behind
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as output:
+        try:
+            with pq.ParquetWriter(output, schema, compression='zstd') as writer:
+                batch = []
+                for row in values:
+                    batch.append(row)
+                    if len(batch) == ARCHIVE_ROW_GROUP_SIZE:
+                        writer.write_table(_arrow_table(batch, schema))
+                        rows += len(batch)
+                        batch = []
+                if batch:
+                    writer.write_table(_arrow_table(batch, schema))
+                    rows += len(batch)
+        except BaseException:
+            os.unlink(output.name)
+            raise
+
+    os.replace(output.name, path)
+    return ArchivedFile(uploaded_file.pk, uploaded_file.name, path, rows)
+
+
+def _arrow_table(rows, schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) or [()] * len(schema)
+    hash_index = schema.get_field_index('row_hash')
+    columns[hash_index] = [bytes(value) if value is not None else None for value in columns[hash_index]]
+
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                schema=schema)
+
+
+def delete_rows_in_batches(uploaded_file, batch_size=None):
+    """
+    Deletes the rows of uploaded_file batch_size (UPLOAD_ARCHIVE_DELETE_BATCH_SIZE) at a time, each batch in a
+    transaction of its own, so no long lived lock or huge DELETE holds up the uploads and scans running meanwhile.
+    Returns the number of deleted rows.
+    """
+
+    batch_size = batch_size or settings.UPLOAD_ARCHIVE_DELETE_BATCH_SIZE
+    rows = UploadedFileRowData.objects.filter(file=uploaded_file)
+    deleted = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(rows.order_by().values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += rows.filter(pk__in=ids).delete()[0]
+
+
+def expired_files(days):
+    return UploadedFile.objects.filter(upload_date__lt=timezone.now() - timedelta(days=days)).order_by('pk')
+
+
+def _unchanged(archived, versions):
+    """
+    Locks the uploaded files of archived until the end of the transaction and returns those still at the version
+    they were archived at. Files deleted meanwhile are left out.
+    """
+
+    current = dict(UploadedFile.objects.select_for_update()
+                   .filter(pk__in=[archived_file.file_id for archived_file in archived])
+                   .values_list('pk', 'version'))
+    return [archived_file for archived_file in archived
+            if current.get(archived_file.file_id) == versions[archived_file.file_id]]
+
+
+def _droppable_partitions(archived):
+    """
+    Returns {partition name: archived files} of the row table partitions all of whose uploaded files were archived
+    and that no later upload can land in, and the archived files outside of them.
+    """
+
+    archived_by_id = {archived_file.file_id: archived_file for archived_file in archived}
+    newest_file_id = UploadedFile.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    droppable = {}
+
+    for partition in list_partitions():
+        if partition.is_default or not partition.attached or partition.end > newest_file_id:
+            continue
+
+        file_ids = list(UploadedFile.objects.filter(pk__gte=partition.start, pk__lt=partition.end)
+                        .values_list('pk', flat=True))
+        if file_ids and all(pk in archived_by_id for pk in file_ids):
+            droppable[partition.name] = [archived_by_id[pk] for pk in file_ids]
+
+    in_partitions = {archived_file.file_id for files in droppable.values() for archived_file in files}
+    return droppable, [archived_file for archived_file in archived if archived_file.file_id not in in_partitions]
+
+
+def apply_retention(days=None, archive_dir=None, batch_size=None, on_archived=None):
+    """
+    Archives the uploaded files older than days (UPLOAD_RETENTION_DAYS) to Parquet, then deletes them:
+    row table partitions holding only archived files are dropped whole, the rows of the other files are deleted
+    in batches. Files changed since they were archived are kept, and archived again by the next run.
+    on_archived, if given, is called with each ArchivedFile. Returns a RetentionResult.
+    """
+
+    days = settings.UPLOAD_RETENTION_DAYS if days is None else days
+    expired = list(expired_files(days).select_related('user'))
+    versions = {uploaded_file.pk: uploaded_file.version for uploaded_file in expired}
+
+    archived = []
+    for uploaded_file in expired:
+        archived.append(archive_file(uploaded_file, archive_dir))
+        if on_archived:
+            on_archived(archived[-1])
+
+    droppable, remaining = _droppable_partitions(archived)
+    dropped = []
+    deleted = 0
+    skipped = []
+
+    for partition, partition_files in droppable.items():
+        with transaction.atomic():
+            if len(_unchanged(partition_files, versions)) == len(partition_files):
+                deleted += drop_partitions([partition])
+                dropped.append(partition)
+                continue
+        remaining.extend(partition_files)
+
+    for archived_file in remaining:
+        with transaction.atomic():
+            if not _unchanged([archived_file], versions):
+                skipped.append(archived_file)
+                continue
+
+        # Scans of files past their retention are rare, one landing during the batched delete goes with the file
+        delete_rows_in_batches(UploadedFile(pk=archived_file.file_id), batch_size)
+        deleted += UploadedFile.objects.filter(pk=archived_file.file_id).delete()[1].get(UploadedFile._meta.label, 0)
+
+    return RetentionResult(archived, deleted, dropped, skipped)
+
+
+def restore_archive(path, user=None, name=None, chunk_size=None):
+    """
+    Bulk loads an archive written by archive_file back as a new uploaded file (new id, uploaded now) named name
+    (the archived name) and owned by user (the archived owner). Rows keep the user that loaded or scanned them
+    if that user still exists, and the owner otherwise.
+    Raises ValueError for files that are not archives, owners that no longer exist and names the owner already uses.
+    Returns (uploaded file, number of rows).
+    """
+
+    import pyarrow.parquet as pq
+
+    try:
+        archive = pq.ParquetFile(path)
+        details = json.loads(archive.schema_arrow.metadata[ARCHIVE_METADATA_KEY])
+    except (OSError, ValueError, KeyError, TypeError):
+        raise ValueError(f'{path} is not an uploaded file archive.')
+
+    if user is None:
+        user = UserModel.objects.filter(username=details['user']).first()
+        if user is None:
+            raise ValueError(f"User '{details['user']}', the owner of the archived file, does not exist.")
+
+    name = name or details['name']
+    if UploadedFile.objects.filter(user=user, name=name).exists():
+        raise ValueError('A file with this name already exists for this user.')
+
+    # Archives of older versions may lack fields added since, fields removed since are ignored
+    fields = [field_name for field_name in archive.schema_arrow.names if field_name in (*SHEET_FIELDS, 'row_hash')]
+    users = {user.get_username(): user}
+    interner = DimensionInterner()
+    rows = 0
+
+    ensure_partitions()
+
+    with transaction.atomic():
+        uploaded_file = UploadedFile.objects.create(name=name, user=user)
+
+        for batch in archive.iter_batches(batch_size=chunk_size or settings.UPLOAD_CHUNK_SIZE,
+                                          columns=[*fields, 'user']):
+            columns = batch.to_pydict()
+            indexes_by_user = defaultdict(list)
+            for index, username in enumerate(columns.pop('user')):
+                indexes_by_user[username].append(index)
+
+            for username, indexes in indexes_by_user.items():
+                if username not in users:
+                    users[username] = UserModel.objects.filter(username=username).first() or user
+                rows += load_rows({field_name: [values[index] for index in indexes]
+                                   for field_name, values in columns.items()},
+                                  uploaded_file, users[username], interner=interner)
+
+    return uploaded_file, rows
@@ -0,0 +1,196 @@
+from collections import Counter, defaultdict, deque
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from upload_files.helpers.dimensions import DimensionInterner
+from upload_files.helpers.ingestion import HASHED_FIELDS, chunk_to_field_columns, iter_sheet_chunks, row_hashes
+from upload_files.helpers.loaders import load_rows
+from upload_files.models import SCANNED_FIELDS, UploadedFile, UploadedFileRowData
+
+# Rows per UPDATE ... FROM (VALUES ...) and per DELETE statement, well below the bound parameter limit
+WRITE_BATCH_SIZE = 1000
+
+
+class IncrementalResult(NamedTuple):
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    removed: int
+    # Rows added by scans that the sheet does not list, which are kept
+    kept: int
+    # Header names of the sheet, in sheet order
+    columns: list
+    # {sheet column: number of cells stored as None because they could not be converted}
+    dropped: dict
+
+
+def _stored_rows(uploaded_file):
+    """
+    Returns ({row hash: ids of the rows with it}, {id: pos_serial_number}, ids of the rows added by scans)
+    of the rows of uploaded_file, by id.
+    Rows stored without a hash (loaded before rows had one, or added by a scan) are hashed from their values,
+    rows without any sheet value besides their serial number were added by a scan.
+    """
+
+    rows = UploadedFileRowData.objects.filter(file=uploaded_file).order_by('id')
+    by_hash = defaultdict(deque)
+    serial_numbers = {}
+    scan_added = set()
+    unhashed = False
+
+    for pk, serial_number, row_hash in rows.values_list('id', 'pos_serial_number', 'row_hash').iterator():
+        serial_numbers[pk] = serial_number
+        if row_hash is None:
+            unhashed = True
+        else:
+            by_hash[bytes(row_hash)].append(pk)
+
+    if unhashed:
+        values = list(rows.filter(row_hash__isnull=True).values_list('id', *HASHED_FIELDS))
+        columns = dict(zip(['id', *HASHED_FIELDS], zip(*values)))
+        for (pk, *sheet_values), row_hash in zip(values, row_hashes(columns)):
+            if all(value in (None, '') for name, value in zip(HASHED_FIELDS, sheet_values)
+                   if name != 'pos_serial_number'):
+                scan_added.add(pk)
+            else:
+                by_hash[row_hash].append(pk)
+
+    return by_hash, serial_numbers, scan_added
+
+
+def _update_rows(uploaded_file, columns, ids, now, using='default'):
+    """
+    Writes {model field: list of values} columns to the rows of uploaded_file with ids (in the same order)
+    and sets their updated_at,
+    with an UPDATE ... FROM (VALUES ...) per WRITE_BATCH_SIZE rows on PostgreSQL and an UPDATE per row elsewhere.
+    """
+
+    connection = connections[using]
+    rows = list(zip(ids, *columns.values()))
+
+    if connection.vendor != 'postgresql':
+        for pk, *values in rows:
+            UploadedFileRowData.objects.using(using).filter(file=uploaded_file, pk=pk).update(
+                **dict(zip(columns, values)), updated_at=now,
+            )
+        return
+
+    quote = connection.ops.quote_name
+    opts = UploadedFileRowData._meta
+    fields = [opts.pk, *(opts.get_field(name) for name in columns)]
+    updated_at = opts.get_field('updated_at')
+
+    assignments = [f'{quote(field.column)} = v.{quote(field.column)}' for field in fields[1:]]
+    assignments.append(f'{quote(updated_at.column)} = %s')
+    # Casts give the VALUES columns the types of the columns they are written to
+    placeholder = '(' + ', '.join(f'%s::{field.cast_db_type(connection)}' for field in fields) + ')'
+    column_names = ', '.join(quote(field.column) for field in fields)
+    # The file id limits the update to the partition of the file
+    condition = (f't.{quote(opts.get_field("file").column)} = %s '
+                 f'AND t.{quote(opts.pk.column)} = v.{quote(opts.pk.column)}')
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), WRITE_BATCH_SIZE):
+            batch = rows[start:start + WRITE_BATCH_SIZE]
+            params = [updated_at.get_db_prep_save(now, connection)]
+            for values in batch:
+                params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, values))
+            params.append(uploaded_file.pk)
+
+            cursor.execute(
+                f'UPDATE {quote(opts.db_table)} AS t SET {", ".join(assignments)} '
+                f'FROM (VALUES {", ".join([placeholder] * len(batch))}) AS v({column_names}) '
+                f'WHERE {condition}',
+                params,
+            )
+
+
+def _delete_rows(uploaded_file, ids):
+    rows = UploadedFileRowData.objects.filter(file=uploaded_file)
+    removed = 0
+    for start in range(0, len(ids), WRITE_BATCH_SIZE):
+        removed += rows.filter(pk__in=ids[start:start + WRITE_BATCH_SIZE]).delete()[0]
+
+    return removed
+
+
+def apply_incremental_upload(file, uploaded_file, user, chunk_size=None, on_progress=None):
+    """
+    Brings the rows of uploaded_file in line with a new version of its sheet, writing only what differs:
+    - sheet rows with the hash of a stored row leave that row as it is,
+    - other sheet rows update a stored row with the same serial number that no sheet row matched
+      (keeping its scanned values and user), or are inserted,
+    - stored rows left unmatched are deleted, except the rows scans added for serial numbers the sheet lacked.
+    Call it inside a transaction. on_progress, if given, is called with the running row count after every chunk.
+    Raises ValueError for unreadable sheets, missing columns and text too long for its field,
+    before anything is written.
+    Returns an IncrementalResult.
+    """
+
+    by_hash, serial_numbers, scan_added = _stored_rows(uploaded_file)
+    matched = set()
+    # {model field: values} of the sheet rows no stored row matched
+    pending = defaultdict(list)
+    rows = unchanged = 0
+    columns = []
+    dropped = Counter()
+
+    for chunk in iter_sheet_chunks(file, chunk_size or settings.UPLOAD_CHUNK_SIZE):
+        columns = list(chunk.columns)
+        field_columns = chunk_to_field_columns(chunk, dropped)
+        field_columns['row_hash'] = row_hashes(field_columns)
+
+        differing = []
+        for index, row_hash in enumerate(field_columns['row_hash']):
+            ids = by_hash.get(row_hash)
+            if ids:
+                # Repeated sheet rows each match a stored row of their own
+                matched.add(ids.popleft())
+            else:
+                differing.append(index)
+
+        unchanged += len(chunk) - len(differing)
+        for field_name, values in field_columns.items():
+            pending[field_name].extend(values[index] for index in differing)
+
+        rows += len(chunk)
+        if on_progress:
+            on_progress(rows)
+
+    unmatched = defaultdict(deque)
+    for pk, serial_number in serial_numbers.items():
+        if pk not in matched and serial_number:
+            unmatched[serial_number].append(pk)
+
+    # Stored row id -> index of the pending sheet row that replaces its values
+    updates = {}
+    inserts = []
+    for index, serial_number in enumerate(pending['pos_serial_number']):
+        ids = unmatched.get(serial_number)
+        if serial_number and ids:
+            updates[ids.popleft()] = index
+        else:
+            inserts.append(index)
+
+    def take(indexes, exclude=()):
+        return {name: [values[index] for index in indexes] for name, values in pending.items() if name not in exclude}
+
+    interner = DimensionInterner()
+    if inserts:
+        load_rows(take(inserts), uploaded_file, user, interner=interner)
+    if updates:
+        _update_rows(uploaded_file, interner.intern(take(updates.values(), exclude=SCANNED_FIELDS)), list(updates),
+                     timezone.now())
+
+    unmatched_ids = [pk for pk in serial_numbers if pk not in matched and pk not in updates]
+    removed = _delete_rows(uploaded_file, [pk for pk in unmatched_ids if pk not in scan_added])
+
+    if inserts or updates or removed:
+        UploadedFile.bump_version(uploaded_file.pk)
+
+    return IncrementalResult(rows, len(inserts), len(updates), unchanged, removed, len(unmatched_ids) - removed,
+                             columns, dict(dropped))
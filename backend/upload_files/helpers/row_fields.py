@@ -0,0 +1,67 @@
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+
+from upload_files.models import SHEET_FIELDS
+
+# Output keys of UploadedFileRowDataSerializer (foreign keys as ids under the field name),
+# the sheet fields stored in dimension tables included as if they were columns of the row
+ROW_FIELDS = ['id', 'file', 'user', *SHEET_FIELDS, 'created_at', 'updated_at']
+
+# Typed sheet fields rows can be filtered on, the date ones by range
+DATE_FILTER_FIELDS = ('date_of_movement', 'contract_exp_date', 'last_inv_date')
+BOOLEAN_FILTER_FIELDS = ('is_contract', 'is_protocol')
+
+
+def parse_fields(value, allowed=None, always=('id',)):
+    """
+    Parses a comma separated ?fields= value into a list of field names, all allowed fields if it is empty.
+    Fields in always are added when missing (e.g. the pagination key).
+    Raises ValidationError for unknown fields.
+    """
+
+    allowed = allowed or ROW_FIELDS
+
+    if not value:
+        return list(allowed)
+
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise serializers.ValidationError({'fields': f'Unknown fields: {", ".join(unknown)}.'})
+
+    return [*(field for field in always if field not in fields), *fields]
+
+
+def parse_row_filters(query_params):
+    """
+    Parses ?<date field>__gte= and ?<date field>__lte= (YYYY-MM-DD) and ?<boolean field>=true|false
+    into queryset filter arguments.
+    Raises ValidationError for invalid values.
+    """
+
+    filters = {}
+
+    for field_name in DATE_FILTER_FIELDS:
+        for lookup in ('gte', 'lte'):
+            param = f'{field_name}__{lookup}'
+            value = query_params.get(param)
+            if not value:
+                continue
+
+            try:
+                filters[param] = parse_date(value)
+            except ValueError:
+                filters[param] = None
+            if filters[param] is None:
+                raise serializers.ValidationError({param: 'Date must be in YYYY-MM-DD format.'})
+
+    for field_name in BOOLEAN_FILTER_FIELDS:
+        value = query_params.get(field_name, '').lower()
+        if not value:
+            continue
+
+        if value not in ('true', 'false', '1', '0'):
+            raise serializers.ValidationError({field_name: 'Must be true or false.'})
+        filters[field_name] = value in ('true', '1')
+
+    return filters
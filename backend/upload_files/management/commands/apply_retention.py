@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from upload_files.helpers.retention import apply_retention, expired_files
+
+
+class Command(BaseCommand):
+    help = ('Archives uploaded files older than the retention period to Parquet and deletes them '
+            '(restore them with restore_archive)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.UPLOAD_RETENTION_DAYS,
+                            help='Retention period, files uploaded before it are archived')
+        parser.add_argument('--archive-dir', default=None,
+                            help='Directory the archives are written to, MEDIA_ROOT/UPLOAD_ARCHIVE_DIR by default')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per DELETE')
+        parser.add_argument('--dry-run', action='store_true', help='List the files that would be archived')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for uploaded_file in expired_files(options['days']):
+                self.stdout.write(f'Would archive file {uploaded_file.pk} ({uploaded_file.name}, '
+                                  f'uploaded {uploaded_file.upload_date:%Y-%m-%d})')
+            return
+
+        result = apply_retention(
+            days=options['days'], archive_dir=options['archive_dir'], batch_size=options['batch_size'],
+            on_archived=lambda archived: self.stdout.write(
+                f'Archived file {archived.file_id} ({archived.name}): {archived.rows} rows to {archived.path}'
+            ),
+        )
+
+        for partition in result.dropped_partitions:
+            self.stdout.write(f'Dropped {partition}')
+        for archived in result.skipped:
+            self.stderr.write(f'Kept file {archived.file_id} ({archived.name}): it changed while being archived.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {len(result.archived)} files and deleted {result.deleted} of them'
+        ))
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from openpyxl import Workbook
+
+from upload_files.helpers.dimensions import DimensionInterner
+from upload_files.helpers.ingestion import COLUMN_FIELD_MAP, chunk_to_field_columns, ingest_workbook
+from upload_files.helpers.loaders import bulk_create_rows
+from upload_files.models import UploadedFile
+
+UserModel = get_user_model()
+
+
+def _generate_workbook(rows, path):
+    # A regular (not write-only) workbook stores strings in the shared string table like Excel does
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(COLUMN_FIELD_MAP))
+
+    for i in range(rows):
+        sheet.append([
+            f'SN{i:09d}' if column == 'POS SN'
+            else datetime(2024, 1, 1 + i % 28) if 'date' in column.lower()
+            else i % 7 if column.startswith('Is ')
+            else 2000 + i % 25 if column == 'Year of production'
+            else f'{42 + i % 500 / 1000:.3f}, {23 + i % 500 / 1000:.3f}' if column == 'GPS coordinates'
+            else f'{column[:8]} {i % 500}'
+            for column in COLUMN_FIELD_MAP
+        ])
+
+    workbook.save(path)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Both paths insert the rows of the sheet, the inserts are rolled back after they are measured
+
+def _legacy_path(path, chunk_size, uploaded_file, user):
+    # The pre-columnar UploadFileView loop: whole sheet in memory, one str() per cell, one bulk_create.
+    # The text is converted to the typed fields the table has stored since, which the old loop did not need.
+    df = pd.read_excel(path)
+    df = df.fillna('')
+    columns = list(COLUMN_FIELD_MAP)
+
+    rows = [
+        {column: str(row[column]) for column in columns}
+        for _, row in df.iterrows()
+    ]
+
+    field_columns = chunk_to_field_columns(pd.DataFrame(rows, columns=columns))
+    bulk_create_rows(DimensionInterner().intern(field_columns), uploaded_file, user)
+    return len(rows)
+
+
+def _columnar_path(path, chunk_size, uploaded_file, user):
+    # The upload path itself: streaming reader, column conversion and load_rows per chunk
+    with open(path, 'rb') as f:
+        return ingest_workbook(File(f, name=path), uploaded_file, user, chunk_size).rows
+
+
+def _measure(target, path, chunk_size, user_id, queue):
+    baseline_rss = _peak_rss_mb()
+    try:
+        with transaction.atomic():
+            user = UserModel.objects.get(pk=user_id)
+            uploaded_file = UploadedFile.objects.create(name='benchmark.xlsx', user=user)
+
+            started = time.perf_counter()
+            rows = target(path, chunk_size, uploaded_file, user)
+            elapsed = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+    except Exception as e:
+        queue.put(e)
+        return
+    queue.put((rows, elapsed, _peak_rss_mb(), _peak_rss_mb() - baseline_rss))
+
+
+class Command(BaseCommand):
+    help = ('Compares rows/second and peak RSS of the legacy and columnar Excel ingestion paths, '
+            'from reading the sheet to inserting its rows (the inserts are rolled back)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Rows in the generated workbook')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--file', help='Benchmark an existing .xlsx file instead of a generated one')
+
+    def handle(self, *args, **options):
+        user = UserModel.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('At least one user is required to own the benchmark rows.')
+
+        path = options['file']
+
+        if not path:
+            fd, path = tempfile.mkstemp(suffix='.xlsx')
+            os.close(fd)
+            self.stdout.write(f"Generating workbook with {options['rows']} rows...")
+            # Generated in a child process so the workbook does not inflate the measured RSS
+            process = multiprocessing.Process(target=_generate_workbook, args=(options['rows'], path))
+            process.start()
+            process.join()
+
+        try:
+            self.stdout.write(f"{'path':<10}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'peak RSS MB':>14}{'delta MB':>10}")
+            for label, target in (('legacy', _legacy_path), ('columnar', _columnar_path)):
+                # Each path runs in a fresh process so peak RSS is not shared between them
+                queue = multiprocessing.Queue()
+                # A forked process must open a database connection of its own
+                connections.close_all()
+                process = multiprocessing.Process(
+                    target=_measure, args=(target, path, options['chunk_size'], user.pk, queue),
+                )
+                process.start()
+                result = queue.get()
+                process.join()
+
+                if isinstance(result, Exception):
+                    raise CommandError(f'{label} path failed: {result}')
+
+                rows, elapsed, peak_rss, delta_rss = result
+
+                self.stdout.write(
+                    f'{label:<10}{rows:>10}{elapsed:>10.2f}{rows / elapsed:>12.0f}{peak_rss:>14.1f}{delta_rss:>10.1f}'
+                )
+        finally:
+            if not options['file']:
+                os.remove(path)
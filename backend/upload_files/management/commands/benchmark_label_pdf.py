@@ -0,0 +1,98 @@
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+import qrcode
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from upload_files.helpers.generate_pdf_with_qr_codes import write_label_pdf
+from upload_files.helpers.qr_cache import qr_cache
+from upload_files.helpers.qr_matrices import QR_PARAMS
+
+
+def _legacy_write_label_pdf(serial_numbers, output):
+    # The PNG based loop the label PDFs were drawn with before: encode, save as PNG, decode again with ImageReader
+    pdf = canvas.Canvas(output, pagesize=letter)
+    width, height = letter
+    qr_size = 160
+    x, y = 50, height - 50
+    current_row = 0
+
+    for serial_number in serial_numbers:
+        qr = qrcode.QRCode(**QR_PARAMS)
+        qr.add_data(serial_number)
+        qr.make(fit=True)
+
+        img_buffer = BytesIO()
+        qr.make_image(fill_color="black", back_color="white").save(img_buffer)
+        img_buffer.seek(0)
+
+        pdf.drawImage(ImageReader(img_buffer), x, y - qr_size,
+                      width=qr_size, height=qr_size, preserveAspectRatio=True)
+
+        font_size = 10 if len(serial_number) < 20 else 8
+        pdf.setFont("Helvetica", font_size)
+        text_width = pdf.stringWidth(serial_number, "Helvetica", font_size)
+        pdf.drawString(x + (qr_size - text_width) / 2, y - qr_size + 8, serial_number)
+
+        x += qr_size + 15
+        current_row += 1
+
+        if current_row >= 3:
+            x = 50
+            y -= qr_size + 5 + 10
+            current_row = 0
+
+            if y < 100:
+                pdf.showPage()
+                y = height - 50
+                x = 50
+
+    pdf.showPage()
+    pdf.save()
+
+
+class Command(BaseCommand):
+    help = 'Compares labels per second and PDF size of the PNG and the vector label PDF renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--labels', type=int, default=3000)
+        parser.add_argument('--workers', type=int, default=settings.QR_RENDER_WORKERS)
+
+    def handle(self, *args, **options):
+        serial_numbers = [f'SN{i * 7919 % 10_000_000:08d}' for i in range(options['labels'])]
+        settings.QR_RENDER_WORKERS = options['workers']
+
+        def clear_memory_tier(labels, output):
+            qr_cache._memory.clear()
+            return write_label_pdf(labels, output)
+
+        renderers = {
+            'png': _legacy_write_label_pdf,
+            f"vector ({options['workers']} workers)": write_label_pdf,
+            'vector, disk cache': clear_memory_tier,
+            'vector, memory cache': write_label_pdf,
+        }
+
+        self.stdout.write(f"{'renderer':<24}{'seconds':>10}{'labels/s':>12}{'KB':>10}  QR cache")
+
+        # Start from an empty cache so the first vector run encodes every label
+        with tempfile.TemporaryDirectory() as cache_dir:
+            qr_cache.path = Path(cache_dir) / 'qr_cache.sqlite3'
+            qr_cache._memory.clear()
+
+            for name, write in renderers.items():
+                output = BytesIO()
+                started = time.perf_counter()
+                cache_stats = write(serial_numbers, output)
+                elapsed = time.perf_counter() - started
+
+                self.stdout.write(
+                    f'{name:<24}{elapsed:>10.2f}{len(serial_numbers) / elapsed:>12.0f}'
+                    f'{len(output.getvalue()) / 1024:>10.0f}  {cache_stats or ""}'
+                )
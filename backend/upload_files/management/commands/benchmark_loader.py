@@ -0,0 +1,71 @@
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+
+from upload_files.helpers.dimensions import DimensionInterner
+from upload_files.helpers.loaders import bulk_create_rows, copy_rows
+from upload_files.models import SHEET_FIELDS, UploadedFile, sheet_field
+
+UserModel = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _sample_value(field_name, i):
+    field = sheet_field(field_name)
+
+    if isinstance(field, models.DateField):
+        return date(2024, 1, 1 + i % 28)
+    if isinstance(field, models.BooleanField):
+        return i % 7 > 0
+    if isinstance(field, models.PositiveSmallIntegerField):
+        return 2000 + i % 25
+    if isinstance(field, models.FloatField):
+        return 42 + i % 500 / 1000
+
+    return f'{field_name[:4]}{i % 500}'
+
+
+class Command(BaseCommand):
+    help = 'Compares bulk_create and COPY insert speed for UploadedFileRowData (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('COPY is only available on PostgreSQL.')
+
+        user = UserModel.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('At least one user is required to own the benchmark rows.')
+
+        rows, chunk_size = options['rows'], options['chunk_size']
+        field_columns = {
+            field_name: [_sample_value(field_name, i) for i in range(chunk_size)]
+            for field_name in SHEET_FIELDS
+        }
+
+        self.stdout.write(f"{'loader':<14}{'rows':>10}{'seconds':>10}{'rows/s':>12}")
+        for label, loader in (('bulk_create', bulk_create_rows), ('copy', copy_rows)):
+            try:
+                with transaction.atomic():
+                    uploaded_file = UploadedFile.objects.create(name='benchmark.xlsx', user=user)
+                    # Dimension rows are rolled back with the rows, each loader interns them again
+                    interner = DimensionInterner()
+                    started = time.perf_counter()
+                    for start in range(0, rows, chunk_size):
+                        chunk = {name: values[:rows - start] for name, values in field_columns.items()}
+                        loader(interner.intern(chunk), uploaded_file, user)
+                    elapsed = time.perf_counter() - started
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+            self.stdout.write(f'{label:<14}{rows:>10}{elapsed:>10.2f}{rows / elapsed:>12.0f}')
@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from upload_files.helpers.ingestion import ingest_workbook
+from upload_files.helpers.partitions import ensure_partitions
+from upload_files.models import UploadedFile
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Loads historical Excel sheets as uploaded files through the bulk loader (COPY on PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Excel files to load')
+        parser.add_argument('--user', required=True, help='Username that owns the loaded files')
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            user = UserModel.objects.get(username=options['user'])
+        except UserModel.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+
+        for path in options['paths']:
+            name = os.path.basename(path)
+
+            if UploadedFile.objects.filter(user=user, name=name).exists():
+                self.stderr.write(f'Skipping {name}: a file with this name already exists for this user.')
+                continue
+
+            started = time.perf_counter()
+
+            try:
+                ensure_partitions()
+                with open(path, 'rb') as f, transaction.atomic():
+                    uploaded_file = UploadedFile.objects.create(name=name, user=user)
+                    result = ingest_workbook(
+                        File(f, name=name), uploaded_file, user, chunk_size=options['chunk_size'],
+                    )
+            except (OSError, ValueError) as e:
+                self.stderr.write(f'Failed to load {name}: {e}')
+                continue
+
+            elapsed = time.perf_counter() - started
+            rows = result.rows
+            self.stdout.write(self.style.SUCCESS(
+                f'Loaded {name} as file {uploaded_file.id}: {rows} rows in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s)'
+            ))
+            for column, count in result.dropped.items():
+                self.stderr.write(f'  {count} values in column {column!r} could not be converted and were stored empty')
@@ -0,0 +1,46 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from upload_files.helpers.retention import restore_archive
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Loads Parquet archives written by apply_retention back as uploaded files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Archive files to restore')
+        parser.add_argument('--user', default=None, help='Username that owns the restored files, the archived owner '
+                                                         'by default')
+        parser.add_argument('--name', default=None, help='Name of the restored file, when restoring a single archive')
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['name'] and len(options['paths']) > 1:
+            raise CommandError('--name can only be given for a single archive.')
+
+        user = None
+        if options['user']:
+            try:
+                user = UserModel.objects.get(username=options['user'])
+            except UserModel.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist.")
+
+        for path in options['paths']:
+            started = time.perf_counter()
+
+            try:
+                uploaded_file, rows = restore_archive(path, user=user, name=options['name'],
+                                                      chunk_size=options['chunk_size'])
+            except ValueError as e:
+                self.stderr.write(f'Failed to restore {path}: {e}')
+                continue
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'Restored {path} as file {uploaded_file.id}: {rows} rows in {elapsed:.2f}s '
+                f'({rows / elapsed:.0f} rows/s)'
+            ))
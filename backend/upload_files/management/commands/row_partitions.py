@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from upload_files.helpers.partitions import (DEFAULT_PARTITION, attach_partition, create_partitions,
+                                             default_partition_rows, detach_partition, drop_partitions,
+                                             list_partitions)
+
+
+class Command(BaseCommand):
+    help = ('Maintains the file id range partitions of the uploaded rows table: '
+            'status, create (uploads also run it when they near the last partition), detach, attach and drop')
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'create', 'detach', 'attach', 'drop'])
+        parser.add_argument('partitions', nargs='*', help='Partition names, for detach, attach and drop')
+        parser.add_argument('--ahead', type=int, default=None,
+                            help='Partitions create keeps past the one of the next uploaded file')
+        parser.add_argument('--before', type=int, default=None,
+                            help='Drops every partition holding only files with a lower id')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        names = options['partitions']
+
+        if action == 'drop' and options['before'] is not None:
+            names += [partition.name for partition in list_partitions()
+                      if not partition.is_default and partition.end <= options['before']]
+        if action in ('detach', 'attach', 'drop') and not names:
+            raise CommandError(f'Name the partitions to {action}.')
+
+        try:
+            if action == 'status':
+                self.status()
+            elif action == 'create':
+                for name in create_partitions(ahead=options['ahead']):
+                    self.stdout.write(self.style.SUCCESS(f'Created {name}'))
+            elif action == 'drop':
+                deleted = drop_partitions(names)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Dropped {len(names)} partitions and deleted their {deleted} uploaded files'
+                ))
+            else:
+                for name in names:
+                    (detach_partition if action == 'detach' else attach_partition)(name)
+                    self.stdout.write(self.style.SUCCESS(f'{action.capitalize()}ed {name}'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+    def status(self):
+        for partition in list_partitions():
+            file_ids = 'default' if partition.is_default else f'files {partition.start}-{partition.end - 1}'
+            self.stdout.write(
+                f'{partition.name}: {file_ids}, {"attached" if partition.attached else "detached"}, '
+                f'~{max(partition.rows, 0)} rows, {partition.bytes / 1024 ** 2:.1f} MB'
+            )
+
+        # Every query that cannot rule out the default partition scans its rows
+        default_rows = default_partition_rows()
+        if default_rows:
+            self.stderr.write(self.style.WARNING(
+                f'{DEFAULT_PARTITION} holds {default_rows} rows of files without a partition, '
+                f'row_partitions create moves those past the last partition to partitions of their own'
+            ))
@@ -0,0 +1,71 @@
+import logging
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from upload_files.helpers.jobs import JOB_HANDLERS, requeue_stale_jobs, run_next_job
+
+logger = logging.getLogger(__name__)
+
+
+def _work_loop(stop_event, poll_interval, once):
+    # Shutdown is driven by the parent through stop_event, so a running job is finished, not interrupted
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    while not stop_event.is_set():
+        try:
+            ran_job = run_next_job()
+        except Exception:
+            logger.exception('Job worker failed to poll the queue')
+            ran_job = False
+
+        if not ran_job:
+            if once:
+                break
+            stop_event.wait(poll_interval)
+
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Runs a pool of worker processes that execute queued background jobs (e.g. async uploads)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKERS)
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds to wait before polling an empty queue again')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        for model in JOB_HANDLERS:
+            requeued = requeue_stale_jobs(model, settings.JOB_STALE_AFTER)
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale {model._meta.verbose_name_plural.lower()}')
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=_work_loop, args=(stop_event, options['poll_interval'], options['once']))
+            for _ in range(options['workers'])
+        ]
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping workers after their current job...')
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        for worker in workers:
+            worker.start()
+
+        self.stdout.write(f"Started {options['workers']} job workers")
+
+        for worker in workers:
+            worker.join()
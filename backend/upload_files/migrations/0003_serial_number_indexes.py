@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:11
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0002_upload_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='uploadedfilerowdata',
+            index=models.Index(models.F('file'), django.contrib.postgres.indexes.OpClass('pos_serial_number', name='varchar_pattern_ops'), name='upload_row_file_serial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfilerowdata',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('pos_serial_number'), name='gin_trgm_ops'), name='upload_row_serial_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0003_serial_number_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
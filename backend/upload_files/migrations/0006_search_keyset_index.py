@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0005_label_pdf_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='uploadedfilerowdata',
+            index=models.Index(fields=['file', 'pos_serial_number', 'id'], name='upload_row_file_serial_id_idx'),
+        ),
+    ]
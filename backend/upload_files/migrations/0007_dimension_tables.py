@@ -0,0 +1,223 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+ROWS = 'upload_files_uploadedfilerowdata'
+
+OUTLET_COLUMNS = ['whs_outlet', 'outlet_whs_ext_code', 'outlet_whs_name', 'outlet_whs_address', 'vat_id',
+                  'network_name', 'gps_coordinates', 'outlet_category']
+POS_MODEL_COLUMNS = ['pos_category', 'pos_type', 'pos_brand', 'pos_model']
+# Person foreign key -> name column
+PEOPLE = {'nm': 'nm_name', 'rsm': 'rsm_name', 'asm': 'asm_name', 'sr': 'sr_name'}
+
+
+def _columns(alias, columns):
+    return ', '.join(f'{alias}.{column}' for column in columns)
+
+
+def _same(columns, left, right):
+    # Row texts tell NULL from '' and compare with hash joins, unlike IS NOT DISTINCT FROM
+    return f'ROW({_columns(left, columns)})::text = ROW({_columns(right, columns)})::text'
+
+
+# Every row is rewritten once; the space of the dropped columns is given back by VACUUM FULL (or pg_repack)
+FORWARD_SQL = [
+    f"""
+    INSERT INTO upload_files_outlet ({', '.join(OUTLET_COLUMNS)})
+    SELECT DISTINCT {', '.join(OUTLET_COLUMNS)} FROM {ROWS} WHERE num_nonnulls({', '.join(OUTLET_COLUMNS)}) > 0
+    """,
+    f"""
+    INSERT INTO upload_files_posmodel ({', '.join(POS_MODEL_COLUMNS)})
+    SELECT DISTINCT {', '.join(POS_MODEL_COLUMNS)} FROM {ROWS}
+    WHERE num_nonnulls({', '.join(POS_MODEL_COLUMNS)}) > 0
+    """,
+    f"""
+    INSERT INTO upload_files_person (name)
+    SELECT DISTINCT names.name FROM {ROWS} AS r,
+        LATERAL (VALUES {', '.join(f'(r.{column})' for column in PEOPLE.values())}) AS names(name)
+    WHERE names.name IS NOT NULL
+    """,
+    f"""
+    UPDATE {ROWS} AS r SET outlet_id = d.outlet_id, pos_id = d.pos_id,
+        {', '.join(f'{relation}_id = d.{relation}_id' for relation in PEOPLE)}
+    FROM (
+        SELECT s.id, o.id AS outlet_id, p.id AS pos_id,
+            {', '.join(f'{relation}.id AS {relation}_id' for relation in PEOPLE)}
+        FROM {ROWS} AS s
+        LEFT JOIN upload_files_outlet AS o ON {_same(OUTLET_COLUMNS, 'o', 's')}
+        LEFT JOIN upload_files_posmodel AS p ON {_same(POS_MODEL_COLUMNS, 'p', 's')}
+        {' '.join(f'LEFT JOIN upload_files_person AS {relation} ON {relation}.name = s.{column}'
+                  for relation, column in PEOPLE.items())}
+    ) AS d
+    WHERE r.id = d.id
+    """,
+    # Foreign keys are deferred: their checks queued by the UPDATE must run before columns of the table are dropped,
+    # PostgreSQL refuses to ALTER a table with pending trigger events
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+REVERSE_SQL = [
+    f"""
+    UPDATE {ROWS} AS r SET
+        {', '.join(f'{column} = o.{column}' for column in OUTLET_COLUMNS)},
+        {', '.join(f'{column} = p.{column}' for column in POS_MODEL_COLUMNS)},
+        {', '.join(f'{column} = {relation}.name' for relation, column in PEOPLE.items())}
+    FROM {ROWS} AS s
+    LEFT JOIN upload_files_outlet AS o ON o.id = s.outlet_id
+    LEFT JOIN upload_files_posmodel AS p ON p.id = s.pos_id
+    {' '.join(f'LEFT JOIN upload_files_person AS {relation} ON {relation}.id = s.{relation}_id'
+              for relation in PEOPLE)}
+    WHERE r.id = s.id
+    """,
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0006_search_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Person',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'People',
+            },
+        ),
+        migrations.CreateModel(
+            name='Outlet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('whs_outlet', models.CharField(blank=True, max_length=20, null=True)),
+                ('outlet_whs_ext_code', models.CharField(blank=True, max_length=40, null=True)),
+                ('outlet_whs_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('outlet_whs_address', models.CharField(blank=True, max_length=255, null=True)),
+                ('vat_id', models.CharField(blank=True, max_length=20, null=True)),
+                ('network_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('gps_coordinates', models.CharField(blank=True, max_length=100, null=True)),
+                ('outlet_category', models.CharField(blank=True, max_length=30, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('whs_outlet', 'outlet_whs_ext_code', 'outlet_whs_name', 'outlet_whs_address', 'vat_id', 'network_name', 'gps_coordinates', 'outlet_category'), name='upload_outlet_unique', nulls_distinct=False)],
+            },
+        ),
+        migrations.CreateModel(
+            name='PosModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pos_category', models.CharField(blank=True, max_length=50, null=True)),
+                ('pos_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('pos_brand', models.CharField(blank=True, max_length=30, null=True)),
+                ('pos_model', models.CharField(blank=True, max_length=100, null=True)),
+            ],
+            options={
+                'verbose_name': 'POS Model',
+                'verbose_name_plural': 'POS Models',
+                'constraints': [models.UniqueConstraint(fields=('pos_category', 'pos_type', 'pos_brand', 'pos_model'), name='upload_pos_model_unique', nulls_distinct=False)],
+            },
+        ),
+        migrations.AddField(
+            model_name='uploadedfilerowdata',
+            name='outlet',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='upload_files.outlet'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfilerowdata',
+            name='asm',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='upload_files.person'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfilerowdata',
+            name='nm',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='upload_files.person'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfilerowdata',
+            name='rsm',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='upload_files.person'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfilerowdata',
+            name='sr',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='upload_files.person'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfilerowdata',
+            name='pos',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='upload_files.posmodel'),
+        ),
+        # The sheet values are copied to the dimension tables before their columns are dropped
+        migrations.RunSQL(FORWARD_SQL, REVERSE_SQL),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='asm_name',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='gps_coordinates',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='network_name',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='nm_name',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='outlet_category',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='outlet_whs_address',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='outlet_whs_ext_code',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='outlet_whs_name',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='pos_brand',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='pos_category',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='pos_model',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='pos_type',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='rsm_name',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='sr_name',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='vat_id',
+        ),
+        migrations.RemoveField(
+            model_name='uploadedfilerowdata',
+            name='whs_outlet',
+        ),
+    ]
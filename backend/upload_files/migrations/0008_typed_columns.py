@@ -0,0 +1,184 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+ROWS = 'upload_files_uploadedfilerowdata'
+OUTLETS = 'upload_files_outlet'
+
+DATE_COLUMNS = ['date_of_movement', 'contract_exp_date', 'last_inv_date']
+BOOLEAN_COLUMNS = ['is_contract', 'is_protocol']
+
+# Outlet columns of the unique constraint, GPS coordinates as latitude and longitude
+OUTLET_COLUMNS = ['whs_outlet', 'outlet_whs_ext_code', 'outlet_whs_name', 'outlet_whs_address', 'vat_id',
+                  'network_name', 'latitude', 'longitude', 'outlet_category']
+
+# The same values upload_files.helpers.ingestion parses, anything else becomes NULL
+COORDINATES_PATTERN = r'^\s*([-+]?\d+(?:\.\d+)?)\s*[,;\s]\s*([-+]?\d+(?:\.\d+)?)\s*$'
+
+PARSE_COORDINATES_SQL = f"""
+    UPDATE {OUTLETS} SET latitude = parsed.point[1]::float8, longitude = parsed.point[2]::float8
+    FROM (SELECT id, regexp_match(gps_coordinates, '{COORDINATES_PATTERN}') AS point FROM {OUTLETS}) AS parsed
+    WHERE parsed.id = {OUTLETS}.id
+      AND parsed.point[1]::float8 BETWEEN -90 AND 90 AND parsed.point[2]::float8 BETWEEN -180 AND 180
+"""
+
+# Outlets left differing only in GPS text that is not a point (or only in its spacing) become one outlet
+_DUPLICATE_OUTLETS = f"""
+    (SELECT id, min(id) OVER (PARTITION BY {', '.join(OUTLET_COLUMNS)}) AS kept_id FROM {OUTLETS}) AS merged
+"""
+
+MERGE_OUTLETS_SQL = [
+    f"""
+    UPDATE {ROWS} SET outlet_id = merged.kept_id FROM {_DUPLICATE_OUTLETS}
+    WHERE {ROWS}.outlet_id = merged.id AND merged.id <> merged.kept_id
+    """,
+    f"""
+    DELETE FROM {OUTLETS} USING {_DUPLICATE_OUTLETS}
+    WHERE {OUTLETS}.id = merged.id AND merged.id <> merged.kept_id
+    """,
+    # The deferred foreign key checks of the moved rows would otherwise block the ALTER TABLEs that follow
+    'SET CONSTRAINTS ALL IMMEDIATE',
+    'SET CONSTRAINTS ALL DEFERRED',
+]
+
+UNPARSE_COORDINATES_SQL = f"""
+    UPDATE {OUTLETS} SET gps_coordinates = latitude || ', ' || longitude WHERE latitude IS NOT NULL
+"""
+
+# Session functions converting the sheet text to the typed values, NULL for text they cannot convert
+PARSE_FUNCTIONS_SQL = r"""
+    CREATE FUNCTION pg_temp.sheet_date(value text) RETURNS date LANGUAGE plpgsql IMMUTABLE AS $$
+    BEGIN
+        IF value ~ '^\s*\d{4}-\d{1,2}-\d{1,2}( \d{2}:\d{2}:\d{2})?\s*$' THEN
+            RETURN to_date(split_part(trim(value), ' ', 1), 'YYYY-MM-DD');
+        ELSIF value ~ '^\s*\d{1,2}\.\d{1,2}\.\d{4}\s*$' THEN
+            RETURN to_date(trim(value), 'DD.MM.YYYY');
+        ELSIF value ~ '^\s*\d{1,2}/\d{1,2}/\d{4}\s*$' THEN
+            RETURN to_date(trim(value), 'DD/MM/YYYY');
+        END IF;
+        RETURN NULL;
+    EXCEPTION WHEN datetime_field_overflow OR invalid_datetime_format THEN
+        -- e.g. 2024-02-30
+        RETURN NULL;
+    END $$;
+
+    CREATE FUNCTION pg_temp.sheet_year(value text) RETURNS smallint LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE WHEN value ~ '^\s*\d{1,5}(\.0+)?\s*$' THEN
+            CASE WHEN value::numeric BETWEEN 1 AND 32767 THEN value::numeric::smallint END
+        END
+    $$;
+
+    CREATE FUNCTION pg_temp.sheet_boolean(value text) RETURNS boolean LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE
+            WHEN value ~ '^\s*[-+]?\d+(\.\d+)?\s*$' THEN value::numeric > 0
+            WHEN lower(trim(value)) IN ('true', 'yes', 'y', 'да') THEN true
+            WHEN lower(trim(value)) IN ('false', 'no', 'n', 'не') THEN false
+        END
+    $$;
+"""
+
+# A single ALTER TABLE rewrites the rows once for all the columns
+TYPE_ROWS_SQL = [
+    PARSE_FUNCTIONS_SQL,
+    f"""
+    ALTER TABLE {ROWS}
+        {', '.join(f'ALTER COLUMN {column} TYPE date USING pg_temp.sheet_date({column})' for column in DATE_COLUMNS)},
+        ALTER COLUMN year_of_production TYPE smallint USING pg_temp.sheet_year(year_of_production),
+        {', '.join(f'ALTER COLUMN {column} TYPE boolean USING pg_temp.sheet_boolean({column})'
+                   for column in BOOLEAN_COLUMNS)},
+        ADD CONSTRAINT {ROWS}_year_of_production_check CHECK (year_of_production >= 0)
+    """,
+]
+
+# Dates go back to the text uploads used to store, booleans to 1 and 0
+UNTYPE_ROWS_SQL = f"""
+    ALTER TABLE {ROWS}
+        DROP CONSTRAINT {ROWS}_year_of_production_check,
+        {', '.join(f"ALTER COLUMN {column} TYPE varchar(20) USING to_char({column}, 'YYYY-MM-DD HH24:MI:SS')"
+                   for column in DATE_COLUMNS)},
+        ALTER COLUMN year_of_production TYPE varchar(20) USING year_of_production::text,
+        {', '.join(f'ALTER COLUMN {column} TYPE varchar(10) USING {column}::int::text' for column in BOOLEAN_COLUMNS)}
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0007_dimension_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outlet',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='outlet',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunSQL(PARSE_COORDINATES_SQL, migrations.RunSQL.noop),
+        migrations.RemoveConstraint(
+            model_name='outlet',
+            name='upload_outlet_unique',
+        ),
+        migrations.RunSQL(MERGE_OUTLETS_SQL, UNPARSE_COORDINATES_SQL),
+        migrations.RemoveField(
+            model_name='outlet',
+            name='gps_coordinates',
+        ),
+        migrations.AddConstraint(
+            model_name='outlet',
+            constraint=models.UniqueConstraint(fields=('whs_outlet', 'outlet_whs_ext_code', 'outlet_whs_name', 'outlet_whs_address', 'vat_id', 'network_name', 'latitude', 'longitude', 'outlet_category'), name='upload_outlet_unique', nulls_distinct=False),
+        ),
+        migrations.RunSQL(
+            TYPE_ROWS_SQL,
+            UNTYPE_ROWS_SQL,
+            state_operations=[
+                migrations.AlterField(
+                    model_name='uploadedfilerowdata',
+                    name='date_of_movement',
+                    field=models.DateField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='uploadedfilerowdata',
+                    name='contract_exp_date',
+                    field=models.DateField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='uploadedfilerowdata',
+                    name='last_inv_date',
+                    field=models.DateField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='uploadedfilerowdata',
+                    name='year_of_production',
+                    field=models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='uploadedfilerowdata',
+                    name='is_contract',
+                    field=models.BooleanField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='uploadedfilerowdata',
+                    name='is_protocol',
+                    field=models.BooleanField(blank=True, null=True),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfilerowdata',
+            index=models.Index(fields=['file', 'date_of_movement'], name='upload_row_file_movement_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfilerowdata',
+            index=models.Index(fields=['file', 'contract_exp_date'], name='upload_row_file_contr_exp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfilerowdata',
+            index=models.Index(fields=['file', 'last_inv_date'], name='upload_row_file_last_inv_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0008_typed_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfilerowdata',
+            name='row_hash',
+            field=models.BinaryField(blank=True, max_length=16, null=True),
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.2 on 2026-10-18 15:30
+
+from django.conf import settings
+from django.db import migrations
+
+
+ROWS = 'upload_files_uploadedfilerowdata'
+FILES = 'upload_files_uploadedfile'
+
+
+def _partition(start, end):
+    # upload_files.helpers.partitions reads the file id range of detached partitions from their names
+    return f'{ROWS}_f{start}_{end}'
+
+
+def _suffixed(name, suffix):
+    return f'{name[:63 - len(suffix)]}{suffix}'
+
+
+def partition_rows(apps, schema_editor):
+    """
+    Turns the row table into a table partitioned by file id range. The existing table becomes the partition of
+    the files uploaded so far (keeping its rows and indexes), the next range and a default partition are added.
+    """
+
+    size = settings.UPLOAD_ROW_PARTITION_FILES
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT coalesce(max(id), 0) FROM {FILES}')
+        end = (cursor.fetchone()[0] // size + 1) * size
+        first = _partition(0, end)
+
+        # Definitions of the indexes and foreign keys the partitioned table takes over, under their own names
+        cursor.execute(f"""
+            SELECT pg_get_indexdef(i.indexrelid), c.relname
+            FROM pg_index AS i JOIN pg_class AS c ON c.oid = i.indexrelid
+            WHERE i.indrelid = '{ROWS}'::regclass AND NOT i.indisprimary
+        """)
+        indexes = cursor.fetchall()
+        cursor.execute(f"""
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = '{ROWS}'::regclass AND contype = 'f'
+        """)
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT last_value, is_called FROM {ROWS}_id_seq")
+        last_id, is_called = cursor.fetchone()
+
+        # Identity sequences belong to the partitioned table, not to its partitions
+        cursor.execute(f'ALTER TABLE {ROWS} ALTER COLUMN id DROP IDENTITY')
+        cursor.execute(f'ALTER TABLE {ROWS} DROP CONSTRAINT {ROWS}_pkey')
+        cursor.execute(f'ALTER TABLE {ROWS} RENAME TO {first}')
+        for _, name in indexes:
+            cursor.execute(f'ALTER INDEX {name} RENAME TO {_suffixed(name, f"_f0_{end}")}')
+
+        # The primary key of a partitioned table includes the partition key
+        cursor.execute(f"""
+            CREATE TABLE {ROWS} (LIKE {first} INCLUDING DEFAULTS INCLUDING CONSTRAINTS, PRIMARY KEY (id, file_id))
+            PARTITION BY RANGE (file_id)
+        """)
+        cursor.execute(f"""
+            ALTER TABLE {ROWS} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY
+            (START WITH {last_id + 1 if is_called else last_id})
+        """)
+        cursor.execute(f'ALTER TABLE {ROWS} ATTACH PARTITION {first} FOR VALUES FROM (0) TO ({end})')
+
+        # The indexes of the existing partition are attached to the new ones instead of being built again
+        for definition, _ in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {ROWS} ADD CONSTRAINT {name} {definition}')
+
+        cursor.execute(f'CREATE TABLE {_partition(end, end + size)} PARTITION OF {ROWS} '
+                       f'FOR VALUES FROM ({end}) TO ({end + size})')
+        # Takes the rows of files past the last range until python manage.py row_partitions create adds it
+        cursor.execute(f'CREATE TABLE {ROWS}_default PARTITION OF {ROWS} DEFAULT')
+
+
+def unpartition_rows(apps, schema_editor):
+    """
+    Moves the rows of all partitions into the first one and makes it the row table again.
+    """
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT c.relname FROM pg_inherits AS i JOIN pg_class AS c ON c.oid = i.inhrelid
+            WHERE i.inhparent = '{ROWS}'::regclass AND pg_get_expr(c.relpartbound, c.oid) LIKE '%FROM (''0'')%'
+        """)
+        first = cursor.fetchone()[0]
+
+        # Parent index -> the index of the first partition attached to it
+        cursor.execute(f"""
+            SELECT parent.relname, child.relname FROM pg_index AS i
+            JOIN pg_class AS parent ON parent.oid = i.indexrelid
+            JOIN pg_inherits AS inh ON inh.inhparent = i.indexrelid
+            JOIN pg_index AS ci ON ci.indexrelid = inh.inhrelid AND ci.indrelid = '{first}'::regclass
+            JOIN pg_class AS child ON child.oid = ci.indexrelid
+            WHERE i.indrelid = '{ROWS}'::regclass AND NOT i.indisprimary
+        """)
+        indexes = cursor.fetchall()
+        cursor.execute(f"SELECT last_value, is_called FROM {ROWS}_id_seq")
+        last_id, is_called = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {ROWS} DETACH PARTITION {first}')
+        cursor.execute(f'INSERT INTO {first} SELECT * FROM {ROWS}')
+        cursor.execute(f'DROP TABLE {ROWS}')
+        # Detached partitions keep the primary key they had as a partition
+        cursor.execute(f"""
+            SELECT conname FROM pg_constraint WHERE conrelid = '{first}'::regclass AND contype = 'p'
+        """)
+        cursor.execute(f'ALTER TABLE {first} DROP CONSTRAINT {cursor.fetchone()[0]}')
+
+        cursor.execute(f'ALTER TABLE {first} RENAME TO {ROWS}')
+        for parent_name, name in indexes:
+            cursor.execute(f'ALTER INDEX {name} RENAME TO {parent_name}')
+        cursor.execute(f'ALTER TABLE {ROWS} ADD CONSTRAINT {ROWS}_pkey PRIMARY KEY (id)')
+        cursor.execute(f"""
+            ALTER TABLE {ROWS} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY
+            (START WITH {last_id + 1 if is_called else last_id})
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0009_row_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_rows, unpartition_rows),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+# Jobs running during the upgrade are judged by their start, as before
+SET_HEARTBEAT_SQL = [
+    f"UPDATE upload_files_{table} SET heartbeat_at = started_at WHERE status = 'running'"
+    for table in ('uploadjob', 'labelpdfjob')
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0010_partition_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labelpdfjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunSQL(SET_HEARTBEAT_SQL, migrations.RunSQL.noop),
+    ]
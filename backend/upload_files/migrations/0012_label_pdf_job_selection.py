@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+def row_ids_to_selection(apps, schema_editor):
+    # Jobs queued before the upgrade label the rows they were queued with
+    LabelPdfJob = apps.get_model('upload_files', 'LabelPdfJob')
+    for job in LabelPdfJob.objects.exclude(status='done').only('row_ids'):
+        job.selection = {'ids': job.row_ids}
+        job.save(update_fields=['selection'])
+
+
+def selection_to_row_ids(apps, schema_editor):
+    LabelPdfJob = apps.get_model('upload_files', 'LabelPdfJob')
+    for job in LabelPdfJob.objects.filter(selection__has_key='ids').only('selection'):
+        job.row_ids = [int(pk) for pk in job.selection['ids']]
+        job.save(update_fields=['row_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0011_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labelpdfjob',
+            name='selection',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(row_ids_to_selection, selection_to_row_ids),
+        migrations.RemoveField(
+            model_name='labelpdfjob',
+            name='row_ids',
+        ),
+    ]
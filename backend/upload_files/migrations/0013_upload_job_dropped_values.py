@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload_files', '0012_label_pdf_job_selection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='dropped_values',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,5 +1,9 @@
 import re
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Upper
+from django.utils import timezone
 from accounts.models import UserAccount
 
 
@@ -7,11 +11,17 @@ class UploadedFile(models.Model):
     name = models.CharField(max_length=255)
     upload_date = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(UserAccount, on_delete=models.CASCADE, related_name='user_files')
+    # Incremented whenever rows of the file change, cached exports are keyed on it
+    version = models.PositiveIntegerField(default=0)
 
     class Meta:
         verbose_name = "Uploaded File"
         verbose_name_plural = "Uploaded Files"
 
+    @classmethod
+    def bump_version(cls, *file_ids):
+        cls.objects.filter(pk__in=file_ids).update(version=F('version') + 1)
+
     def remove_file_extension(self):
         # Split the string by the last period using a regex
         base_name = re.sub(r'\.([^.]+)$', '', self.name)
@@ -21,46 +31,288 @@ class UploadedFile(models.Model):
         return self.remove_file_extension()
 
 
-class UploadedFileRowData(models.Model):
-    file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='rows')
-    user = models.ForeignKey(UserAccount, on_delete=models.CASCADE, related_name='user_rows')
-    pos_serial_number = models.CharField(max_length=100, blank=True, null=True)
+class Outlet(models.Model):
+    """
+    An outlet or warehouse as the sheets describe it, stored once for all the rows and files that list it.
+    A changed detail (e.g. a new address) makes a new outlet, rows keep the details their sheet had.
+    """
+
     whs_outlet = models.CharField(max_length=20, blank=True, null=True)
-    date_of_movement = models.CharField(max_length=20, blank=True, null=True)
     outlet_whs_ext_code = models.CharField(max_length=40, blank=True, null=True)
     outlet_whs_name = models.CharField(max_length=255, blank=True, null=True)
     outlet_whs_address = models.CharField(max_length=255, blank=True, null=True)
     vat_id = models.CharField(max_length=20, blank=True, null=True)
     network_name = models.CharField(max_length=255, blank=True, null=True)
-    gps_coordinates = models.CharField(max_length=100, blank=True, null=True)
+    # The sheet's "GPS coordinates" as a point
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
     outlet_category = models.CharField(max_length=30, blank=True, null=True)
-    contract_exp_date = models.CharField(max_length=20, blank=True, null=True)
-    contract_number = models.CharField(max_length=100, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['whs_outlet', 'outlet_whs_ext_code', 'outlet_whs_name', 'outlet_whs_address', 'vat_id',
+                        'network_name', 'latitude', 'longitude', 'outlet_category'],
+                name='upload_outlet_unique', nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return self.outlet_whs_name or ''
+
+
+class PosModel(models.Model):
     pos_category = models.CharField(max_length=50, blank=True, null=True)
     pos_type = models.CharField(max_length=50, blank=True, null=True)
     pos_brand = models.CharField(max_length=30, blank=True, null=True)
     pos_model = models.CharField(max_length=100, blank=True, null=True)
+
+    class Meta:
+        verbose_name = "POS Model"
+        verbose_name_plural = "POS Models"
+        constraints = [
+            models.UniqueConstraint(fields=['pos_category', 'pos_type', 'pos_brand', 'pos_model'],
+                                    name='upload_pos_model_unique', nulls_distinct=False),
+        ]
+
+    def __str__(self):
+        return self.pos_model or ''
+
+
+class Person(models.Model):
+    # NM, RSM, ASM and SR names share the table
+    name = models.CharField(max_length=50, unique=True)
+
+    class Meta:
+        verbose_name_plural = "People"
+
+    def __str__(self):
+        return self.name
+
+
+# Sheet field -> (row foreign key, field of the dimension model) for the sheet fields stored in dimension tables
+DIMENSION_FIELDS = {
+    **{field_name: ('outlet', field_name) for field_name in (
+        'whs_outlet', 'outlet_whs_ext_code', 'outlet_whs_name', 'outlet_whs_address', 'vat_id', 'network_name',
+        'latitude', 'longitude', 'outlet_category',
+    )},
+    **{field_name: ('pos', field_name) for field_name in ('pos_category', 'pos_type', 'pos_brand', 'pos_model')},
+    'nm_name': ('nm', 'name'),
+    'rsm_name': ('rsm', 'name'),
+    'asm_name': ('asm', 'name'),
+    'sr_name': ('sr', 'name'),
+}
+
+# Fields of the uploaded sheets in sheet order, as the API, exports and admin show rows
+SHEET_FIELDS = [
+    'pos_serial_number', 'whs_outlet', 'date_of_movement', 'outlet_whs_ext_code', 'outlet_whs_name',
+    'outlet_whs_address', 'vat_id', 'network_name', 'latitude', 'longitude', 'outlet_category', 'contract_exp_date',
+    'contract_number', 'pos_category', 'pos_type', 'pos_brand', 'pos_model', 'pos_asset_number',
+    'technical_condition', 'year_of_production', 'remark', 'last_inv_date', 'nm_name', 'rsm_name', 'asm_name',
+    'sr_code', 'sr_name', 'additional_comment', 'is_contract', 'is_protocol', 'scanned_technical_condition',
+    'scanned_outlet_whs_name',
+]
+
+# Sheet fields filled in by scanning the POS, incremental uploads keep the scanned values of the rows they update
+SCANNED_FIELDS = ['scanned_technical_condition', 'scanned_outlet_whs_name']
+
+
+def sheet_field(field_name):
+    """
+    Returns the model field that stores a sheet field, on UploadedFileRowData or on its dimension model.
+    """
+
+    if field_name in DIMENSION_FIELDS:
+        relation, dimension_field = DIMENSION_FIELDS[field_name]
+        return UploadedFileRowData._meta.get_field(relation).related_model._meta.get_field(dimension_field)
+
+    return UploadedFileRowData._meta.get_field(field_name)
+
+
+class DimensionValue:
+    """
+    Reads a sheet field stored in a dimension table like the column it used to be:
+    from its with_dimensions() annotation when the row has one, otherwise through the row's foreign key.
+    Rows are written with their dimension foreign keys, see upload_files.helpers.dimensions.
+    """
+
+    def __init__(self, name, relation, field_name):
+        self.name = name
+        self.relation = relation
+        self.field_name = field_name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        if self.name in instance.__dict__:
+            return instance.__dict__[self.name]
+
+        related = getattr(instance, self.relation)
+        return getattr(related, self.field_name) if related is not None else None
+
+    def __set__(self, instance, value):
+        # Set by with_dimensions() annotations
+        instance.__dict__[self.name] = value
+
+
+class UploadedFileRowDataQuerySet(models.QuerySet):
+    def with_dimensions(self, *names):
+        """
+        Annotates the sheet fields stored in dimension tables (names, or all of them) under their own names,
+        so they are read with the row instead of through a query per foreign key.
+        """
+
+        names = [name for name in (names or DIMENSION_FIELDS)
+                 if name in DIMENSION_FIELDS and name not in self.query.annotations]
+        if not names:
+            return self
+
+        return self.annotate(**{
+            name: F(f'{DIMENSION_FIELDS[name][0]}__{DIMENSION_FIELDS[name][1]}') for name in names
+        })
+
+    # values() and values_list() accept the sheet field names as if they were columns of the row
+    def values(self, *fields, **expressions):
+        return super(UploadedFileRowDataQuerySet, self.with_dimensions(*fields) if fields else self).values(
+            *fields, **expressions,
+        )
+
+    def values_list(self, *fields, flat=False, named=False):
+        return super(UploadedFileRowDataQuerySet, self.with_dimensions(*fields) if fields else self).values_list(
+            *fields, flat=flat, named=named,
+        )
+
+
+class UploadedFileRowData(models.Model):
+    file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='rows')
+    user = models.ForeignKey(UserAccount, on_delete=models.CASCADE, related_name='user_rows')
+    pos_serial_number = models.CharField(max_length=100, blank=True, null=True)
+    date_of_movement = models.DateField(blank=True, null=True)
+    # Values repeating over thousands of rows and every upload of a sheet are stored once in dimension tables.
+    # Rows are never looked up by them, so the foreign keys are not indexed; dimension rows are not deleted.
+    outlet = models.ForeignKey(Outlet, on_delete=models.PROTECT, blank=True, null=True, db_index=False,
+                               related_name='+')
+    pos = models.ForeignKey(PosModel, on_delete=models.PROTECT, blank=True, null=True, db_index=False,
+                            related_name='+')
+    nm = models.ForeignKey(Person, on_delete=models.PROTECT, blank=True, null=True, db_index=False,
+                           related_name='+')
+    rsm = models.ForeignKey(Person, on_delete=models.PROTECT, blank=True, null=True, db_index=False,
+                            related_name='+')
+    asm = models.ForeignKey(Person, on_delete=models.PROTECT, blank=True, null=True, db_index=False,
+                            related_name='+')
+    sr = models.ForeignKey(Person, on_delete=models.PROTECT, blank=True, null=True, db_index=False,
+                           related_name='+')
+    contract_exp_date = models.DateField(blank=True, null=True)
+    contract_number = models.CharField(max_length=100, blank=True, null=True)
     pos_asset_number = models.CharField(max_length=255, blank=True, null=True)
     technical_condition = models.CharField(max_length=100, blank=True, null=True)
-    year_of_production = models.CharField(max_length=20, blank=True, null=True)
+    year_of_production = models.PositiveSmallIntegerField(blank=True, null=True)
     remark = models.CharField(max_length=255, blank=True, null=True)
-    last_inv_date = models.CharField(max_length=20, blank=True, null=True)
-    nm_name = models.CharField(max_length=50, blank=True, null=True)
-    rsm_name = models.CharField(max_length=50, blank=True, null=True)
-    asm_name = models.CharField(max_length=50, blank=True, null=True)
+    last_inv_date = models.DateField(blank=True, null=True)
     sr_code = models.CharField(max_length=50, blank=True, null=True)
-    sr_name = models.CharField(max_length=50, blank=True, null=True)
     additional_comment = models.CharField(max_length=255, blank=True, null=True)
-    is_contract = models.CharField(max_length=10, blank=True, null=True)
-    is_protocol = models.CharField(max_length=10, blank=True, null=True)
+    is_contract = models.BooleanField(blank=True, null=True)
+    is_protocol = models.BooleanField(blank=True, null=True)
     scanned_technical_condition = models.CharField(max_length=100, blank=True, null=True)
     scanned_outlet_whs_name = models.CharField(max_length=100, blank=True, null=True)
+    # MD5 of the sheet values the row was loaded with, see upload_files.helpers.ingestion.row_hashes
+    row_hash = models.BinaryField(max_length=16, blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UploadedFileRowDataQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Uploaded File Data"
         verbose_name_plural = "Uploaded Files Data"
+        indexes = [
+            # Exact and prefix serial number lookups within a file
+            models.Index(F('file'), OpClass('pos_serial_number', name='varchar_pattern_ops'),
+                         name='upload_row_file_serial_idx'),
+            # Search results in (pos_serial_number, id) order, read page by page from the last row seen
+            models.Index(fields=['file', 'pos_serial_number', 'id'], name='upload_row_file_serial_id_idx'),
+            # Substring (icontains) serial number lookups
+            GinIndex(OpClass(Upper('pos_serial_number'), name='gin_trgm_ops'),
+                     name='upload_row_serial_trgm_idx'),
+            # Date range filters within a file
+            models.Index(fields=['file', 'date_of_movement'], name='upload_row_file_movement_idx'),
+            models.Index(fields=['file', 'contract_exp_date'], name='upload_row_file_contr_exp_idx'),
+            models.Index(fields=['file', 'last_inv_date'], name='upload_row_file_last_inv_idx'),
+        ]
 
     def __str__(self):
         return self.file.name
+
+
+for _name, (_relation, _field_name) in DIMENSION_FIELDS.items():
+    setattr(UploadedFileRowData, _name, DimensionValue(_name, _relation, _field_name))
+
+
+class UploadJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    name = models.CharField(max_length=255)
+    file = models.FileField(upload_to='upload_jobs/')
+    user = models.ForeignKey(UserAccount, on_delete=models.CASCADE, related_name='upload_jobs')
+    uploaded_file = models.ForeignKey(UploadedFile, on_delete=models.SET_NULL, blank=True, null=True,
+                                      related_name='jobs')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    # {sheet column: number of cells that could not be converted and were stored empty}
+    dropped_values = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    # Written with the progress of the running job, jobs whose heartbeat stops are requeued
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Upload Job"
+        verbose_name_plural = "Upload Jobs"
+
+    @property
+    def rows_per_second(self):
+        if not self.started_at:
+            return None
+
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 1) if elapsed > 0 else None
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
+class LabelPdfJob(models.Model):
+    Status = UploadJob.Status
+
+    user = models.ForeignKey(UserAccount, on_delete=models.CASCADE, related_name='label_pdf_jobs')
+    # The changelist selection the labels are drawn for, read again when the job runs (see
+    # UploadedFileRowDataAdmin.label_rows): {'query': changelist query string, 'ids': checked rows}, without ids
+    # when every row matching the changelist filters was selected
+    selection = models.JSONField(default=dict)
+    # One PDF per uploaded file (in a zip) instead of one PDF with a section per file
+    separate_files = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    labels_total = models.PositiveIntegerField(default=0)
+    # Labels drawn so far
+    rows_processed = models.PositiveIntegerField(default=0)
+    output = models.FileField(upload_to='label_pdfs/', blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    # Written with the progress of the running job, jobs whose heartbeat stops are requeued
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Label PDF Job"
+        verbose_name_plural = "Label PDF Jobs"
+
+    def __str__(self):
+        return f'{self.labels_total} labels ({self.status})'
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class RowCursorPagination(CursorPagination):
+    # Cursor positions are ids, so pages stay cheap however deep the client reads
+    ordering = 'id'
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 5000
@@ -1,22 +1,30 @@
 from rest_framework import serializers
 
-from upload_files.models import UploadedFileRowData, UploadedFile
+from upload_files.helpers.row_fields import ROW_FIELDS
+from upload_files.models import UploadedFileRowData, UploadedFile, UploadJob
 
 
 class UploadedFileRowDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadedFileRowData
-        fields = '__all__'
+        fields = ROW_FIELDS
 
 class UploadedFileSerializer(serializers.ModelSerializer):
-    rows = UploadedFileRowDataSerializer(many=True, read_only=True)
-
     class Meta:
         model = UploadedFile
-        fields = ['id', 'name', 'upload_date', 'rows', 'user']
+        fields = ['id', 'name', 'upload_date', 'user']
 
 
 class ListUploadedFilesSerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadedFile
         fields = ['id', 'name']
+
+
+class UploadJobSerializer(serializers.ModelSerializer):
+    rows_per_second = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = UploadJob
+        fields = ['id', 'name', 'status', 'rows_processed', 'rows_per_second', 'dropped_values', 'error',
+                  'uploaded_file', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from upload_files.models import UploadedFile, UploadedFileRowData
+
+
+# Queryset updates, bulk inserts and deletes do not send signals, their callers bump the version themselves.
+# There is deliberately no post_delete receiver: it would stop Django from fast-deleting the rows of a deleted file.
+@receiver(post_save, sender=UploadedFileRowData)
+def bump_file_version_on_row_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        UploadedFile.bump_version(instance.file_id)
@@ -1,9 +1,13 @@
 from django.urls import path
 
-from upload_files.views import UploadFileView, RetrieveLatestFileIdView, ListUploadedFilesView
+from upload_files.views import (
+    UploadFileView, RetrieveLatestFileIdView, ListUploadedFilesView, UploadJobView, UploadedFileRowsView,
+)
 
 urlpatterns = [
     path('upload-file/', UploadFileView.as_view(), name='upload-file'),
     path('get-files/', ListUploadedFilesView.as_view(), name='get-files'),
     path('latest-file/', RetrieveLatestFileIdView.as_view(), name='latest-file'),
+    path('jobs/<int:pk>/', UploadJobView.as_view(), name='upload-job'),
+    path('<int:pk>/rows/', UploadedFileRowsView.as_view(), name='file-rows'),
 ]
@@ -1,15 +1,22 @@
+import time
 import warnings
-import pandas as pd
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import generics as api_generic_views, permissions, status
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 
 from accounts.mixins import GetModelQuerySetMixin
-from upload_files.models import UploadedFile, UploadedFileRowData
+from upload_files.helpers.ingestion import column_summary, ingest_workbook
+from upload_files.helpers.partitions import ensure_partitions
+from upload_files.helpers.row_diff import apply_incremental_upload
+from upload_files.helpers.row_fields import parse_fields, parse_row_filters
+from upload_files.models import UploadedFile, UploadedFileRowData, UploadJob
+from upload_files.pagination import RowCursorPagination
 from accounts.permissions import IsAuthenticatedPermission
-from upload_files.serializers import UploadedFileSerializer, ListUploadedFilesSerializer
+from upload_files.serializers import UploadedFileSerializer, ListUploadedFilesSerializer, UploadJobSerializer
 
 UserModel = get_user_model()
 
@@ -33,72 +40,97 @@ class UploadFileView(api_generic_views.CreateAPIView):
             return Response({'error': 'Invalid file type. Only Excel files are allowed.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if request.data.get('mode') == 'incremental':
+            return self.update_incrementally(request, file, filtered_queryset)
+
         if filtered_queryset.filter(name=file.name).exists():
             return Response({'error': 'A file with this name already exists for this user.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if request.data.get('mode') == 'async':
+            return self.enqueue(request, file)
+
         try:
+            started = time.perf_counter()
+            ensure_partitions()
+
             with transaction.atomic():
-                uploaded_file = UploadedFile(name=file.name, user=request.user)
+                uploaded_file = UploadedFile.objects.create(name=file.name, user=request.user)
+                result = ingest_workbook(file, uploaded_file, request.user)
 
-                try:
-                    df = pd.read_excel(file)
-                    df = df.fillna('')
-                except Exception as e:
-                    return Response({'error': f'Error reading Excel file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+            elapsed = time.perf_counter() - started
 
-                actual_columns = set(df.columns)
+            # A summary instead of the rows, which are paged through rows_url
+            return Response({
+                **UploadedFileSerializer(uploaded_file).data,
+                'row_count': result.rows,
+                'columns': column_summary(result.columns),
+                # Cells per column that could not be converted and were stored empty
+                'dropped_values': result.dropped,
+                'elapsed_seconds': round(elapsed, 3),
+                'rows_per_second': round(result.rows / elapsed, 1) if elapsed > 0 else None,
+                'rows_url': reverse('file-rows', kwargs={'pk': uploaded_file.id}),
+            }, status=status.HTTP_201_CREATED)
 
-                required_columns = {'POS SN', 'Outlet/WHS name', 'Scanned_Technical_condition', 'Scanned_WHS'}
-                if not required_columns.issubset(actual_columns):
-                    return Response({'error': f'Missing required columns: {required_columns - actual_columns}'},
-                                    status=status.HTTP_400_BAD_REQUEST)
 
-                uploaded_file.save()
-
-                row_objects = [
-                    UploadedFileRowData(
-                        file=uploaded_file,
-                        user=request.user,
-                        pos_serial_number=str(row['POS SN']),
-                        whs_outlet=str(row['WHS/Outlet']),
-                        date_of_movement=str(row['Date of movement']),
-                        outlet_whs_ext_code=str(row['Outlet/WHS Ext code']),
-                        outlet_whs_name=str(row['Outlet/WHS name']),
-                        outlet_whs_address=str(row['Outlet/WHS address']),
-                        vat_id=str(row['VAT ID']),
-                        network_name=str(row['Network name']),
-                        gps_coordinates=str(row['GPS coordinates']),
-                        outlet_category=str(row['Outlet Category']),
-                        contract_exp_date=str(row['Contract exp date']),
-                        contract_number=str(row['Contract #']),
-                        pos_category=str(row['POS Category']),
-                        pos_type=str(row['POS Type']),
-                        pos_brand=str(row['POS Brand']),
-                        pos_model=str(row['POS Model']),
-                        pos_asset_number=str(row['POS Asset #']),
-                        technical_condition=str(row['Technical condition']),
-                        year_of_production=str(row['Year of production']),
-                        remark=str(row['Remark']),
-                        last_inv_date=str(row['Last Inv date']),
-                        nm_name=str(row['NM name']),
-                        rsm_name=str(row['RSM name']),
-                        asm_name=str(row['ASM name']),
-                        sr_code=str(row['SR code']),
-                        sr_name=str(row['SR name']),
-                        additional_comment=str(row['AdditionalComment']),
-                        is_contract=str(row['Is contract (Sum)']),
-                        is_protocol=str(row['Is protocol (Sum)']),
-                        scanned_technical_condition=str(row['Scanned_Technical_condition']),
-                        scanned_outlet_whs_name=str(row['Scanned_WHS']),
-                    )
-                    for _, row in df.iterrows()
-                ]
-                UploadedFileRowData.objects.bulk_create(row_objects)
-
-            serializer = UploadedFileSerializer(uploaded_file)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except ValueError as ve:
+            return Response({'error': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return Response({'error': f"Unexpected error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+    def update_incrementally(self, request, file, user_files):
+        """
+        Loads a new version of the sheet of previous_file_id (the user's latest file if not given) into that file,
+        writing only the inserted, changed and removed rows. The file takes the new sheet's name and upload date.
+        """
+
+        previous_file_id = request.data.get('previous_file_id')
+
+        try:
+            started = time.perf_counter()
 
+            with transaction.atomic():
+                previous_files = user_files.filter(pk=previous_file_id) if previous_file_id else user_files
+                # Locked so that two new versions are not diffed against the same rows at once
+                uploaded_file = (previous_files.select_for_update(of=('self',))
+                                 .order_by('-upload_date').first())
+
+                if uploaded_file is None:
+                    return Response({'error': 'No previous file to update.'}, status=status.HTTP_404_NOT_FOUND)
+
+                if user_files.filter(name=file.name).exclude(pk=uploaded_file.pk).exists():
+                    return Response({'error': 'A file with this name already exists for this user.'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+
+                result = apply_incremental_upload(file, uploaded_file, request.user)
+
+                uploaded_file.name = file.name
+                uploaded_file.upload_date = timezone.now()
+                uploaded_file.save(update_fields=['name', 'upload_date'])
+                # The name is part of every exported row, cached exports of an unchanged sheet are stale as well
+                UploadedFile.bump_version(uploaded_file.pk)
+                uploaded_file.refresh_from_db(fields=['version'])
+
+            elapsed = time.perf_counter() - started
+
+            return Response({
+                **UploadedFileSerializer(uploaded_file).data,
+                'row_count': result.rows,
+                'diff': {
+                    'inserted': result.inserted,
+                    'updated': result.updated,
+                    'unchanged': result.unchanged,
+                    'removed': result.removed,
+                    'kept': result.kept,
+                },
+                'columns': column_summary(result.columns),
+                'dropped_values': result.dropped,
+                'elapsed_seconds': round(elapsed, 3),
+                'rows_per_second': round(result.rows / elapsed, 1) if elapsed > 0 else None,
+                'rows_url': reverse('file-rows', kwargs={'pk': uploaded_file.id}),
+            }, status=status.HTTP_200_OK)
 
         except ValueError as ve:
             return Response({'error': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
@@ -106,6 +138,52 @@ class UploadFileView(api_generic_views.CreateAPIView):
         except Exception as e:
             return Response({'error': f"Unexpected error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def enqueue(self, request, file):
+        pending_jobs = UploadJob.objects.filter(
+            user=request.user, name=file.name, status__in=[UploadJob.Status.QUEUED, UploadJob.Status.RUNNING],
+        )
+        if pending_jobs.exists():
+            return Response({'error': 'A file with this name is already being uploaded.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        job = UploadJob.objects.create(name=file.name, file=file, user=request.user)
+
+        return Response({
+            'message': 'File queued for import.',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': reverse('upload-job', kwargs={'pk': job.id}),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class UploadJobView(api_generic_views.RetrieveAPIView):
+    serializer_class = UploadJobSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAuthenticatedPermission]
+
+    def get_queryset(self):
+        if self.request.user.is_superuser:
+            return UploadJob.objects.all()
+
+        return UploadJob.objects.filter(user=self.request.user)
+
+
+class UploadedFileRowsView(GetModelQuerySetMixin, api_generic_views.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsAuthenticatedPermission]
+    pagination_class = RowCursorPagination
+    model = UploadedFile
+
+    def get(self, request, pk):
+        if not self.get_queryset(request, self.model).filter(pk=pk).exists():
+            return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        fields = parse_fields(request.query_params.get('fields'))
+        filters = parse_row_filters(request.query_params)
+
+        # Plain dicts from .values() are rendered as they are, without a serializer per row
+        rows = UploadedFileRowData.objects.filter(file_id=pk, **filters).values(*fields)
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(page)
+
 
 class ListUploadedFilesView(GetModelQuerySetMixin, api_generic_views.ListAPIView):
     serializer_class = ListUploadedFilesSerializer
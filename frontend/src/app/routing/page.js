@@ -1,6 +1,6 @@
 "use client";
 
-import {useState, useEffect} from "react";
+import {useState, useEffect, useRef} from "react";
 import {useRouter} from "next/navigation";
 import {useAuth} from '../context/AuthContext';
 import DatePicker from "react-datepicker";
@@ -20,6 +20,15 @@ export default function RoutingPage() {
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState("");
     const [updatedData, setUpdatedData] = useState({});
+    // Date of the loaded routes, whose changes are followed as they are saved
+    const [streamDate, setStreamDate] = useState(null);
+    const dataRef = useRef(data);
+    const updatedDataRef = useRef(updatedData);
+
+    useEffect(() => {
+        dataRef.current = data;
+        updatedDataRef.current = updatedData;
+    }, [data, updatedData]);
 
     const BASE_URL = process.env.NEXT_PUBLIC_BASE_URL;
 
@@ -40,6 +49,27 @@ export default function RoutingPage() {
         }
     };
 
+    const requestRoutes = async (formattedDate) => {
+        const token = localStorage.getItem("token");
+        let url = `${BASE_URL}/api/routing/get-data/?date=${formattedDate}`;
+        if (!user.is_staff) {
+            url += `&user=${user.username}`;
+        }
+
+        const response = await fetch(url, {
+            method: "GET",
+            headers: {
+                Authorization: `Token ${token}`,
+            },
+        });
+
+        if (!response.ok) {
+            throw new Error("Failed to load data.");
+        }
+
+        return response.json();
+    };
+
     const fetchData = async () => {
         if (!isAuthenticated) return;
         if (!selectedDate) {
@@ -51,25 +81,8 @@ export default function RoutingPage() {
         setError("");
 
         try {
-            const token = localStorage.getItem("token");
             const formattedDate = selectedDate.toISOString().split('T')[0];
-            let url = `${BASE_URL}/api/routing/get-data/?date=${formattedDate}`;
-            if (!user.is_staff) {
-                url += `&user=${user.username}`;
-            }
-
-            const response = await fetch(url, {
-                method: "GET",
-                headers: {
-                    Authorization: `Token ${token}`,
-                },
-            });
-
-            if (!response.ok) {
-                throw new Error("Failed to load data.");
-            }
-
-            const result = await response.json();
+            const result = await requestRoutes(formattedDate);
 
             if (result.length === 0) {
                 toast.info("No data found for the selected date.");
@@ -87,6 +100,7 @@ export default function RoutingPage() {
             }, {});
 
             setUpdatedData(initialUpdatedData);
+            setStreamDate(formattedDate);
         } catch (err) {
             toast.error("Failed to load data. Please try again.");
         } finally {
@@ -110,6 +124,7 @@ export default function RoutingPage() {
         const updatedState = {
             selectedDate,
             displayDate,
+            streamDate,
             data,
             updatedData: {
                 ...updatedData,
@@ -137,6 +152,21 @@ export default function RoutingPage() {
 
     const handleSave = async () => {
         if (!isAuthenticated) return;
+
+        // Only edited outlets are sent, each with the version it was loaded with
+        const changes = data.reduce((acc, item) => {
+            const edited = updatedData[item.id];
+            if (edited && edited.pos_serial_number !== (item.pos_serial_number || "")) {
+                acc[item.id] = {...edited, version: item.version};
+            }
+            return acc;
+        }, {});
+
+        if (Object.keys(changes).length === 0) {
+            toast.info("No changes to save.");
+            return;
+        }
+
         setLoading(true);
 
         try {
@@ -147,16 +177,41 @@ export default function RoutingPage() {
                     Authorization: `Token ${token}`,
                     "Content-Type": "application/json",
                 },
-                body: JSON.stringify(updatedData),
+                body: JSON.stringify(changes),
             });
 
-            if (!response.ok) {
+            // 409 Conflict: the other outlets were saved, the conflicting ones were changed by someone else
+            if (!response.ok && response.status !== 409) {
                 const errorData = await response.json();
                 throw new Error(errorData.error || "Failed to save data.");
             }
 
-            const data = await response.json();
-            toast.success(data.message || "Saved successfully.");
+            const result = await response.json();
+            const conflicts = Object.fromEntries(result.conflicts.map(item => [item.id, item]));
+
+            setData(prev => prev.map(item => {
+                if (conflicts[item.id]) {
+                    return conflicts[item.id];
+                }
+                if (changes[item.id] && result.versions[item.id] !== undefined) {
+                    return {...item, ...changes[item.id], version: result.versions[item.id]};
+                }
+                return item;
+            }));
+
+            if (result.conflicts.length > 0) {
+                // Show the current values of the conflicting outlets, so they can be checked and edited again
+                setUpdatedData(prev => {
+                    const next = {...prev};
+                    result.conflicts.forEach(item => {
+                        next[item.id] = {...next[item.id], pos_serial_number: item.pos_serial_number || ""};
+                    });
+                    return next;
+                });
+                toast.warning(result.message);
+            } else {
+                toast.success(result.message || "Saved successfully.");
+            }
 
         } catch (err) {
             toast.error("Failed to save data. Please try again.");
@@ -170,9 +225,10 @@ export default function RoutingPage() {
         const scanResult = localStorage.getItem('qrScanResult');
 
         if (savedState) {
-            const {selectedDate, displayDate, data, updatedData, companyToExpand} = JSON.parse(savedState);
+            const {selectedDate, displayDate, streamDate, data, updatedData, companyToExpand} = JSON.parse(savedState);
             setSelectedDate(selectedDate ? new Date(selectedDate) : null);
             setDisplayDate(displayDate);
+            setStreamDate(streamDate || null);
             setData(data);
             setUpdatedData(updatedData);
 
@@ -201,6 +257,114 @@ export default function RoutingPage() {
         }
     }, []);
 
+    // Follows the saved changes of the loaded routes over server-sent events instead of polling
+    useEffect(() => {
+        if (!isAuthenticated || !streamDate) return;
+
+        const controller = new AbortController();
+        let retryTimer;
+        let reconnected = false;
+
+        // Outlets with unsaved edits keep the version they were loaded with, saving them reports the conflict
+        const editedIds = () => new Set(dataRef.current
+            .filter(item => updatedDataRef.current[item.id]
+                && updatedDataRef.current[item.id].pos_serial_number !== (item.pos_serial_number || ""))
+            .map(item => item.id));
+
+        const applyRoutes = (routes, removedIds) => {
+            const edited = editedIds();
+            const changed = Object.fromEntries(
+                routes.filter(item => !edited.has(item.id)).map(item => [item.id, item])
+            );
+            const removed = new Set(removedIds);
+
+            setData(prev => {
+                const known = new Set(prev.map(item => item.id));
+                return [
+                    ...prev.filter(item => !removed.has(item.id)).map(item => changed[item.id] || item),
+                    ...Object.values(changed).filter(item => !known.has(item.id)),
+                ];
+            });
+            setUpdatedData(prev => {
+                const next = {...prev};
+                Object.values(changed).forEach(item => {
+                    next[item.id] = {...next[item.id], pos_serial_number: item.pos_serial_number || ""};
+                });
+                return next;
+            });
+        };
+
+        const handleEvent = async (event, payload) => {
+            if (event === "routes") {
+                applyRoutes(payload.routes, payload.removed);
+            } else if (event === "reload") {
+                const result = await requestRoutes(streamDate);
+                const loaded = new Set(result.map(item => item.id));
+                applyRoutes(result, dataRef.current.map(item => item.id).filter(id => !loaded.has(id)));
+            }
+        };
+
+        const listen = async () => {
+            try {
+                const token = localStorage.getItem("token");
+                const response = await fetch(`${BASE_URL}/api/routing/events/?date=${streamDate}`, {
+                    headers: {
+                        Authorization: `Token ${token}`,
+                    },
+                    signal: controller.signal,
+                });
+
+                if (!response.ok) {
+                    throw new Error("Failed to follow route changes.");
+                }
+
+                // Changes saved while the stream was down are caught up with once it is open again
+                if (reconnected) {
+                    await handleEvent("reload");
+                }
+
+                const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                let buffer = "";
+
+                while (true) {
+                    const {value, done} = await reader.read();
+                    if (done) break;
+
+                    buffer += value;
+                    const messages = buffer.split("\n\n");
+                    buffer = messages.pop();
+
+                    for (const message of messages) {
+                        let event = "message";
+                        let payload = "";
+                        message.split("\n").forEach(line => {
+                            if (line.startsWith("event: ")) event = line.slice(7);
+                            else if (line.startsWith("data: ")) payload += line.slice(6);
+                        });
+
+                        if (payload) {
+                            await handleEvent(event, JSON.parse(payload));
+                        }
+                    }
+                }
+            } catch (err) {
+                // Dropped streams are reopened below
+            }
+
+            if (!controller.signal.aborted) {
+                reconnected = true;
+                retryTimer = setTimeout(listen, 5000);
+            }
+        };
+
+        listen();
+
+        return () => {
+            controller.abort();
+            clearTimeout(retryTimer);
+        };
+    }, [isAuthenticated, streamDate]);
+
     useEffect(() => {
         if (scannedOutletId && data.length > 0) {
             const outlet = data.find(item => item.id === scannedOutletId);
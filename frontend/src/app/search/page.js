@@ -10,6 +10,16 @@ import { CButton, CModal, CModalHeader, CModalTitle, CModalBody, CFormCheck } fr
 import useConditionsAndWarehousesData from '../hooks/useConditionsAndWarehousesData';
 import AuthWrapper from "../components/auth/authWrapper";
 
+// Columns the dropdown and the result card show
+const SEARCH_FIELDS = [
+    "pos_serial_number",
+    "pos_type",
+    "outlet_whs_name",
+    "outlet_whs_address",
+    "scanned_technical_condition",
+    "scanned_outlet_whs_name",
+].join(",");
+
 export default function SearchPage() {
     const router = useRouter();
     const [searchQuery, setSearchQuery] = useState("");
@@ -147,7 +157,7 @@ export default function SearchPage() {
                 const token = localStorage.getItem("token");
 
                 const response = await fetch(
-                    `${BASE_URL}/api/db/search/?scanned_pos_serial_number=${query}&latest_file_id=${latestFile}`,
+                    `${BASE_URL}/api/db/search/?scanned_pos_serial_number=${query}&latest_file_id=${latestFile}&fields=${SEARCH_FIELDS}`,
                     {
                         method: "GET",
                         headers: {
@@ -158,18 +168,21 @@ export default function SearchPage() {
                 );
 
                 const data = await response.json();
+                const results = data.results || [];
 
-                if (Array.isArray(data) && data.length > 0) {
-                    setMatches(data);
+                if (results.length > 0) {
+                    setMatches(results);
                     setShowDropdown(true);
 
                     // Auto-select exact match
-                    const exactMatch = data.find(item => item.pos_serial_number === query);
+                    const exactMatch = results.find(item => item.pos_serial_number === query);
                     if (exactMatch) {
                         handleSelectMatch(exactMatch, true);
                         toast.success("Match found!");
                     } else if (!suppressToast) {
-                        toast.success(`${data.length} matches found!`);
+                        // Above the result cap the count is an estimate
+                        const count = data.count_is_estimate ? `About ${data.count}` : data.count;
+                        toast.success(`${count} matches found!`);
                     }
                 } else {
                     setMatches([]);
@@ -13,6 +13,8 @@ export default function UploadFile() {
     const [error, setError] = useState("");
     const [isUploading, setIsUploading] = useState(false);
     const [isDragging, setIsDragging] = useState(false);
+    // Updates the latest uploaded file with the rows that changed instead of adding a new file
+    const [isIncremental, setIsIncremental] = useState(false);
     const router = useRouter();
     const { isAuthenticated, logout } = useAuth();
     const BASE_URL = process.env.NEXT_PUBLIC_BASE_URL;
@@ -79,6 +81,9 @@ export default function UploadFile() {
         try {
             const formData = new FormData();
             formData.append("file", selectedFile);
+            if (isIncremental) {
+                formData.append("mode", "incremental");
+            }
 
             const token = localStorage.getItem("token");
             const response = await fetch(`${BASE_URL}/api/files/upload-file/`, {
@@ -89,8 +94,15 @@ export default function UploadFile() {
                 body: formData,
             });
 
-            if (response.status === 201) {
-                toast.success("File uploaded successfully!");
+            if (response.status === 201 || response.status === 200) {
+                const summary = await response.json();
+                if (summary.diff) {
+                    const { inserted, updated, removed, unchanged } = summary.diff;
+                    toast.success(`File updated successfully! ${inserted} rows added, ${updated} changed, ` +
+                        `${removed} removed, ${unchanged} unchanged.`);
+                } else {
+                    toast.success(`File uploaded successfully! ${summary.row_count} rows imported.`);
+                }
                 router.push("/dashboard");
                 sessionStorage.removeItem("latest_file_id");
                 sessionStorage.removeItem("latest_file_name");
@@ -139,6 +151,15 @@ export default function UploadFile() {
                     </p>
                 )}
 
+                <label className="incremental-option">
+                    <input
+                        type="checkbox"
+                        checked={isIncremental}
+                        onChange={(event) => setIsIncremental(event.target.checked)}
+                    />
+                    Update the latest file with the changed rows only
+                </label>
+
                 <button
                     onClick={handleUpload}
                     disabled={isUploading}